@@ -0,0 +1,67 @@
+"""Ordered ``in`` checks vs the compiled keyword classifier as tables grow.
+
+    python -m benchmarks.bench_classifier [--texts 20000] [--sizes 11 50 200 1000]
+
+The real CATEGORY_MAP / STONE_TYPES tables are extended with synthetic
+keywords; every text is classified both ways and the labels compared.
+"""
+import argparse
+import random
+import string
+import time
+
+from bulk_mapper.engine import STONE_TYPES
+from bulk_mapper.keyword_classifier import KeywordClassifier
+
+
+def ordered_scan(rules, default, text):
+    for keyword, label in rules:
+        if keyword in text:
+            return label
+    return default
+
+
+def synthetic_rules(size, rng):
+    rules = list(STONE_TYPES)
+    while len(rules) < size:
+        keyword = "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 9)))
+        rules.append((keyword, keyword.title()))
+    return rules[:size]
+
+
+def synthetic_texts(rules, count, rng):
+    keywords = [k for k, _ in rules]
+    texts = []
+    for _ in range(count):
+        words = [rng.choice(keywords) if rng.random() < 0.3 else "".join(
+            rng.choice(string.ascii_lowercase) for _ in range(rng.randint(2, 7))) for _ in range(rng.randint(1, 4))]
+        texts.append(" - ".join(words))
+    return texts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--texts", type=int, default=20_000)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[11, 50, 200, 1000])
+    args = parser.parse_args()
+    rng = random.Random(7)
+
+    print(f"{'keywords':>9} {'scan us':>9} {'compiled us':>12} {'speedup':>8} {'identical':>10}")
+    for size in args.sizes:
+        rules = synthetic_rules(size, rng)
+        texts = synthetic_texts(rules, args.texts, rng)
+        classifier = KeywordClassifier(rules, "Others")
+
+        start = time.perf_counter()
+        expected = [ordered_scan(rules, "Others", t) for t in texts]
+        scan_s = time.perf_counter() - start
+        start = time.perf_counter()
+        got = [classifier.classify(t) for t in texts]
+        compiled_s = time.perf_counter() - start
+
+        print(f"{size:>9} {scan_s / len(texts) * 1e6:>9.2f} {compiled_s / len(texts) * 1e6:>12.2f} "
+              f"{scan_s / compiled_s:>7.1f}x {str(got == expected):>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""Streaming XLSX ingestion against ``pd.read_excel``.
+
+    python -m benchmarks.bench_excel [--rows 200000] [--sheets 4] [--chunksize 50000] [--seed 0]
+
+Writes a synthetic vendor file (benchmarks.synthetic) as a one-sheet
+workbook, with numeric columns stored as numbers and each sheet's
+dimensions recorded as an Excel export has them, and reads it in a fresh
+process per reader so each peak resident set is its own:
+
+- ``read_excel``: ``pd.read_excel(dtype=str)``, the previous Excel path.
+- ``streamed``: ``read_vendor_file``, the read-only row stream.
+- ``chunks``: ``read_vendor_chunks``, one ``--chunksize`` frame at a time.
+
+All three read the mapped columns (``engine.vendor_columns``) and must
+give the same rows. The same rows split over ``--sheets`` worksheets are
+then mapped with ``batch.run_batch``, one vendor per sheet, in one
+process and in one per sheet (at most one per core).
+"""
+import argparse
+import hashlib
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+
+import pandas as pd
+
+from benchmarks.synthetic import synthetic_vendor_frame
+
+
+def _typed_columns(df):
+    """Columns as cell values: numbers where every filled cell is one."""
+    columns = []
+    for name in df.columns:
+        values = df[name]
+        numbers = pd.to_numeric(values.where(values != ""), errors="coerce")
+        if numbers.notna().sum() == (values != "").sum():
+            columns.append([None if pd.isna(n) else (int(n) if float(n).is_integer() else float(n))
+                            for n in numbers])
+        else:
+            columns.append([v or None for v in values])
+    return columns
+
+
+def write_workbook(df, path, sheets=1):
+    """``df`` as an XLSX workbook, its rows split over ``sheets`` worksheets."""
+    from openpyxl import Workbook
+
+    from openpyxl.utils import get_column_letter
+
+    workbook = Workbook(write_only=True)
+    rows = list(zip(*_typed_columns(df)))
+    bounds = [len(rows) * i // sheets for i in range(sheets + 1)]
+    dimensions = {}
+    for i, (start, stop) in enumerate(zip(bounds[:-1], bounds[1:]), 1):
+        worksheet = workbook.create_sheet(f"block{i}" if sheets > 1 else "Sheet1")
+        worksheet.append(list(df.columns))
+        for row in rows[start:stop]:
+            worksheet.append(row)
+        dimensions[f"xl/worksheets/sheet{i}.xml"] = f"A1:{get_column_letter(len(df.columns))}{stop - start + 1}"
+    workbook.save(path)
+    _add_dimensions(path, dimensions)
+
+
+def _add_dimensions(path, dimensions):
+    """Record each sheet's used range, which the write-only mode leaves
+    out; without it read-only openpyxl scans every sheet on opening."""
+    tmp = path + ".tmp"
+    with zipfile.ZipFile(path) as source, zipfile.ZipFile(tmp, "w", zipfile.ZIP_DEFLATED) as target:
+        for item in source.infolist():
+            data = source.read(item.filename)
+            if item.filename in dimensions:
+                dimension = f'<dimension ref="{dimensions[item.filename]}"/><sheetViews>'.encode()
+                data = data.replace(b"<sheetViews>", dimension, 1)
+            target.writestr(item, data)
+    os.replace(tmp, path)
+
+
+def _rows_digest(frames):
+    digest = hashlib.sha256()
+    rows = 0
+    for frame in frames:
+        digest.update(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes())
+        rows += len(frame)
+    return rows, digest.hexdigest()[:12]
+
+
+def _peak_rss_mb():
+    """VmHWM where there is one: unlike ru_maxrss it is not carried over
+    from the parent, which holds the synthetic frame, across exec."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 2**10
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2**10
+
+
+def run_reader(mode, path, chunksize):
+    from bulk_mapper.engine import vendor_columns
+    from bulk_mapper.reader import read_vendor_chunks, read_vendor_file
+
+    usecols = vendor_columns()
+    start = time.perf_counter()
+    if mode == "read_excel":
+        wanted = set(usecols)
+        frames = [pd.read_excel(path, dtype=str, usecols=wanted.__contains__).fillna("")]
+    elif mode == "streamed":
+        frames = [read_vendor_file(path, usecols)]
+    else:
+        frames = read_vendor_chunks(path, chunksize, usecols)
+    rows, digest = _rows_digest(frames)
+    elapsed = time.perf_counter() - start
+    peak_mb = _peak_rss_mb()
+    print(f"{mode:>10} {elapsed:>8.2f} {rows:>8,} {peak_mb:>9.1f} {digest:>13}", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--sheets", type=int, default=4)
+    parser.add_argument("--chunksize", type=int, default=50_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--run", nargs=3, metavar=("MODE", "PATH", "CHUNKSIZE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.run:
+        mode, path, chunksize = args.run
+        run_reader(mode, path, int(chunksize))
+        return
+
+    from bulk_mapper.batch import collect_vendors, run_batch
+
+    df = synthetic_vendor_frame(args.rows, args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "vendor.xlsx")
+        write_workbook(df, path)
+        print(f"{'reader':>10} {'seconds':>8} {'rows':>8} {'peak RSS':>9} {'rows digest':>13}")
+        lines = []
+        for mode in ("read_excel", "streamed", "chunks"):
+            done = subprocess.run([sys.executable, "-m", "benchmarks.bench_excel", "--run", mode, path,
+                                   str(args.chunksize)], check=True, capture_output=True, text=True)
+            print(done.stdout, end="")
+            lines.append(done.stdout.split())
+        identical = len({line[-1] for line in lines}) == 1
+        print(f"identical: {identical}")
+
+        sheets_path = os.path.join(tmp, "vendor-sheets.xlsx")
+        write_workbook(df, sheets_path, args.sheets)
+        vendors = collect_vendors([sheets_path])
+        print(f"\n{len(vendors)} sheets mapped by run_batch on {os.cpu_count()} cores")
+        print(f"{'jobs':>6} {'seconds':>8} {'rows':>8}")
+        for jobs in sorted({1, min(len(vendors), os.cpu_count() or 1)}):
+            start = time.perf_counter()
+            _, summary = run_batch(vendors, os.path.join(tmp, f"out{jobs}"), jobs=jobs)
+            print(f"{jobs:>6} {time.perf_counter() - start:>8.2f} {summary['rows']:>8,}")
+    if not identical:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""Full map vs incremental runs against the previous upload.
+
+    python -m benchmarks.bench_incremental [--rows 200000] [--changed 0.02]
+
+test.csv is tiled to ``--rows`` with unique TAG NOs. The first incremental
+run builds the snapshot; the next one sees ``--changed`` of the rows with
+a new CT, a third one sees the same file again. Every run's full output
+must equal a plain ``map_vendor_frame`` of its input.
+"""
+import argparse
+import os
+import tempfile
+
+from benchmarks.bench_vectorized import tiled_frame, timed
+from bulk_mapper.engine import map_vendor_frame
+from bulk_mapper.incremental import map_incremental
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--changed", type=float, default=0.02)
+    args = parser.parse_args()
+
+    df = tiled_frame(args.rows)
+    df["TAG NO"] = [f"T{i}" for i in range(len(df))]
+    edited = df.copy()
+    edited.loc[::max(int(1 / args.changed), 1), "CT"] = "1.11"
+
+    elapsed, _ = timed(map_vendor_frame, df, compact=True)
+    print(f"{'run':>10} {'seconds':>8} {'mapped':>8} {'delta':>8} {'identical':>10}")
+    print(f"{'full':>10} {elapsed:>8.2f} {len(df):>8} {'':>8} {'':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        state = os.path.join(tmp, "state.parquet")
+        for label, frame in (("first", df), ("changed", edited), ("same", edited)):
+            elapsed, (out_df, delta_df, _, stats) = timed(map_incremental, frame, state, compact=True)
+            expected, _ = map_vendor_frame(frame)
+            identical = out_df.to_csv(index=False) == expected.to_csv(index=False)
+            print(f"{label:>10} {elapsed:>8.2f} {stats['mapped']:>8} {len(delta_df):>8} {str(identical):>10}")
+
+
+if __name__ == "__main__":
+    main()
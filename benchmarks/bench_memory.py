@@ -0,0 +1,61 @@
+"""Peak RSS of read + map + write with object vs compact output columns.
+
+    python -m benchmarks.bench_memory [--rows 500000]
+
+test.csv is tiled to ``--rows`` and saved once; each mode then runs in a
+fresh process that reads it, maps it and writes the CSV, so the peak
+resident set of one mode does not leak into the other. Both outputs must
+be byte-identical.
+"""
+import argparse
+import filecmp
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.bench_vectorized import tiled_frame
+
+
+def run_mode(source, output, compact):
+    import time
+
+    from bulk_mapper.engine import map_vendor_frame
+    from bulk_mapper.reader import read_vendor_file
+    from bulk_mapper.writers import write_frame
+
+    start = time.perf_counter()
+    out_df, _ = map_vendor_frame(read_vendor_file(source), compact=compact)
+    frame_mb = out_df.memory_usage(deep=True).sum() / 2**20
+    write_frame(out_df, output)
+    elapsed = time.perf_counter() - start
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2**10
+    print(f"{'compact' if compact else 'object':>8} {elapsed:>8.2f} {frame_mb:>9.1f} {peak_mb:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--run", nargs=3, metavar=("SOURCE", "OUTPUT", "COMPACT"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.run:
+        source, output, compact = args.run
+        run_mode(source, output, compact == "1")
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "vendor.csv")
+        tiled_frame(args.rows).to_csv(source, index=False)
+        print(f"{'columns':>8} {'seconds':>8} {'frame MB':>9} {'peak RSS':>9}")
+        outputs = []
+        for compact in ("0", "1"):
+            output = os.path.join(tmp, f"out{compact}.csv")
+            subprocess.run([sys.executable, "-m", "benchmarks.bench_memory", "--run", source, output, compact],
+                           check=True)
+            outputs.append(output)
+        print(f"identical: {filecmp.cmp(*outputs, shallow=False)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+"""Serial engine vs the process pool for several worker counts.
+
+    python -m benchmarks.bench_parallel [--rows 500000] [--workers 2 4 8]
+"""
+import argparse
+
+from benchmarks.bench_vectorized import tiled_frame, timed, to_csv_text
+from bulk_mapper.engine import map_vendor_frame
+from bulk_mapper.parallel import default_workers, map_vendor_frame_parallel
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({2, 4, default_workers()}))
+    args = parser.parse_args()
+
+    df = tiled_frame(args.rows)
+    serial_s, (serial_df, _) = timed(map_vendor_frame, df)
+    expected = to_csv_text(serial_df)
+    print(f"{'workers':>8} {'seconds':>9} {'speedup':>8} {'identical':>10}")
+    print(f"{'serial':>8} {serial_s:>9.2f} {1:>7.1f}x {'-':>10}")
+    for workers in args.workers:
+        elapsed, (out_df, _) = timed(map_vendor_frame_parallel, df, workers, min_rows=0)
+        print(f"{workers:>8} {elapsed:>9.2f} {serial_s / elapsed:>7.1f}x {str(to_csv_text(out_df) == expected):>10}")
+
+
+if __name__ == "__main__":
+    main()
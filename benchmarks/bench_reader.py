@@ -0,0 +1,39 @@
+"""Ingest time and frame size: all columns vs the mapped columns, per CSV engine.
+
+    python -m benchmarks.bench_reader [--rows 500000]
+
+The vendor file is test.csv tiled to ``--rows`` and written to a
+temporary CSV; every variant must give the same mapped output.
+"""
+import argparse
+import os
+import tempfile
+
+from benchmarks.bench_vectorized import tiled_frame, timed
+from bulk_mapper.engine import map_vendor_frame, vendor_columns
+from bulk_mapper.reader import default_csv_engine, read_vendor_file
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=500_000)
+    args = parser.parse_args()
+
+    engines = sorted({"c", default_csv_engine()})
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "vendor.csv")
+        tiled_frame(args.rows).to_csv(path, index=False)
+        expected = None
+        print(f"{'engine':>8} {'columns':>8} {'seconds':>8} {'MB':>8} {'identical':>10}")
+        for engine in engines:
+            for usecols in (None, vendor_columns()):
+                elapsed, df = timed(read_vendor_file, path, usecols, engine)
+                size = df.memory_usage(deep=True).sum()
+                out_df, _ = map_vendor_frame(df)
+                expected = out_df if expected is None else expected
+                print(f"{engine:>8} {len(df.columns):>8} {elapsed:>8.2f} {size / 2**20:>8.1f} "
+                      f"{str(out_df.equals(expected)):>10}")
+
+
+if __name__ == "__main__":
+    main()
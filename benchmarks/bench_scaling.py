@@ -0,0 +1,34 @@
+"""Wall time and peak traced memory of the mapping engine as rows double.
+
+    python -m benchmarks.bench_scaling [--sizes 125000 250000 500000 1000000]
+
+With the output built once from preallocated column buffers both numbers
+should grow linearly: microseconds per row and bytes per row stay flat.
+"""
+import argparse
+import time
+import tracemalloc
+
+from benchmarks.bench_vectorized import tiled_frame
+from bulk_mapper.engine import map_vendor_frame
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[125_000, 250_000, 500_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'seconds':>9} {'us/row':>8} {'peak MB':>9} {'bytes/row':>10}")
+    for rows in args.sizes:
+        df = tiled_frame(rows)
+        tracemalloc.start()
+        start = time.perf_counter()
+        map_vendor_frame(df)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{rows:>10} {elapsed:>9.2f} {elapsed / rows * 1e6:>8.2f} {peak / 2**20:>9.1f} {peak / rows:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""Cost of the pre-upload validation next to the mapping it follows.
+
+    python -m benchmarks.bench_validation [--rows 1000000] [--seed 0] [--budget 5]
+
+Maps a synthetic vendor file (benchmarks.synthetic) with each profile,
+as compact (categorical) and as object columns, and times
+``validate_frame`` on the output. Exits 1 when validation of a compact
+frame, which the whole-file entry points map, takes more than
+``--budget`` percent of the mapping time. Object frames (the chunks of
+streaming runs) are shown for reference: copying their accepted rows
+costs a pointer per cell, next to a write that formats every cell.
+"""
+import argparse
+
+from benchmarks.bench_vectorized import timed
+from benchmarks.synthetic import synthetic_vendor_frame
+from bulk_mapper.engine import map_vendor_frame
+from bulk_mapper.profiles import PROFILES
+from bulk_mapper.validation import validate_frame
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--budget", type=float, default=5.0, help="percent of the mapping time")
+    args = parser.parse_args()
+
+    df = synthetic_vendor_frame(args.rows, args.seed)
+    over = 0
+    print(f"{'profile':>8} {'compact':>8} {'map s':>7} {'validate s':>10} {'share':>7} {'rejected':>9}")
+    for profile in PROFILES:
+        for compact in (True, False):
+            map_s, (out_df, _) = timed(map_vendor_frame, df, compact=compact, **PROFILES[profile])
+            validate_s, (_, rejected) = timed(validate_frame, out_df)
+            share = 100 * validate_s / map_s
+            over += compact and share > args.budget
+            print(f"{profile:>8} {str(compact):>8} {map_s:>7.2f} {validate_s:>10.3f} {share:>6.1f}% "
+                  f"{len(rejected):>9,}")
+    if over:
+        raise SystemExit(f"validation took more than {args.budget}% of the mapping in {over} compact case(s)")
+
+
+if __name__ == "__main__":
+    main()
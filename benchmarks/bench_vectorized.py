@@ -0,0 +1,59 @@
+"""Row-by-row vs column-wise mapping at 10k, 100k and 1M rows.
+
+    python -m benchmarks.bench_vectorized [--sizes 10000 100000 1000000]
+
+The vendor frame is test.csv repeated to the requested size. The legacy
+path grows quadratically with ``pd.concat`` so it only runs up to
+``--legacy-max-rows``; where it runs, both outputs are compared byte for byte.
+"""
+import argparse
+import io
+import os
+import time
+
+import pandas as pd
+
+from benchmarks.legacy_mapping import legacy_process_frame
+from bulk_mapper.engine import map_vendor_frame
+
+SAMPLE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "test.csv")
+
+
+def tiled_frame(rows, sample_file=SAMPLE_FILE):
+    sample = pd.read_csv(sample_file, dtype=str).fillna("")
+    repeats = -(-rows // len(sample))
+    return pd.concat([sample] * repeats, ignore_index=True).iloc[:rows].reset_index(drop=True)
+
+
+def to_csv_text(df):
+    buf = io.StringIO()
+    df.to_csv(buf, index=False)
+    return buf.getvalue()
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--legacy-max-rows", type=int, default=10_000)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'legacy s':>10} {'engine s':>10} {'speedup':>9} {'identical':>10}")
+    for rows in args.sizes:
+        df = tiled_frame(rows)
+        engine_s, (out_df, missing_df) = timed(map_vendor_frame, df)
+        if rows <= args.legacy_max_rows:
+            legacy_s, (legacy_df, legacy_missing) = timed(legacy_process_frame, df)
+            identical = to_csv_text(out_df) == to_csv_text(legacy_df) and len(legacy_missing) == len(missing_df)
+            print(f"{rows:>10} {legacy_s:>10.2f} {engine_s:>10.2f} {legacy_s / engine_s:>8.0f}x {str(identical):>10}")
+        else:
+            print(f"{rows:>10} {'skipped':>10} {engine_s:>10.2f} {'-':>9} {'-':>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""Write time, file size and read-back time per output format.
+
+    python -m benchmarks.bench_writers [--rows 500000] [--formats csv parquet]
+
+The output frame is the mapped test.csv tiled to ``--rows``. Formats whose
+optional dependency is missing are skipped; every format is read back and
+compared with the CSV cells.
+"""
+import argparse
+import os
+import tempfile
+
+from benchmarks.bench_vectorized import tiled_frame, timed
+from bulk_mapper.engine import map_vendor_frame
+from bulk_mapper.writers import available_formats, output_file_name, read_output, write_frame
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--formats", nargs="+", default=available_formats())
+    args = parser.parse_args()
+
+    out_df, _ = map_vendor_frame(tiled_frame(args.rows))
+    expected = out_df.astype(str)
+    print(f"{'format':>8} {'write s':>8} {'MB':>8} {'ratio':>6} {'read s':>7} {'identical':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_size = None
+        for output_format in args.formats:
+            path = os.path.join(tmp, output_file_name("gemgem_upload", output_format))
+            write_s, _ = timed(write_frame, out_df, path, output_format)
+            size = os.path.getsize(path)
+            csv_size = csv_size or size
+            read_s, back = timed(read_output, path, output_format)
+            identical = back.astype(str).equals(expected)
+            print(f"{output_format:>8} {write_s:>8.2f} {size / 2**20:>8.1f} {csv_size / size:>5.1f}x "
+                  f"{read_s:>7.2f} {str(identical):>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""Kill-and-resume check of checkpointed chunked mapping.
+
+    python -m benchmarks.check_checkpoint [--rows 20000] [--chunksize 1000] [--kill-after 5]
+
+For each profile and output format, maps a synthetic vendor file
+(benchmarks.synthetic) with ``stream_vendor_file`` as the reference, then
+starts ``stream_vendor_file_checkpointed`` in a child process, SIGKILLs it
+once ``--kill-after`` chunks are checkpointed and runs it again to resume.
+The resumed output, missing-diamond file and rejected-rows file
+(bulk_mapper.validation) must equal the reference (byte for byte for
+CSV, after decompression for csv.gz, cell for cell for Parquet) and the
+checkpoint must be gone afterwards. Cases with a
+duplicate SKU policy run on the file with every seventh SKU repeated at
+its end, with the rows the policy keeps (bulk_mapper.dedup).
+"""
+import argparse
+import glob
+import gzip
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic import synthetic_vendor_frame
+from bulk_mapper.checkpoint import MANIFEST, stream_vendor_file_checkpointed
+from bulk_mapper.dedup import scan_duplicate_skus
+from bulk_mapper.engine import vendor_columns
+from bulk_mapper.profiles import PROFILES
+from bulk_mapper.streaming import stream_vendor_file
+from bulk_mapper.writers import output_file_name, read_output
+
+# (profile, output format, duplicate SKU policy); main keeps the
+# first-written column order.
+CASES = [
+    ("app", "csv", None),
+    ("main", "csv", None),
+    ("dynamic", "csv.gz", None),
+    ("app", "parquet", None),
+    ("main", "parquet", None),
+    ("app", "csv", "keep-last"),
+    ("main", "parquet", "keep-first"),
+]
+REPEAT_EVERY = 7
+KILL_TIMEOUT = 300
+
+
+def _options(profile):
+    return dict(PROFILES[profile]), profile != "main"
+
+
+def _keep(path, chunksize, options, duplicates):
+    if duplicates is None:
+        return None
+    return scan_duplicate_skus(path, duplicates, usecols=vendor_columns(**options), chunksize=chunksize)[0]
+
+
+def write_vendor_files(tmp, rows, seed):
+    """The synthetic vendor file, and the same with repeated SKUs."""
+    df = synthetic_vendor_frame(rows, seed)
+    path = os.path.join(tmp, "vendor.csv")
+    df.to_csv(path, index=False)
+    repeats = df.iloc[::REPEAT_EVERY].copy()
+    repeats["TAG PRICE"] = "1"
+    repeated_path = os.path.join(tmp, "vendor-repeated.csv")
+    pd.concat([df, repeats], ignore_index=True).to_csv(repeated_path, index=False)
+    return path, repeated_path
+
+
+def run_checkpointed(path, output, missing, rejected, root, chunksize, profile, output_format, duplicates=None):
+    options, required_columns = _options(profile)
+    return stream_vendor_file_checkpointed(path, output, missing, root, chunksize, required_columns=required_columns,
+                                           output_format=output_format, usecols=vendor_columns(**options),
+                                           keep=_keep(path, chunksize, options, duplicates),
+                                           rejected_output=rejected, **options)
+
+
+def _chunks_done(root):
+    for manifest in glob.glob(os.path.join(root, "*", MANIFEST)):
+        try:
+            with open(manifest) as f:
+                return len(json.load(f)["chunks"])
+        except (OSError, ValueError):
+            pass
+    return 0
+
+
+def interrupt(args, path, output, missing, rejected, root, profile, output_format, duplicates):
+    """Run in a child and SIGKILL it after ``kill_after`` chunks; returns
+    the chunks checkpointed when it died."""
+    child = subprocess.Popen([sys.executable, "-m", "benchmarks.check_checkpoint", "--run", path, output, missing,
+                              rejected, root, str(args.chunksize), profile, output_format, duplicates or ""])
+    deadline = time.monotonic() + KILL_TIMEOUT
+    while child.poll() is None and _chunks_done(root) < args.kill_after and time.monotonic() < deadline:
+        time.sleep(0.01)
+    if child.poll() is not None:
+        raise SystemExit(f"{profile}/{output_format}/{duplicates}: the run finished before it could be killed; "
+                         "use more rows or a smaller chunk size")
+    child.send_signal(signal.SIGKILL)
+    child.wait()
+    return _chunks_done(root)
+
+
+def same_file(a, b, output_format):
+    if not os.path.exists(a) or not os.path.exists(b):
+        return os.path.exists(a) == os.path.exists(b)
+    if output_format == "parquet":
+        return read_output(a, output_format).equals(read_output(b, output_format))
+    # gzip headers carry the file name and time, so compare what they hold.
+    opener = gzip.open if output_format == "csv.gz" else open
+    with opener(a, "rb") as fa, opener(b, "rb") as fb:
+        return fa.read() == fb.read()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--chunksize", type=int, default=1_000)
+    parser.add_argument("--kill-after", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--run", nargs=9, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.run:
+        path, output, missing, rejected, root, chunksize, profile, output_format, duplicates = args.run
+        run_checkpointed(path, output, missing, rejected, root, int(chunksize), profile, output_format,
+                         duplicates or None)
+        return
+
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        plain_path, repeated_path = write_vendor_files(tmp, args.rows, args.seed)
+        for profile, output_format, duplicates in CASES:
+            path = plain_path if duplicates is None else repeated_path
+            case = os.path.join(tmp, f"{profile}-{output_format}-{duplicates}")
+            os.makedirs(case)
+            expected = os.path.join(case, output_file_name("expected", output_format))
+            expected_missing = os.path.join(case, "expected_missing.csv")
+            expected_rejected = os.path.join(case, "expected_rejected.csv")
+            options, required_columns = _options(profile)
+            expected_rows, _ = stream_vendor_file(
+                path, expected, expected_missing, args.chunksize, required_columns=required_columns,
+                output_format=output_format, usecols=vendor_columns(**options),
+                keep=_keep(path, args.chunksize, options, duplicates), rejected_output=expected_rejected, **options)
+
+            output = os.path.join(case, output_file_name("resumed", output_format))
+            missing = os.path.join(case, "resumed_missing.csv")
+            rejected = os.path.join(case, "resumed_rejected.csv")
+            root = os.path.join(case, "checkpoints")
+            killed_at = interrupt(args, path, output, missing, rejected, root, profile, output_format, duplicates)
+            rows, missing_rows = run_checkpointed(path, output, missing, rejected, root, args.chunksize, profile,
+                                                  output_format, duplicates)
+
+            problems = []
+            if not expected_rows:
+                problems.append("no rows to compare")
+            if not same_file(expected, output, output_format):
+                problems.append("output differs")
+            if not same_file(expected_missing, missing, "csv"):
+                problems.append("missing-diamond file differs")
+            if not same_file(expected_rejected, rejected, "csv"):
+                problems.append("rejected file differs")
+            if rows != expected_rows:
+                problems.append(f"{rows} rows")
+            if os.listdir(root):
+                problems.append("checkpoint left behind")
+            failures += bool(problems)
+            status = "FAIL: " + ", ".join(problems) if problems else "identical"
+            print(f"{profile:>8} {output_format:>8} {duplicates or '':>10}: killed after {killed_at} chunks, "
+                  f"resumed to {rows:,} rows ({missing_rows:,} missing) - {status}")
+    print(f"\n{len(CASES) - failures}/{len(CASES)} cases match the uninterrupted run")
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Import-time check of the bulk_mapper library.
+
+    python -m benchmarks.check_import_time [--repeat 5] [--budget-ms 150]
+
+Batch jobs, mapping workers and the CLI import bulk_mapper without
+Streamlit, so their cold start is pandas plus the library. Each target
+below is imported in a fresh interpreter (best of ``--repeat``) and
+checked for:
+
+- modules it must not load: Streamlit everywhere, pandas for the light
+  entry points, and the optional readers/writers (openpyxl, xlrd,
+  pyarrow.parquet, pyarrow.csv, zstandard), which load on first use;
+- its time over a bare ``import pandas``, which must stay under
+  ``--budget-ms``.
+
+pandas 3 imports pyarrow itself, so bare ``pyarrow`` is not checked for
+targets that need pandas.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+OPTIONAL = ["openpyxl", "xlrd", "pyarrow.parquet", "pyarrow.csv", "zstandard"]
+WATCHED = ["streamlit", "pandas", "numpy", "pyarrow", *OPTIONAL]
+
+# (name, code to time, modules it must not load)
+TARGETS = [
+    ("import bulk_mapper", "import bulk_mapper", ["streamlit", "pandas", "numpy", *OPTIONAL]),
+    ("profiles + instrumentation", "import bulk_mapper.profiles, bulk_mapper.instrumentation",
+     ["streamlit", "pandas", "numpy", *OPTIONAL]),
+    ("python -m bulk_mapper --help",
+     "import contextlib, io\n"
+     "from bulk_mapper.__main__ import main\n"
+     "with contextlib.redirect_stdout(io.StringIO()), contextlib.suppress(SystemExit):\n"
+     "    main(['--help'])",
+     ["streamlit", "pandas", "numpy", *OPTIONAL]),
+    ("from bulk_mapper import map_vendor_frame", "from bulk_mapper import map_vendor_frame",
+     ["streamlit", *OPTIONAL]),
+    ("bulk_mapper.batch (CLI run / worker)", "import bulk_mapper.batch", ["streamlit", *OPTIONAL]),
+    ("bulk_mapper.incremental", "import bulk_mapper.incremental", ["streamlit", *OPTIONAL]),
+]
+BASELINE = ("import pandas", "import pandas")
+DEFAULT_BUDGET_MS = 150.0
+# Probes import the bulk_mapper of this checkout whatever the working directory.
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import sys, time, json
+start = time.perf_counter()
+{code}
+seconds = time.perf_counter() - start
+print(json.dumps({{"seconds": seconds, "loaded": [m for m in {watched!r} if m in sys.modules]}}))
+"""
+
+
+def probe(code, repeat):
+    """Best time of ``code`` in ``repeat`` fresh interpreters, and the
+    watched modules it loaded."""
+    best = None
+    for _ in range(repeat):
+        proc = subprocess.run([sys.executable, "-c", PROBE.format(code=code, watched=WATCHED)],
+                              capture_output=True, text=True, check=True, cwd=REPO_ROOT)
+        result = json.loads(proc.stdout.splitlines()[-1])
+        if best is None or result["seconds"] < best["seconds"]:
+            best = result
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help="allowed import time over a bare `import pandas`")
+    args = parser.parse_args()
+
+    baseline = probe(BASELINE[1], args.repeat)["seconds"]
+    print(f"{BASELINE[0]}: {baseline * 1000:.0f} ms\n")
+    print(f"{'target':<42} {'ms':>7} {'over pandas':>12}  loaded")
+    failures = 0
+    for name, code, forbidden in TARGETS:
+        result = probe(code, args.repeat)
+        ms = result["seconds"] * 1000
+        over = ms - (baseline * 1000 if "pandas" in result["loaded"] else 0)
+        bad = [m for m in forbidden if m in result["loaded"]]
+        problems = []
+        if bad:
+            problems.append(f"loads {', '.join(bad)}")
+        if over > args.budget_ms:
+            problems.append(f"over budget by {over - args.budget_ms:.0f} ms")
+        failures += bool(problems)
+        flag = f"  FAIL: {'; '.join(problems)}" if problems else ""
+        print(f"{name:<42} {ms:>7.0f} {over:>12.0f}  {', '.join(result['loaded']) or '-'}{flag}")
+    print(f"\n{len(TARGETS) - failures}/{len(TARGETS)} import targets within limits")
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
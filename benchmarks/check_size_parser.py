@@ -0,0 +1,67 @@
+"""Golden-file check of the column size parser against ``parse_size``.
+
+    python -m benchmarks.check_size_parser [--regenerate]
+
+benchmarks/data/size_golden.csv holds SIZE strings seen in vendor files,
+crossed with categories and both Ring rules, and the (length, width, unit,
+standard-size) that ``engine.parse_size`` returns for them. The check
+parses the whole corpus with ``parse_size_column`` and reports any row
+that differs from the golden values or from ``parse_size`` itself.
+``--regenerate`` rewrites the golden values from ``parse_size`` after the
+corpus has been edited.
+"""
+import argparse
+import os
+import sys
+
+import pandas as pd
+
+from bulk_mapper.engine import parse_size
+from bulk_mapper.size_parser import parse_size_column
+
+GOLDEN_FILE = os.path.join(os.path.dirname(__file__), "data", "size_golden.csv")
+RESULT_COLUMNS = ["size-length", "size-width", "size-unit", "standard-size"]
+
+
+def load_golden():
+    return pd.read_csv(GOLDEN_FILE, dtype=str, keep_default_na=False)
+
+
+def regenerate(golden):
+    for rule, rows in golden.groupby("ring_standard_size"):
+        for i, row in rows.iterrows():
+            golden.loc[i, RESULT_COLUMNS] = parse_size(row["size"], row["category"], rule == "True")
+    golden.to_csv(GOLDEN_FILE, index=False)
+    print(f"Rewrote {len(golden)} golden rows")
+
+
+def check(golden):
+    failures = 0
+    for rule, rows in golden.groupby("ring_standard_size"):
+        ring_standard_size = rule == "True"
+        parsed = parse_size_column(rows["size"], rows["category"], ring_standard_size)
+        for pos, (i, row) in enumerate(rows.iterrows()):
+            got = tuple(column[pos] for column in parsed)
+            expected = tuple(row[RESULT_COLUMNS])
+            reference = parse_size(row["size"], row["category"], ring_standard_size)
+            if got != expected or got != reference:
+                failures += 1
+                print(f"row {i}: {row['size']!r} / {row['category']} / ring_standard_size={rule}: "
+                      f"got {got}, golden {expected}, parse_size {reference}")
+    print(f"{len(golden) - failures}/{len(golden)} size rows match")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--regenerate", action="store_true")
+    args = parser.parse_args()
+    golden = load_golden()
+    if args.regenerate:
+        regenerate(golden)
+    else:
+        sys.exit(1 if check(golden) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Row-by-row mapping as app.py did it before the column engine.
+
+Only used by the benchmarks, as the baseline to time against and to check
+that the engine output is byte-identical.
+"""
+import pandas as pd
+
+from bulk_mapper.engine import (
+    ENHANCEMENT_COLUMNS,
+    ORIGIN_COLUMNS,
+    REQUIRED_COLUMNS,
+    STYLE_COLUMNS,
+    clean_metal,
+    detect_category,
+    format_gold_purity,
+    is_positive_number,
+    normalize_stone_type,
+    parse_size,
+)
+
+
+def legacy_process_frame(df):
+    out_df = pd.DataFrame()
+    missing_diamond_rows = []
+
+    for idx, row in df.iterrows():
+        category = detect_category(row.get("DETAILS", ""))
+        stone_type_raw = row.get("STONE TYPE", "")
+        stone_type = normalize_stone_type(stone_type_raw)
+        size_length, size_width, size_unit, standard_size = parse_size(row.get("SIZE", ""), category)
+
+        stock_type2 = row.get("STOCK TYPE2", "").strip().lower()
+        condition = "Brand New" if stock_type2 == "new" else "Excellent"
+        label = "Fast Shipping, Verified Partner"
+        if condition == "Brand New":
+            label += ", New"
+
+        record = {
+            "uid": idx + 1,
+            "sku": row.get("TAG NO", "").strip(),
+            "category": category,
+            "currency": "USD",
+            "price": row.get("TAG PRICE", "").strip(),
+            "metal": clean_metal(row.get("METAL", "")),
+            "gold-purity": format_gold_purity(row.get("METAL CARAT", "")),
+            "size-length": size_length,
+            "size-width": size_width,
+            "size-unit": size_unit,
+            "standard-size": standard_size,
+            "total-weight": row.get("METAL WT.", "").strip(),
+            "condition": condition,
+            "label": label,
+            "have_master_piece": "No",
+            "diamond_quantity": row.get("SD PCS", "").strip(),
+        }
+
+        collection_value = row.get("COLLECTION", "").strip()
+        if collection_value and category in STYLE_COLUMNS:
+            record[STYLE_COLUMNS[category]] = collection_value
+
+        if "diamond" in stone_type_raw.lower():
+            clr = row.get("CLR", "").strip()
+            ct_raw = row.get("CT", "").strip()
+            sd_wt_raw = row.get("SD WT.", "").strip()
+            if is_positive_number(ct_raw):
+                diamond_weight = ct_raw
+            elif is_positive_number(sd_wt_raw):
+                diamond_weight = sd_wt_raw
+            else:
+                diamond_weight = ""
+            if not diamond_weight:
+                missing_diamond_rows.append(row.to_dict())
+
+            fancy = "fancy" in stone_type_raw.lower()
+            record.update({
+                "diamond_carat-weight": diamond_weight,
+                "diamond_diamond-color": "Fancy" if fancy else "White",
+                "diamond_diamond-color-white-options": "" if fancy else clr,
+                "diamond_diamond-color-fancy-options": clr if fancy else "",
+                "diamond_certification": row.get("LAB", "").strip(),
+                "diamond_certification-number": row.get("CERT", "").strip(),
+                "diamond_diamond-shape": row.get("SHAPE", "").strip(),
+                "diamond_diamond-clarity": row.get("CRT", "").strip(),
+                "diamond_diamond-cut": row.get("C", "").strip(),
+                "diamond_diamond-polish": row.get("P", "").strip(),
+                "diamond_diamond-symmetry": row.get("S", "").strip(),
+                "diamond_diamond-fluoroscence": row.get("FLO", "").strip(),
+                "diamond_center-stone": "Center stone",
+                "gemstone_stone-type": "Diamond",
+            })
+        else:
+            record["diamond_carat-weight"] = row.get("SD WT.", "").strip()
+            record["diamond_center-stone"] = "Side stone"
+            record.update({
+                "gemstone_certification": row.get("LAB", "").strip(),
+                "gemstone_certification-number": row.get("CERT", "").strip(),
+                "gemstone_carat-weight": row.get("CT", "").strip(),
+                "gemstone_gem-stone-shape": row.get("SHAPE", "").strip(),
+                "gemstone_gem-stone-color": row.get("CLR", "").strip(),
+                "gemstone_stone-type": stone_type,
+                "gemstone_center-stone": "Center stone",
+            })
+            if stone_type == "Pearl":
+                record["gemstone_pearl-shape"] = row.get("SHAPE", "").strip()
+                record["gemstone_pearl-color"] = row.get("CLR", "").strip()
+
+            treatment_val = row.get("TREATMENT", "").strip()
+            if treatment_val:
+                if treatment_val.lower() == "heated":
+                    treatment_val = "Indication of heating"
+                if stone_type in ENHANCEMENT_COLUMNS:
+                    record[ENHANCEMENT_COLUMNS[stone_type]] = treatment_val
+
+            origin_val = row.get("ORIGIN", "").strip()
+            if origin_val and stone_type in ORIGIN_COLUMNS:
+                record[ORIGIN_COLUMNS[stone_type]] = origin_val
+
+        out_df = pd.concat([out_df, pd.DataFrame([record])], ignore_index=True)
+
+    for col in REQUIRED_COLUMNS:
+        if col not in out_df.columns:
+            out_df[col] = ""
+
+    return out_df[REQUIRED_COLUMNS], missing_diamond_rows
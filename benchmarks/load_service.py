@@ -0,0 +1,181 @@
+"""Load test of service.py against a local instance.
+
+    python -m benchmarks.load_service [--rows 100000] [--jobs 16] [--concurrency 8]
+                                      [--workers 4] [--endpoint jobs|convert] [--url URL]
+
+Starts ``uvicorn service:app`` on a free port (or uses ``--url``), writes
+one synthetic vendor file (benchmarks.synthetic) and has ``--concurrency``
+clients upload it ``--jobs`` times in total. Uploads are streamed with
+chunked transfer encoding. With ``--endpoint jobs`` a client polls the job
+until it is done and downloads the result; with ``convert`` the upload
+request returns the output. Meanwhile a probe calls ``GET /health`` every
+PROBE_INTERVAL seconds: since mapping runs in the service's process pool,
+the probe latency should stay in milliseconds however busy the workers are.
+
+Reports throughput, per-job latency percentiles and probe latency; exits
+1 if any job failed or a result is not the expected output.
+"""
+import argparse
+import hashlib
+import http.client
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.synthetic import write_synthetic_file
+
+PROBE_INTERVAL = 0.05
+POLL_INTERVAL = 0.05
+UPLOAD_CHUNK_BYTES = 2**16
+STARTUP_TIMEOUT = 60
+
+
+class Client:
+    def __init__(self, url):
+        parsed = urllib.parse.urlsplit(url)
+        self.host, self.port = parsed.hostname, parsed.port or 80
+
+    def request(self, method, path, body=None, headers=None):
+        """``(status, headers, body bytes)``; a file body is sent chunked."""
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=600)
+        try:
+            conn.request(method, path, body=body, headers=headers or {}, encode_chunked=body is not None)
+            response = conn.getresponse()
+            return response.status, dict(response.getheaders()), response.read()
+        finally:
+            conn.close()
+
+    def upload(self, path, endpoint, query):
+        with open(path, "rb") as f:
+            chunks = iter(lambda: f.read(UPLOAD_CHUNK_BYTES), b"")
+            return self.request("POST", f"/{endpoint}?{query}", body=chunks,
+                                headers={"Content-Type": "text/csv"})
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_service(workers):
+    port = _free_port()
+    env = dict(os.environ, BULK_MAPPER_SERVICE_WORKERS=str(workers))
+    proc = subprocess.Popen([sys.executable, "-m", "uvicorn", "service:app", "--port", str(port),
+                             "--log-level", "warning"], env=env)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        try:
+            if Client(url).request("GET", "/health")[0] == 200:
+                return proc, url
+        except OSError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise SystemExit("service did not start")
+
+
+def run_job(client, path, endpoint, query):
+    """One upload end to end: ``(seconds, output bytes or None, error)``."""
+    start = time.perf_counter()
+    status, headers, body = client.upload(path, endpoint, query)
+    if endpoint == "convert":
+        if status != 200:
+            return time.perf_counter() - start, None, body.decode(errors="replace")
+        return time.perf_counter() - start, body, None
+    if status != 202:
+        return time.perf_counter() - start, None, body.decode(errors="replace")
+    job = json.loads(body)
+    while job["status"] in ("queued", "running"):
+        time.sleep(POLL_INTERVAL)
+        job = json.loads(client.request("GET", job["status_url"])[2])
+    if job["status"] != "done":
+        return time.perf_counter() - start, None, job["error"]
+    status, _, output = client.request("GET", job["result_url"])
+    client.request("DELETE", job["status_url"])
+    return time.perf_counter() - start, output if status == 200 else None, None
+
+
+def probe(client, stop, latencies):
+    while not stop.is_set():
+        start = time.perf_counter()
+        client.request("GET", "/health")
+        latencies.append(time.perf_counter() - start)
+        stop.wait(PROBE_INTERVAL)
+
+
+def percentile(values, share):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(share * len(ordered)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="running service (default: start one locally)")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--jobs", type=int, default=16)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="service mapping processes")
+    parser.add_argument("--endpoint", choices=["jobs", "convert"], default="jobs")
+    parser.add_argument("--profile", default="app")
+    parser.add_argument("--format", default="csv")
+    args = parser.parse_args()
+
+    proc = None
+    url = args.url
+    if url is None:
+        proc, url = start_service(args.workers)
+    client = Client(url)
+    query = urllib.parse.urlencode({"profile": args.profile, "format": args.format})
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = write_synthetic_file(os.path.join(tmp, "vendor.csv"), args.rows)
+            # Warm-up: starts the service's workers and gives the expected output.
+            _, expected, error = run_job(client, path, args.endpoint, query)
+            if error:
+                raise SystemExit(f"warm-up job failed: {error}")
+            expected_md5 = hashlib.md5(expected).hexdigest()
+
+            stop, probe_latencies = threading.Event(), []
+            prober = threading.Thread(target=probe, args=(client, stop, probe_latencies))
+            prober.start()
+            start = time.perf_counter()
+            with ThreadPoolExecutor(args.concurrency) as pool:
+                results = list(pool.map(lambda _: run_job(client, path, args.endpoint, query), range(args.jobs)))
+            elapsed = time.perf_counter() - start
+            stop.set()
+            prober.join()
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+    latencies = [seconds for seconds, _, _ in results]
+    failures = [error or "unexpected output" for _, output, error in results
+                if error or output is None or hashlib.md5(output).hexdigest() != expected_md5]
+    rows = args.rows * (len(results) - len(failures))
+    print(f"{args.jobs} jobs of {args.rows:,} rows, {args.concurrency} clients, "
+          f"{args.workers if proc else '?'} workers, /{args.endpoint}")
+    print(f"wall {elapsed:.2f} s, {len(results) / elapsed:.2f} jobs/s, {rows / elapsed:,.0f} rows/s")
+    print(f"job latency   p50 {statistics.median(latencies):.2f} s  p95 {percentile(latencies, 0.95):.2f} s  "
+          f"max {max(latencies):.2f} s")
+    if probe_latencies:
+        print(f"/health       p50 {statistics.median(probe_latencies) * 1000:.1f} ms  "
+              f"p99 {percentile(probe_latencies, 0.99) * 1000:.1f} ms  "
+              f"max {max(probe_latencies) * 1000:.1f} ms  ({len(probe_latencies)} probes)")
+    for error in failures:
+        print(f"failed: {error}")
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
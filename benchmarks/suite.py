@@ -0,0 +1,249 @@
+"""Benchmark suite over synthetic vendor files, with JSON results.
+
+    python -m benchmarks.suite [--sizes 1000 10000 100000 1000000] [--cases app main ...]
+                               [--output results.json] [--compare baseline.json]
+
+Cases:
+
+- ``app``, ``dynamic``: ``process_vendor_file`` of app.py / dynamic_mapping.py
+  (read + map) and the CSV download bytes.
+- ``main``: main.py's whole-file path: read, map, write.
+- ``read_mapping``: the mapping-file parser of dynamic_mapping's vendor
+  registry (``read_mapping_pairs``) on a mapping file of ``rows`` lines
+  (mapping_template_full.csv repeated).
+- ``normalizers``: each column normalizer on the synthetic column it cleans.
+
+Besides the case's own stages, each result carries the pipeline's
+top-level stages from bulk_mapper.instrumentation (read, map, build,
+write, ...).
+
+Vendor files come from benchmarks.synthetic, one per size. Every case and
+size runs in a fresh process, so its peak resident set is its own and no
+cache carries over. Results go to benchmarks/results/<commit>.json (git
+ignored) with the commit and library versions; ``--compare`` prints the
+rows/sec ratio against an earlier results file and flags cases slower by
+more than ``--tolerance``.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic import write_synthetic_file
+
+CASES = ["app", "dynamic", "main", "read_mapping", "normalizers"]
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+MAPPING_TEMPLATE = "mapping_template_full.csv"
+
+
+class Stages:
+    """Wall time per named stage, in the order the stages ran."""
+
+    def __init__(self):
+        self.seconds = {}
+
+    def run(self, name, func, *args, **kwargs):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        self.seconds[name] = self.seconds.get(name, 0.0) + time.perf_counter() - start
+        return result
+
+
+def _quiet_streamlit():
+    # The apps run their UI code on import; outside `streamlit run` every
+    # call logs a bare-mode warning.
+    import streamlit.logger
+
+    streamlit.logger.set_log_level("error")
+
+
+def run_app(path, rows, tmp, stages):
+    _quiet_streamlit()
+    import app
+    from bulk_mapper.writers import frame_bytes
+
+    out_df, _ = stages.run("process", app.process_vendor_file, path)
+    stages.run("write", frame_bytes, out_df)
+
+
+def run_dynamic(path, rows, tmp, stages):
+    _quiet_streamlit()
+    import dynamic_mapping
+    from bulk_mapper.engine import EXPECTED_VENDOR_FIELDS
+    from bulk_mapper.writers import frame_bytes
+
+    # Synthetic files use the expected field names, so the identity mapping.
+    mapping_dict = {field: field for field in EXPECTED_VENDOR_FIELDS}
+    out_df, _ = stages.run("process", dynamic_mapping.process_vendor_file, path, mapping_dict)
+    stages.run("write", frame_bytes, out_df)
+
+
+def run_main(path, rows, tmp, stages):
+    import main
+    from bulk_mapper.parallel import map_vendor_frame_parallel
+    from bulk_mapper.reader import read_vendor_file
+    from bulk_mapper.writers import output_file_name, write_frame
+
+    df = stages.run("read", read_vendor_file, path, main.VENDOR_COLUMNS)
+    out_df, _ = stages.run("map", map_vendor_frame_parallel, df, main.WORKERS, compact=True, **main.MAPPING_OPTIONS)
+    output = os.path.join(tmp, output_file_name("gemgem_upload", main.OUTPUT_FORMAT))
+    stages.run("write", write_frame, out_df, output, main.OUTPUT_FORMAT)
+
+
+def run_read_mapping(path, rows, tmp, stages):
+    from bulk_mapper.reader import read_mapping_pairs
+
+    template = pd.read_csv(MAPPING_TEMPLATE, dtype=str)
+    mapping_path = os.path.join(tmp, "mapping.csv")
+    repeats = -(-rows // len(template))
+    pd.concat([template] * repeats, ignore_index=True).iloc[:rows].to_csv(mapping_path, index=False)
+    stages.run("load", read_mapping_pairs, mapping_path)
+
+
+def run_normalizers(path, rows, tmp, stages):
+    from bulk_mapper.engine import (
+        clean_metal_column,
+        detect_category_column,
+        format_gold_purity_column,
+        normalize_stone_type_column,
+    )
+    from bulk_mapper.reader import read_vendor_file
+    from bulk_mapper.size_parser import parse_size_column
+
+    df = read_vendor_file(path)
+    stages.run("clean_metal", clean_metal_column, df["METAL"])
+    stages.run("gold_purity", format_gold_purity_column, df["METAL CARAT"])
+    categories = pd.Series(stages.run("category", detect_category_column, df["DETAILS"]), index=df.index)
+    stages.run("stone_type", normalize_stone_type_column, df["STONE TYPE"])
+    stages.run("size", parse_size_column, df["SIZE"], categories)
+
+
+RUNNERS = {
+    "app": run_app,
+    "dynamic": run_dynamic,
+    "main": run_main,
+    "read_mapping": run_read_mapping,
+    "normalizers": run_normalizers,
+}
+
+
+def run_case(case, path, rows):
+    """Run one case in this process and print its result as JSON."""
+    from bulk_mapper.instrumentation import instrumented
+
+    stages = Stages()
+    with tempfile.TemporaryDirectory() as tmp, instrumented(True) as run:
+        RUNNERS[case](path, rows, tmp, stages)
+    seconds = sum(stages.seconds.values())
+    pipeline = {s["stage"]: s["seconds"] for s in run.report()["stages"] if "/" not in s["stage"]}
+    print(json.dumps({
+        "case": case,
+        "rows": rows,
+        "seconds": seconds,
+        "rows_per_sec": rows / seconds if seconds else None,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2**10,
+        "stages": stages.seconds,
+        "pipeline_stages": pipeline,
+    }))
+
+
+def _git(*args):
+    try:
+        return subprocess.run(["git", *args], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def environment():
+    versions = {"python": platform.python_version(), "pandas": pd.__version__}
+    for name in ("numpy", "pyarrow", "streamlit"):
+        try:
+            versions[name] = __import__(name).__version__
+        except ImportError:
+            versions[name] = None
+    return {
+        "commit": _git("rev-parse", "--short", "HEAD"),
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "date": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "versions": versions,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Print rows/sec against ``baseline``; returns the regressed (case, rows)."""
+    before = {(r["case"], r["rows"]): r for r in baseline["results"]}
+    regressions = []
+    print(f"\nagainst {baseline['environment'].get('commit') or 'baseline'}:")
+    print(f"{'case':>16} {'rows':>9} {'before r/s':>11} {'after r/s':>11} {'ratio':>7}")
+    for result in results:
+        old = before.get((result["case"], result["rows"]))
+        if not old or not old["rows_per_sec"] or not result["rows_per_sec"]:
+            continue
+        ratio = result["rows_per_sec"] / old["rows_per_sec"]
+        flag = "  REGRESSION" if ratio < 1 - tolerance else ""
+        if flag:
+            regressions.append((result["case"], result["rows"]))
+        print(f"{result['case']:>16} {result['rows']:>9} {old['rows_per_sec']:>11,.0f} "
+              f"{result['rows_per_sec']:>11,.0f} {ratio:>6.2f}x{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=CASES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="results file (default benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", metavar="BASELINE", help="earlier results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="rows/sec drop reported as a regression")
+    parser.add_argument("--run", nargs=3, metavar=("CASE", "PATH", "ROWS"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.run:
+        case, path, rows = args.run
+        run_case(case, path, int(rows))
+        return
+
+    env = environment()
+    results = []
+    print(f"{'case':>16} {'rows':>9} {'seconds':>9} {'rows/sec':>11} {'peak MB':>8}  stages")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.sizes:
+            path = write_synthetic_file(os.path.join(tmp, f"vendor_{rows}.csv"), rows, args.seed)
+            for case in args.cases:
+                proc = subprocess.run([sys.executable, "-m", "benchmarks.suite", "--run", case, path, str(rows)],
+                                      capture_output=True, text=True)
+                if proc.returncode:
+                    sys.stderr.write(proc.stderr)
+                    raise SystemExit(f"{case} at {rows} rows failed")
+                result = json.loads(proc.stdout.splitlines()[-1])
+                results.append(result)
+                stage_text = " ".join(f"{name}={s:.2f}" for name, s in result["stages"].items())
+                print(f"{case:>16} {rows:>9} {result['seconds']:>9.2f} {result['rows_per_sec']:>11,.0f} "
+                      f"{result['peak_rss_mb']:>8.0f}  {stage_text}")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{env['commit'] or 'results'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({"environment": env, "seed": args.seed, "results": results}, f, indent=2)
+    print(f"\nresults saved to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
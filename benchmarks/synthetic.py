@@ -0,0 +1,156 @@
+"""Synthetic vendor files with realistic value distributions.
+
+    python -m benchmarks.synthetic --rows 100000 --output vendor.csv [--seed 0]
+
+test.csv only has 21 rows, so tiling it gives 21 distinct rows however
+large the file. The generator keeps test.csv's columns and draws the
+columns the mapping branches on from weighted vocabularies: STONE TYPE
+(mostly diamonds, with coloured stones, pearls and unknown types), DETAILS
+(every category keyword plus ones that fall through to Others), SIZE in
+the formats of benchmarks/data/size_golden.csv, and CT / SD WT. with
+zeros and blanks, which drive the missing-diamond report. TAG NOs are
+unique, prices and metal weights vary per row. test.csv has no TAG PRICE,
+which the app profile prices from, so the generator adds one: the sale
+price marked up to retail.
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_vectorized import tiled_frame
+
+SIZE_GOLDEN_FILE = os.path.join(os.path.dirname(__file__), "data", "size_golden.csv")
+
+STONE_TYPE_WEIGHTS = {
+    "Diamond-NONE": 0.45,
+    "Diamond": 0.10,
+    "Diamond - Fancy Color-NONE": 0.03,
+    "Sapphire": 0.07,
+    "Blue Sapphire": 0.04,
+    "Ruby": 0.06,
+    "Emerald": 0.05,
+    "Padparadscha Sapphire": 0.01,
+    "Pearl": 0.07,
+    "Jade": 0.03,
+    "Tourmaline": 0.02,
+    "Aquamarine": 0.02,
+    "Chrysoberyl": 0.01,
+    "Multi-Gemstone": 0.03,
+    "": 0.01,
+}
+DETAILS_WEIGHTS = {
+    "Ring": 0.25,
+    "Earring Pair": 0.15,
+    "Earring": 0.03,
+    "Necklace (Studded)": 0.08,
+    "Necklace (Chain)": 0.04,
+    "Pendant": 0.12,
+    "Bracelet": 0.12,
+    "Bangle": 0.06,
+    "Brooch": 0.03,
+    "Neck-Pndt": 0.03,
+    "Accessories": 0.02,
+    "Cufflinks": 0.02,
+    "": 0.05,
+}
+METAL_WEIGHTS = {
+    ("18K White Gold", "18K"): 0.45,
+    ("18K Yellow Gold", "18K"): 0.15,
+    ("18K Rose Gold", "18K"): 0.08,
+    ("18K White & Yellow Gold", "18K"): 0.07,
+    ("14K White Gold", "14K"): 0.10,
+    ("22K Yellow Gold", "22K"): 0.05,
+    ("Platinum", "PT950"): 0.05,
+    ("Silver", ""): 0.05,
+}
+CONDITION_WEIGHTS = {"New": 0.7, "Second Hand": 0.3}
+LAB_WEIGHTS = {"NONE": 0.75, "GIA": 0.1, "GRS": 0.06, "GFCO": 0.05, "IGI": 0.04}
+SHAPE_WEIGHTS = {"Round": 0.55, "Oval": 0.15, "Pear": 0.08, "Cushion": 0.08, "Emerald": 0.06, "": 0.08}
+
+# Share of rows whose SIZE is filled in; the rest are blank, as in test.csv.
+SIZE_FILLED_SHARE = 0.45
+# Diamond rows with a zero CT (side stones only) or a blank one.
+ZERO_CT_SHARE = 0.35
+BLANK_CT_SHARE = 0.05
+# Rows without side stones, and rows whose SD WT. is left blank.
+ZERO_SD_WT_SHARE = 0.5
+BLANK_SD_WT_SHARE = 0.05
+# TAG PRICE over gem gem sale price.
+TAG_PRICE_MARKUP = 2
+
+
+def _choice(rng, weights, rows):
+    values = list(weights)
+    p = np.asarray(list(weights.values()), dtype=float)
+    picks = rng.choice(len(values), size=rows, p=p / p.sum())
+    return np.asarray(values, dtype=object)[picks]
+
+
+def _decimals(values, places=2):
+    return np.char.mod(f"%.{places}f", values).astype(object)
+
+
+def synthetic_vendor_frame(rows, seed=0):
+    """``rows`` vendor rows with test.csv's columns and TAG PRICE, all ``str``."""
+    rng = np.random.default_rng(seed)
+    df = tiled_frame(rows)
+
+    stone = _choice(rng, STONE_TYPE_WEIGHTS, rows)
+    diamond = np.char.find(np.char.lower(stone.astype(str)), "diamond") >= 0
+    df["STONE TYPE"] = stone
+    df["DETAILS"] = _choice(rng, DETAILS_WEIGHTS, rows)
+    metals = _choice(rng, METAL_WEIGHTS, rows)
+    df["METAL"] = [metal for metal, _ in metals]
+    df["METAL CARAT"] = [carat for _, carat in metals]
+    df["STOCK TYPE2"] = _choice(rng, CONDITION_WEIGHTS, rows)
+    df["LAB"] = _choice(rng, LAB_WEIGHTS, rows)
+    df["SHAPE"] = _choice(rng, SHAPE_WEIGHTS, rows)
+
+    sizes = pd.read_csv(SIZE_GOLDEN_FILE, dtype=str, keep_default_na=False)["size"].unique()
+    size = rng.choice(sizes, size=rows).astype(object)
+    size[rng.random(rows) >= SIZE_FILLED_SHARE] = ""
+    df["SIZE"] = size
+
+    # Centre stones: diamonds under a few carats, coloured stones up to ~30.
+    ct = np.where(diamond, rng.gamma(1.5, 0.5, rows), rng.gamma(2.0, 2.5, rows))
+    ct = _decimals(ct)
+    draw = rng.random(rows)
+    ct[diamond & (draw < ZERO_CT_SHARE)] = "0.00"
+    ct[draw >= 1 - BLANK_CT_SHARE] = ""
+    df["CT"] = ct
+
+    sd_wt = _decimals(rng.gamma(1.2, 0.6, rows))
+    draw = rng.random(rows)
+    no_side_stones = draw < ZERO_SD_WT_SHARE
+    sd_wt[no_side_stones] = "0"
+    sd_wt[draw >= 1 - BLANK_SD_WT_SHARE] = ""
+    df["SD WT."] = sd_wt
+    df["SD PCS"] = np.where(no_side_stones, 0, rng.integers(1, 300, rows)).astype(str).astype(object)
+
+    df["METAL WT."] = _decimals(rng.gamma(2.0, 4.0, rows))
+    sale_price = rng.integers(300, 50_000, rows)
+    df["gem gem sale price"] = sale_price.astype(str).astype(object)
+    df["TAG PRICE"] = (sale_price * TAG_PRICE_MARKUP).astype(str).astype(object)
+    df["TAG NO"] = np.char.add("SYN", np.arange(1, rows + 1).astype(str)).astype(object)
+    return df
+
+
+def write_synthetic_file(path, rows, seed=0):
+    synthetic_vendor_frame(rows, seed).to_csv(path, index=False)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--output", default="synthetic_vendor.csv")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    write_synthetic_file(args.output, args.rows, args.seed)
+    print(f"{args.rows:,} rows written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
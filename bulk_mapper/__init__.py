@@ -0,0 +1,49 @@
+"""Vendor CSV → GemGem bulk upload mapping engine.
+
+Only ``bulk_mapper.ui``, the pieces app.py and dynamic_mapping.py share,
+imports Streamlit: batch jobs, worker processes and the CLI
+(``python -m bulk_mapper``) import the rest directly. The names below are
+resolved on first use, so ``import bulk_mapper`` and its light modules
+(profiles, instrumentation) do not load pandas; pyarrow, openpyxl and
+zstandard are only imported by the reader or writer that needs them.
+"""
+import importlib
+
+_EXPORTS = {
+    "CATEGORY_MAP": "engine",
+    "DEFAULT_CATEGORY": "engine",
+    "EXPECTED_VENDOR_FIELDS": "engine",
+    "REQUIRED_COLUMNS": "engine",
+    "clean_metal": "engine",
+    "detect_category": "engine",
+    "format_gold_purity": "engine",
+    "map_vendor_frame": "engine",
+    "normalize_stone_type": "engine",
+    "parse_size": "engine",
+    "vendor_columns": "engine",
+    "map_vendor_frame_parallel": "parallel",
+    "PROFILES": "profiles",
+    "read_field_map": "reader",
+    "read_vendor_file": "reader",
+    "sheet_names": "reader",
+    "stream_vendor_file": "streaming",
+    "frame_bytes": "writers",
+    "write_frame": "writers",
+    "VendorRegistry": "vendor_registry",
+    "validate_frame": "validation",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f"{__name__}.{module}"), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,97 @@
+"""Headless batch runner: map many vendor files to GemGem bulk uploads.
+
+    python -m bulk_mapper VENDOR_FILE_OR_DIR_OR_ZIP_OR_GLOB ... -o OUTPUT_DIR
+        [--jobs N] [--profile app|main|dynamic] [--mapping FILE] [--mapping-dir DIR]
+        [--format csv|csv.gz|csv.zst|parquet] [--chunksize ROWS [--checkpoint-dir DIR]] [--timings]
+        [--duplicates keep-all|keep-first|keep-last|error] [--sku-index FILE] [--validate]
+
+See bulk_mapper.batch for how inputs and mapping files are found. A line
+is printed per vendor as it finishes, then the totals; summary.json in
+the output directory has every vendor's result. The exit status is 1 when
+any vendor failed, or with ``--duplicates error`` when vendors share SKUs.
+"""
+import argparse
+import json
+import os
+import sys
+
+from bulk_mapper.profiles import DEFAULT_BATCH_PROFILE, DEFAULT_DUPLICATE_POLICY, DUPLICATE_POLICIES, PROFILES
+from bulk_mapper.writers import DEFAULT_OUTPUT_FORMAT, OUTPUT_FORMATS
+
+SUMMARY_FILE = "summary.json"
+
+
+def print_result(result):
+    if result["error"]:
+        print(f"✗ {result['vendor']:<30} FAILED  {result['error']}", flush=True)
+        return
+    rate = result["rows"] / result["seconds"] if result["seconds"] else 0
+    missing = f"  {result['missing_rows']:,} missing diamond weights" if result["missing_rows"] else ""
+    duplicates = f"  {result['duplicate_rows']:,} rows with repeated SKUs" if result["duplicate_rows"] else ""
+    rejected = f"  {result['rejected_rows']:,} rows rejected" if result["rejected_rows"] else ""
+    print(f"✓ {result['vendor']:<30} {result['rows']:>10,} rows {result['seconds']:>7.2f} s "
+          f"{rate:>10,.0f} rows/s{missing}{duplicates}{rejected}", flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bulk_mapper", description=__doc__.splitlines()[0])
+    parser.add_argument("inputs", nargs="+", help="vendor files, directories, zip archives or glob patterns")
+    parser.add_argument("-o", "--output-dir", required=True)
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default=DEFAULT_BATCH_PROFILE,
+                        help="mapping profile of vendors without a mapping file")
+    parser.add_argument("--mapping", help="mapping file for vendors without their own")
+    parser.add_argument("--mapping-dir", help="directory of <vendor>.mapping.csv/.xlsx files")
+    parser.add_argument("--format", choices=list(OUTPUT_FORMATS), default=DEFAULT_OUTPUT_FORMAT)
+    parser.add_argument("--chunksize", type=int, default=None, help="stream each vendor file in chunks of ROWS")
+    parser.add_argument("--checkpoint-dir",
+                        help="with --chunksize, keep finished chunks here so a rerun resumes interrupted vendors")
+    parser.add_argument("--timings", action="store_true", help="write a timing report next to each output")
+    parser.add_argument("--duplicates", choices=DUPLICATE_POLICIES, default=DEFAULT_DUPLICATE_POLICY,
+                        help="rows whose TAG NO repeats in a file: map them all, keep the first or the last, "
+                             "or fail the vendor (all report them in <vendor>.duplicate_skus.csv)")
+    parser.add_argument("--sku-index", metavar="FILE",
+                        help="SQLite file of every vendor's SKUs, kept across runs; SKUs found under another "
+                             "vendor are reported in vendor_conflicts.csv")
+    parser.add_argument("--validate", action="store_true",
+                        help="move the rows GemGem would reject (empty SKU, bad price, ...) from the upload "
+                             "to <vendor>.rejected_rows.csv; off by default, every mapped row is uploaded")
+    args = parser.parse_args(argv)
+    if args.checkpoint_dir and not args.chunksize:
+        parser.error("--checkpoint-dir needs --chunksize")
+    # Imported once the arguments parse, so --help and usage errors do not
+    # wait for pandas.
+    from bulk_mapper.batch import VENDOR_CONFLICTS_FILE, collect_vendors, run_batch
+
+    try:
+        vendors = collect_vendors(args.inputs, args.mapping_dir, args.mapping)
+    except FileNotFoundError as exc:
+        parser.error(str(exc))
+    if not vendors:
+        parser.error("no vendor files found")
+
+    results, summary = run_batch(
+        vendors, args.output_dir, args.jobs, on_result=print_result,
+        profile=args.profile, output_format=args.format, chunksize=args.chunksize, timings=args.timings,
+        checkpoint_root=args.checkpoint_dir, duplicates=args.duplicates, sku_index=args.sku_index,
+        validate=args.validate,
+    )
+    with open(os.path.join(args.output_dir, SUMMARY_FILE), "w") as f:
+        json.dump({"summary": summary, "vendors": results}, f, indent=2)
+
+    print(f"\n{summary['succeeded']}/{summary['vendors']} vendors mapped, {summary['rows']:,} rows in "
+          f"{summary['seconds']:.2f} s ({summary['rows_per_sec'] or 0:,.0f} rows/s, {summary['jobs']} jobs)")
+    if summary["rejected_rows"]:
+        print(f"{summary['rejected_rows']:,} rows held back from the uploads, see the <vendor>.rejected_rows.csv files")
+    if summary["vendor_conflicts"]:
+        print(f"{summary['vendor_conflicts']:,} SKUs also belong to another vendor, see "
+              f"{os.path.join(args.output_dir, VENDOR_CONFLICTS_FILE)}")
+    for result in results:
+        if result["error"]:
+            print(f"failed: {result['vendor']} ({result['source']}): {result['error']}", file=sys.stderr)
+    shared_skus = args.duplicates == "error" and summary["vendor_conflicts"]
+    return 1 if summary["failed"] or shared_skus else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
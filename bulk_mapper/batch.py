@@ -0,0 +1,357 @@
+"""Map many vendor files in one run.
+
+Inputs are files, directories (every vendor file in them), glob patterns
+and zip archives (every vendor file inside). A vendor file is a CSV or
+Excel workbook; its name without the extension names the vendor and its
+outputs. Each worksheet of a workbook with several is a vendor of its
+own, named ``<file>-<sheet>``, so the sheets are mapped in parallel like
+separate files. Files named ``<vendor>.mapping.csv`` / ``.xlsx`` are mapping
+files, not vendors: a vendor uses the mapping file next to it (in the same
+directory or archive), else the one in ``mapping_dir``, else the default
+mapping. With a mapping file the vendor is mapped with the ``dynamic``
+profile and that field map, as dynamic_mapping.py does; without one, with
+the chosen profile.
+
+Repeated SKUs (TAG NO) in a vendor file are handled by the duplicate
+policy (see ``dedup``) and reported in ``<vendor>.duplicate_skus.csv``.
+With a SKU index, the SKUs of every mapped vendor are checked against
+the other vendors' once the batch is done, in input order, and the
+matches are written to ``vendor_conflicts.csv``.
+
+Vendors are mapped in a process pool, one vendor per task. Each writes
+``<vendor>.gemgem_upload.<ext>`` and, when it has any,
+``<vendor>.missing_diamond_weight.csv`` to the output directory. With
+``validate``, output rows GemGem would reject (see ``validation``) are
+held back from the upload and written to ``<vendor>.rejected_rows.csv``
+with the reasons; by default every mapped row is uploaded. A vendor that
+fails is reported and does not stop the others.
+"""
+import glob
+import io
+import os
+import time
+import traceback
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from bulk_mapper.dedup import (
+    DEFAULT_DUPLICATE_POLICY,
+    VENDOR_CONFLICT_COLUMNS,
+    DuplicateSkuError,
+    SkuIndex,
+    drop_duplicate_skus,
+    scan_duplicate_skus,
+)
+from bulk_mapper.engine import map_vendor_frame, vendor_columns
+from bulk_mapper.instrumentation import instrumented, report_path
+from bulk_mapper.profiles import DEFAULT_BATCH_PROFILE, PROFILES
+from bulk_mapper.reader import read_field_map, read_vendor_file, sheet_names
+from bulk_mapper.streaming import stream_vendor_file
+from bulk_mapper.validation import validate_frame
+from bulk_mapper.writers import DEFAULT_OUTPUT_FORMAT, output_file_name, read_output, write_frame
+
+VENDOR_EXTENSIONS = (".csv", ".xlsx", ".xls")
+WORKBOOK_EXTENSIONS = (".xlsx", ".xls")
+MAPPING_SUFFIX = ".mapping"
+VENDOR_CONFLICTS_FILE = "vendor_conflicts.csv"
+
+
+class VendorSource:
+    """A vendor (or mapping) file: a path, or a member of a zip archive;
+    ``sheet`` is the worksheet of a workbook, None for the first one."""
+
+    def __init__(self, name, path, member=None, mapping=None, sheet=None):
+        self.name = name
+        self.path = path
+        self.member = member
+        self.mapping = mapping
+        self.sheet = sheet
+
+    def __repr__(self):
+        source = f"{self.path}:{self.member}" if self.member else self.path
+        return f"{source}[{self.sheet}]" if self.sheet is not None else source
+
+    def open(self):
+        """A path or a seekable in-memory copy of the archive member."""
+        if self.member is None:
+            return self.path
+        with zipfile.ZipFile(self.path) as archive:
+            return io.BytesIO(archive.read(self.member))
+
+
+def _split_name(filename):
+    """``(stem, is_mapping)`` for a vendor or mapping file name, None otherwise."""
+    stem, ext = os.path.splitext(os.path.basename(filename))
+    if ext.lower() not in VENDOR_EXTENSIONS:
+        return None
+    if stem.lower().endswith(MAPPING_SUFFIX):
+        return stem[:-len(MAPPING_SUFFIX)], True
+    return stem, False
+
+
+def _is_archive(path):
+    """A zip archive of vendor files; an XLSX workbook is a zip file too."""
+    return zipfile.is_zipfile(path) and not os.path.isdir(path) and _split_name(path) is None
+
+
+def _container_files(path):
+    """``[(name, member)]`` of the files in a directory (member None) or a zip."""
+    if _is_archive(path):
+        with zipfile.ZipFile(path) as archive:
+            return [(member, member) for member in archive.namelist() if not member.endswith("/")]
+    if os.path.isdir(path):
+        return [(os.path.join(path, name), None) for name in sorted(os.listdir(path))
+                if os.path.isfile(os.path.join(path, name))]
+    return [(path, None)]
+
+
+def _expand(inputs):
+    """Input paths with globs expanded, in the order given."""
+    paths = []
+    for item in inputs:
+        matches = sorted(glob.glob(item, recursive=True)) if any(c in item for c in "*?[") else [item]
+        if not matches:
+            raise FileNotFoundError(f"No files match {item!r}")
+        paths.extend(matches)
+    return paths
+
+
+def _mapping_in_dir(mapping_dir, stem):
+    for ext in VENDOR_EXTENSIONS:
+        candidate = os.path.join(mapping_dir, stem + MAPPING_SUFFIX + ext)
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+
+def _sheets(source, filename):
+    """Worksheet names of a workbook with several, else ``[None]``."""
+    if not filename.lower().endswith(WORKBOOK_EXTENSIONS):
+        return [None]
+    names = sheet_names(source.open()) or []
+    return names if len(names) > 1 else [None]
+
+
+def collect_vendors(inputs, mapping_dir=None, default_mapping=None):
+    """``VendorSource`` per vendor file (or worksheet) found in ``inputs``,
+    with its mapping file resolved. Vendor names are made unique with a
+    ``-2``, ``-3``... suffix."""
+    vendors = []
+    seen = {}
+    for path in _expand(inputs):
+        if not os.path.exists(path):
+            raise FileNotFoundError(path)
+        is_archive = _is_archive(path)
+        container = os.path.splitext(os.path.basename(path))[0] if is_archive else None
+        files = _container_files(path)
+        mappings = {}
+        found = []
+        for name, member in files:
+            split = _split_name(name)
+            if split is None:
+                continue
+            stem, is_mapping = split
+            if is_mapping:
+                mappings[stem] = VendorSource(stem, path if is_archive else name, member)
+            else:
+                found.append((stem, name, member))
+        for stem, name, member in found:
+            mapping = mappings.get(stem)
+            if mapping is None and mapping_dir:
+                mapping = _mapping_in_dir(mapping_dir, stem)
+            if mapping is None:
+                mapping = default_mapping
+            source = VendorSource(f"{container}-{stem}" if container else stem, path if is_archive else name,
+                                  member, mapping)
+            for sheet in _sheets(source, name):
+                vendor = source.name if sheet is None else f"{source.name}-{sheet}"
+                seen[vendor] = seen.get(vendor, 0) + 1
+                if seen[vendor] > 1:
+                    vendor = f"{vendor}-{seen[vendor]}"
+                vendors.append(VendorSource(vendor, source.path, member, mapping, sheet))
+    return vendors
+
+
+def _load_mapping(mapping):
+    if mapping is None:
+        return None
+    return read_field_map(mapping.open() if isinstance(mapping, VendorSource) else mapping)
+
+
+def _write_conflicts(conflicts, path, result):
+    if len(conflicts):
+        conflicts.to_csv(path, index=False)
+        result.update(duplicate_rows=len(conflicts), conflicts_output=path)
+
+
+def _csv_rows(path):
+    """Data rows of a CSV, 0 when it does not exist."""
+    if not os.path.exists(path):
+        return 0
+    return len(pd.read_csv(path, usecols=[0], dtype=str, keep_default_na=False))
+
+
+def process_vendor(vendor, output_dir, profile=DEFAULT_BATCH_PROFILE, output_format=DEFAULT_OUTPUT_FORMAT,
+                   chunksize=None, timings=False, checkpoint_root=None, duplicates=DEFAULT_DUPLICATE_POLICY,
+                   validate=False):
+    """Map one vendor into ``output_dir``; returns its result dict (see
+    ``run_batch``). Errors are caught and reported in ``error``. With a
+    ``chunksize``, ``checkpoint_root`` makes the vendor resumable (see
+    ``checkpoint``). ``duplicates`` is the repeated-SKU policy;
+    ``validate`` moves the rows GemGem would reject to the rejected-rows
+    report instead of the upload."""
+    result = {
+        "vendor": vendor.name,
+        "source": repr(vendor),
+        "mapping": str(vendor.mapping) if vendor.mapping is not None else None,
+        "rows": 0,
+        "missing_rows": 0,
+        "duplicate_rows": 0,
+        "rejected_rows": 0,
+        "seconds": 0.0,
+        "output": None,
+        "missing_output": None,
+        "conflicts_output": None,
+        "rejected_output": None,
+        "error": None,
+    }
+    start = time.perf_counter()
+    output = os.path.join(output_dir, output_file_name(f"{vendor.name}.gemgem_upload", output_format))
+    missing_output = os.path.join(output_dir, f"{vendor.name}.missing_diamond_weight.csv")
+    conflicts_output = os.path.join(output_dir, f"{vendor.name}.duplicate_skus.csv")
+    rejected_output = os.path.join(output_dir, f"{vendor.name}.rejected_rows.csv")
+    # Reports are only written when they have rows, so a previous run's
+    # would otherwise be left next to this run's upload (and the streaming
+    # path counts the rejected rows from its file).
+    for path in (missing_output, conflicts_output, rejected_output):
+        if os.path.exists(path):
+            os.remove(path)
+    try:
+        with instrumented(timings or None) as run:
+            field_map = _load_mapping(vendor.mapping)
+            if field_map is None:
+                options = dict(PROFILES[profile])
+            else:
+                options = dict(PROFILES["dynamic"], field_map=field_map)
+            usecols = vendor_columns(**options)
+            # main.py writes the columns in first-written order.
+            required_columns = field_map is not None or profile != "main"
+            source = vendor.open()
+            if chunksize:
+                keep, conflicts = scan_duplicate_skus(source, duplicates, field_map, usecols, chunksize, vendor.sheet)
+                _write_conflicts(conflicts, conflicts_output, result)
+                rows, missing_rows = stream_vendor_file(source, output, missing_output, chunksize,
+                                                        required_columns=required_columns,
+                                                        output_format=output_format, usecols=usecols,
+                                                        checkpoint_root=checkpoint_root, keep=keep,
+                                                        rejected_output=rejected_output if validate else None,
+                                                        sheet=vendor.sheet, **options)
+                rejected_rows = _csv_rows(rejected_output)
+            else:
+                df, conflicts = drop_duplicate_skus(read_vendor_file(source, usecols, sheet=vendor.sheet), duplicates,
+                                                    field_map)
+                _write_conflicts(conflicts, conflicts_output, result)
+                out_df, missing_df = map_vendor_frame(df, required_columns=required_columns, compact=True,
+                                                      **options)
+                rejected_rows = 0
+                if validate:
+                    out_df, rejected = validate_frame(out_df)
+                    if len(rejected):
+                        rejected.to_csv(rejected_output, index=False)
+                    rejected_rows = len(rejected)
+                write_frame(out_df, output, output_format)
+                if len(missing_df):
+                    missing_df.to_csv(missing_output, index=False)
+                rows, missing_rows = len(out_df), len(missing_df)
+        if run:
+            run.write_report(report_path(output))
+        result.update(rows=rows, missing_rows=missing_rows, rejected_rows=rejected_rows, output=output,
+                      missing_output=missing_output if missing_rows else None,
+                      rejected_output=rejected_output if rejected_rows else None)
+    except DuplicateSkuError as exc:
+        _write_conflicts(exc.conflicts, conflicts_output, result)
+        result["error"] = f"{type(exc).__name__}: {exc}"
+    except Exception as exc:
+        result["error"] = f"{type(exc).__name__}: {exc}"
+        result["traceback"] = traceback.format_exc()
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def check_vendor_skus(results, index_path, output_dir, output_format=DEFAULT_OUTPUT_FORMAT):
+    """Record each mapped vendor's SKUs in the ``SkuIndex`` at
+    ``index_path``, in input order; returns the SKUs other vendors have
+    too, which are also written to VENDOR_CONFLICTS_FILE when there are any.
+    A SKU two vendors of the batch share is reported once, under the
+    later one. Entries from earlier runs are replaced for the vendors
+    mapped now; a vendor that failed keeps those of its last upload."""
+    mapped = [result for result in results if result["error"] is None]
+    index = SkuIndex(index_path)
+    try:
+        index.forget(result["vendor"] for result in mapped)
+        found = []
+        for result in mapped:
+            out = read_output(result["output"], output_format, columns=["uid", "sku"])
+            found.append(index.replace(result["vendor"], out["sku"], out["uid"]))
+    finally:
+        index.close()
+    conflicts = pd.concat(found, ignore_index=True) if found else pd.DataFrame(columns=VENDOR_CONFLICT_COLUMNS)
+    if len(conflicts):
+        conflicts.to_csv(os.path.join(output_dir, VENDOR_CONFLICTS_FILE), index=False)
+    return conflicts
+
+
+def run_batch(vendors, output_dir, jobs=None, on_result=None, sku_index=None, **options):
+    """Map ``vendors`` into ``output_dir`` with ``jobs`` processes (all
+    cores by default; 1 maps in this process). ``options`` are those of
+    ``process_vendor``; ``on_result`` is called with each result as it
+    finishes. ``sku_index`` is the path of a ``dedup.SkuIndex`` to check
+    the vendors' SKUs against each other (see ``check_vendor_skus``).
+    Returns ``(results, summary)``, results in input order.
+
+    A result has the vendor name, source, mapping, rows (written to the
+    upload), missing_rows, duplicate_rows (rows whose SKU repeats),
+    rejected_rows (held back by validation), seconds, output paths and
+    ``error`` (None on success).
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = min(jobs or os.cpu_count() or 1, max(len(vendors), 1))
+    start = time.perf_counter()
+    results = [None] * len(vendors)
+    if jobs <= 1:
+        for i, vendor in enumerate(vendors):
+            results[i] = process_vendor(vendor, output_dir, **options)
+            if on_result:
+                on_result(results[i])
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = {pool.submit(process_vendor, vendor, output_dir, **options): i
+                       for i, vendor in enumerate(vendors)}
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+                if on_result:
+                    on_result(future.result())
+    vendor_conflicts = None
+    if sku_index is not None:
+        vendor_conflicts = check_vendor_skus(results, sku_index, output_dir,
+                                             options.get("output_format", DEFAULT_OUTPUT_FORMAT))
+    elapsed = time.perf_counter() - start
+
+    done = [r for r in results if r["error"] is None]
+    rows = sum(r["rows"] for r in done)
+    summary = {
+        "vendors": len(results),
+        "succeeded": len(done),
+        "failed": len(results) - len(done),
+        "rows": rows,
+        "missing_rows": sum(r["missing_rows"] for r in done),
+        "duplicate_rows": sum(r["duplicate_rows"] for r in results),
+        "rejected_rows": sum(r["rejected_rows"] for r in done),
+        "vendor_conflicts": None if vendor_conflicts is None else len(vendor_conflicts),
+        "seconds": elapsed,
+        "rows_per_sec": rows / elapsed if elapsed else None,
+        "jobs": jobs,
+    }
+    return results, summary
@@ -0,0 +1,186 @@
+"""Preallocated output columns for the mapping engine.
+
+Each output column is one full-length object array allocated on its first
+write and filled in place by masked writes; the output frame is built once
+from those arrays without copying. Columns that are never written share a
+single empty array, and a column set to one value for every row is kept
+as that value until a masked write needs the array.
+
+``to_frame(compact=True)`` builds the frame with categorical columns
+instead: a constant or empty column is one category and a code per row,
+and a low-cardinality column is factorized. Writing it out (``to_csv``,
+the ``writers``) gives the same text as the object columns.
+
+With ``track_rows`` the buffer also records, per row, the columns written
+to it in the order of their first write (``row_signatures``). Rows share
+few such signatures, so they are kept as a code per row into a list of
+column tuples; ``signature_order`` rebuilds the appearance order of any
+set of rows from them, which the incremental mode needs for rows it does
+not map again.
+"""
+import numpy as np
+import pandas as pd
+
+
+class ColumnBuffer:
+    """Output columns for ``n`` rows, keyed by GemGem column name."""
+
+    def __init__(self, n, track_rows=False):
+        self.n = n
+        self.arrays = {}
+        self.constants = {}
+        self.first_write = {}
+        self._writes = 0
+        self._empty = None
+        self._empty_codes = None
+        self._row_signature = np.zeros(n, dtype=np.int32) if track_rows else None
+        self._signatures = [()]
+        self._signature_codes = {(): 0}
+        self._next_signature = {}
+
+    def _array(self, col):
+        array = self.arrays.get(col)
+        if array is None:
+            array = np.full(self.n, self.constants.pop(col, ""), dtype=object)
+            self.arrays[col] = array
+        return array
+
+    def set(self, col, values, mask=None):
+        """Write ``values`` (scalar or full-length array) to the rows in ``mask``."""
+        if mask is None:
+            self.arrays.pop(col, None)
+            self.constants.pop(col, None)
+            if np.ndim(values) == 0:
+                self.constants[col] = values
+            else:
+                self.arrays[col] = np.array(values, copy=True)
+            first_row = 0
+        else:
+            if not mask.any():
+                return
+            target = self._array(col)
+            target[mask] = values if np.ndim(values) == 0 else np.asarray(values)[mask]
+            first_row = int(mask.argmax())
+        self._writes += 1
+        if col not in self.first_write or first_row < self.first_write[col][0]:
+            self.first_write[col] = (first_row, self._writes)
+        if self._row_signature is not None:
+            self._track(col, slice(None) if mask is None else mask)
+
+    def _track(self, col, rows):
+        """Add ``col`` to the signature of ``rows`` that do not have it yet."""
+        current = self._row_signature[rows]
+        present = np.zeros(len(self._signatures), dtype=bool)
+        present[current] = True
+        step = np.arange(len(self._signatures), dtype=np.int32)
+        for code in np.flatnonzero(present):
+            step[code] = self._signature_after(code, col)
+        self._row_signature[rows] = step[current]
+
+    def _signature_after(self, code, col):
+        key = (code, col)
+        if key not in self._next_signature:
+            columns = self._signatures[code]
+            if col not in columns:
+                columns += (col,)
+                if columns not in self._signature_codes:
+                    self._signature_codes[columns] = len(self._signatures)
+                    self._signatures.append(columns)
+            self._next_signature[key] = self._signature_codes[columns]
+        return self._next_signature[key]
+
+    def row_signatures(self):
+        """``(codes, signatures)``: per row, the index of the tuple of
+        columns written to it, in first-write order (needs ``track_rows``)."""
+        return self._row_signature, list(self._signatures)
+
+    def appearance_order(self):
+        """Columns in the order row-by-row ``pd.concat`` of records gave them:
+        by first row written, then by write order within that row."""
+        return appearance_order(self.first_write)
+
+    def empty_column(self):
+        if self._empty is None:
+            self._empty = np.full(self.n, "", dtype=object)
+        return self._empty
+
+    def column(self, col):
+        """Full-length values of ``col`` (constants are materialized)."""
+        if col in self.arrays:
+            return self.arrays[col]
+        if col in self.constants:
+            return np.full(self.n, self.constants[col], dtype=object)
+        return self.empty_column()
+
+    def _constant_column(self, value):
+        if self._empty_codes is None:
+            self._empty_codes = np.zeros(self.n, dtype=np.int8)
+        return pd.Categorical.from_codes(self._empty_codes, [value])
+
+    def _compact_column(self, col):
+        if col in self.arrays:
+            return compact_values(self.arrays[col])
+        return self._constant_column(self.constants.get(col, ""))
+
+    def to_frame(self, columns=None, compact=False):
+        """Build the output frame once; ``columns`` defaults to appearance order.
+
+        ``compact`` gives categorical columns (see the module docstring).
+        """
+        if columns is None:
+            columns = self.appearance_order()
+        if compact:
+            data = {col: self._compact_column(col) for col in columns}
+            return pd.DataFrame(data, columns=columns, copy=False)
+        data = {col: self.column(col) for col in columns}
+        frame = pd.DataFrame(data, columns=columns, dtype=object, copy=False)
+        for col, array in data.items():
+            if array.dtype != object:
+                frame[col] = array
+        return frame
+
+
+# A column with more distinct values than this share of its rows (sku,
+# certificate numbers) stays an object column.
+COMPACT_MAX_UNIQUE_SHARE = 0.5
+
+
+def compact_values(values):
+    """``values`` as a categorical when it has few distinct values."""
+    values = np.asarray(values)
+    if values.dtype != object:
+        return values
+    codes, uniques = pd.factorize(values)
+    if len(uniques) > COMPACT_MAX_UNIQUE_SHARE * max(len(values), 1):
+        return values
+    return pd.Categorical.from_codes(codes, uniques)
+
+
+def compact_frame(frame):
+    """Categorical copy of an all-object output frame (e.g. merged partitions)."""
+    return pd.DataFrame({col: compact_values(frame[col].to_numpy()) for col in frame.columns},
+                        columns=frame.columns, copy=False)
+
+
+def merge_first_write(merged, first_write, row_offset):
+    """Fold the ``first_write`` of a buffer holding rows from ``row_offset`` on
+    into ``merged``, so several partitions give one appearance order."""
+    for col, (row, order) in first_write.items():
+        if col not in merged or row_offset + row < merged[col][0]:
+            merged[col] = (row_offset + row, order)
+    return merged
+
+
+def appearance_order(first_write):
+    return sorted(first_write, key=first_write.get)
+
+
+def signature_order(codes, signatures):
+    """Appearance order of rows with the signature ``codes`` (see
+    ``ColumnBuffer.row_signatures``): each row adds the columns it writes
+    that no earlier row wrote, in its own write order."""
+    uniques, first_rows = np.unique(codes, return_index=True)
+    order = {}
+    for code in uniques[np.argsort(first_rows)]:
+        order.update(dict.fromkeys(signatures[code]))
+    return list(order)
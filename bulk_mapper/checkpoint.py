@@ -0,0 +1,259 @@
+"""Checkpointed chunked mapping that resumes after an interrupted run.
+
+``stream_vendor_file_checkpointed`` (``stream_vendor_file`` with a
+``checkpoint_root``) maps the vendor file in numbered chunks of
+``chunksize`` rows, like ``streaming.stream_vendor_file``, but each mapped
+chunk is kept on disk as a part (output and missing-diamond rows,
+headerless CSV) and recorded in a manifest before the next chunk starts.
+The output files are assembled from the parts once the whole file has
+been mapped, and the checkpoint is then removed.
+
+If the process dies (OOM, a deploy, a browser refresh), running it again
+with the same input and options finds the checkpoint, skips the rows of
+the completed chunks and carries on with the next one; ``uid`` and the
+column order come out as in an uninterrupted run, byte for byte for CSV.
+The checkpoint lives in a directory under ``checkpoint_root`` named after
+a hash of the input's content, the chunk size, the mapping options, the
+rows kept (``keep``) and whether rows are validated, so any change starts
+afresh and runs of different files can share the root. Rejected rows
+(see ``validation``) are kept as parts of their own.
+Checkpoints of runs that are never resumed stay until deleted.
+
+A part and the manifest are written to a temporary file of their own and
+renamed into place, so a crash, or another run of the same checkpoint,
+leaves either the previous checkpoint or the new one.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from bulk_mapper.buffer import appearance_order, merge_first_write
+from bulk_mapper.engine import OUTPUT_COLUMNS, REQUIRED_COLUMNS, map_vendor_columns
+from bulk_mapper.instrumentation import count, stage, timed_iter
+from bulk_mapper.reader import DEFAULT_CHUNK_ROWS, read_vendor_chunks
+from bulk_mapper.validation import validate_frame
+from bulk_mapper.writers import CSV_WRITE_ROWS, DEFAULT_OUTPUT_FORMAT, open_writer
+
+MANIFEST = "manifest.json"
+MANIFEST_VERSION = 3
+COPY_BUFFER_BYTES = 2**20
+DIGEST_BLOCK_BYTES = 2**20
+# Part kind → the chunk's row count for it.
+PART_ROWS = {"output": "output_rows", "missing": "missing_rows", "rejected": "rejected_rows"}
+
+
+def _file_sha256(f):
+    digest = hashlib.sha256()
+    for block in iter(lambda: f.read(DIGEST_BLOCK_BYTES), b""):
+        digest.update(block)
+    return digest.hexdigest()
+
+
+def _content_digest(source):
+    """SHA-256 of a path's or a file object's bytes (the position is kept)."""
+    if not hasattr(source, "read"):
+        with open(source, "rb") as f:
+            return _file_sha256(f)
+    position = source.tell()
+    source.seek(0)
+    digest = _file_sha256(source)
+    source.seek(position)
+    return digest
+
+
+def checkpoint_key(source, chunksize, required_columns, usecols, options, keep=None, validate=False, sheet=None):
+    """Hash naming the checkpoint of this input and these settings."""
+    keep = None if keep is None else hashlib.sha256(np.packbits(keep).tobytes()).hexdigest()
+    settings = json.dumps({"chunksize": chunksize, "required_columns": required_columns, "usecols": usecols,
+                           "options": options, "keep": keep, "validate": validate, "sheet": sheet,
+                           "version": MANIFEST_VERSION},
+                          sort_keys=True, default=str)
+    return hashlib.sha256((_content_digest(source) + settings).encode()).hexdigest()[:32]
+
+
+def _replace(path, write):
+    """Call ``write(tmp_path)`` and rename the result onto ``path``."""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    os.close(fd)
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+
+def _write_csv_part(frame, path):
+    def write(tmp):
+        with open(tmp, "w", newline="", encoding="utf-8") as f:
+            frame.to_csv(f, header=False, index=False, chunksize=CSV_WRITE_ROWS)
+    _replace(path, write)
+
+
+def _part_path(directory, kind, index):
+    return os.path.join(directory, f"{kind}-{index:06d}.csv")
+
+
+class Checkpoint:
+    """The manifest and parts of one checkpointed run."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.path = os.path.join(directory, MANIFEST)
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                self.manifest = json.load(f)
+        else:
+            os.makedirs(directory, exist_ok=True)
+            self.manifest = {"version": MANIFEST_VERSION, "chunks": [], "missing_columns": None,
+                             "rejected_columns": None, "complete": False}
+
+    @property
+    def chunks(self):
+        return self.manifest["chunks"]
+
+    @property
+    def rows(self):
+        """Rows mapped, rejected ones included (``uid`` counts them)."""
+        return sum(chunk["rows"] for chunk in self.chunks)
+
+    @property
+    def output_rows(self):
+        return sum(chunk["output_rows"] for chunk in self.chunks)
+
+    @property
+    def read_rows(self):
+        return sum(chunk["read"] for chunk in self.chunks)
+
+    @property
+    def missing_rows(self):
+        return sum(chunk["missing_rows"] for chunk in self.chunks)
+
+    def save(self):
+        def write(tmp):
+            with open(tmp, "w") as f:
+                json.dump(self.manifest, f)
+        _replace(self.path, write)
+
+    def add_chunk(self, frame, missing_df, first_write, read, rejected=None):
+        """Store a mapped chunk's parts, then record it as done; ``read``
+        is the number of input rows it covers and ``rejected`` the rows
+        validation took out of ``frame``."""
+        index = len(self.chunks)
+        rejected_rows = 0 if rejected is None else len(rejected)
+        _write_csv_part(frame, _part_path(self.directory, "output", index))
+        if len(missing_df):
+            _write_csv_part(missing_df, _part_path(self.directory, "missing", index))
+            self.manifest["missing_columns"] = [str(col) for col in missing_df.columns]
+        if rejected_rows:
+            _write_csv_part(rejected, _part_path(self.directory, "rejected", index))
+            self.manifest["rejected_columns"] = [str(col) for col in rejected.columns]
+        self.chunks.append({
+            "read": read,
+            "rows": len(frame) + rejected_rows,
+            "output_rows": len(frame),
+            "rejected_rows": rejected_rows,
+            "missing_rows": len(missing_df),
+            "first_write": {col: list(value) for col, value in first_write.items()},
+        })
+        self.save()
+
+    def first_write(self):
+        """Column → (first row, write order) over all chunks."""
+        merged = {}
+        offset = 0
+        for chunk in self.chunks:
+            merge_first_write(merged, {col: tuple(v) for col, v in chunk["first_write"].items()}, offset)
+            offset += chunk["rows"]
+        return merged
+
+    def parts(self, kind):
+        return [
+            _part_path(self.directory, kind, index)
+            for index, chunk in enumerate(self.chunks)
+            if chunk[PART_ROWS[kind]]
+        ]
+
+    def remove(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def _copy_parts(parts, header_frame, target):
+    """Header of ``header_frame`` then the parts' bytes, to a path."""
+    with open(target, "w", newline="", encoding="utf-8") as out:
+        header_frame.to_csv(out, index=False)
+        for part in parts:
+            with open(part, encoding="utf-8", newline="") as f:
+                shutil.copyfileobj(f, out, COPY_BUFFER_BYTES)
+
+
+def _assemble(checkpoint, output, missing_output, required_columns, output_format, rejected_output=None):
+    staged_columns = REQUIRED_COLUMNS if required_columns else OUTPUT_COLUMNS
+    columns = REQUIRED_COLUMNS if required_columns else appearance_order(checkpoint.first_write())
+    parts = checkpoint.parts("output")
+    if output_format == "csv" and required_columns:
+        _copy_parts(parts, pd.DataFrame(columns=columns), output)
+        count("rows_written", checkpoint.output_rows)
+    else:
+        with open_writer(output, output_format) as writer:
+            if checkpoint.output_rows == 0:
+                writer.write(pd.DataFrame(columns=columns))
+            for part in parts:
+                frame = pd.read_csv(part, header=None, names=staged_columns, usecols=columns, dtype=str,
+                                    keep_default_na=False)
+                writer.write(frame[columns])
+    if checkpoint.missing_rows:
+        _copy_parts(checkpoint.parts("missing"), pd.DataFrame(columns=checkpoint.manifest["missing_columns"]),
+                    missing_output)
+    if rejected_output is not None and checkpoint.parts("rejected"):
+        _copy_parts(checkpoint.parts("rejected"), pd.DataFrame(columns=checkpoint.manifest["rejected_columns"]),
+                    rejected_output)
+
+
+def stream_vendor_file_checkpointed(source, output, missing_output, checkpoint_root, chunksize=DEFAULT_CHUNK_ROWS,
+                                    required_columns=True, output_format=DEFAULT_OUTPUT_FORMAT, usecols=None,
+                                    keep=None, rejected_output=None, sheet=None, **options):
+    """``stream_vendor_file`` that checkpoints each chunk under
+    ``checkpoint_root`` and resumes from the last completed chunk; returns
+    ``(rows, missing_rows)``. ``output``, ``missing_output`` and
+    ``rejected_output`` are paths; the missing-diamond and rejected files
+    are only written when they have rows.
+    """
+    with stage("fingerprint"):
+        key = checkpoint_key(source, chunksize, required_columns, usecols, options, keep,
+                             rejected_output is not None, sheet)
+    checkpoint = Checkpoint(os.path.join(checkpoint_root, key))
+    count("chunks_resumed", len(checkpoint.chunks))
+
+    if not checkpoint.manifest["complete"]:
+        columns = REQUIRED_COLUMNS if required_columns else OUTPUT_COLUMNS
+        rows = checkpoint.rows
+        read = checkpoint.read_rows
+        chunks = read_vendor_chunks(source, chunksize, usecols, start_row=read, sheet=sheet)
+        for chunk in timed_iter("read", chunks):
+            count("rows_read", len(chunk))
+            start, read = read, read + len(chunk)
+            if keep is not None:
+                chunk = chunk[keep[start:read]]
+            record, missing_df = map_vendor_columns(chunk.reset_index(drop=True), uid_start=rows + 1, **options)
+            with stage("build"):
+                frame = record.to_frame(columns)
+            rejected = None
+            if rejected_output is not None:
+                frame, rejected = validate_frame(frame)
+            with stage("checkpoint"):
+                checkpoint.add_chunk(frame, missing_df, record.first_write, read - start, rejected)
+            rows += len(chunk)
+        checkpoint.manifest["complete"] = True
+        checkpoint.save()
+
+    with stage("assemble"):
+        _assemble(checkpoint, output, missing_output, required_columns, output_format, rejected_output)
+    rows, missing_rows = checkpoint.output_rows, checkpoint.missing_rows
+    checkpoint.remove()
+    return rows, missing_rows
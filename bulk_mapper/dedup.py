@@ -0,0 +1,175 @@
+"""Repeated SKUs within a vendor file and across the vendors of a batch.
+
+Each row's SKU is its stripped TAG NO. GemGem rejects an upload that
+repeats one, so repeats are found before mapping, in one pass. The
+SKUs are factorized through a hash table and each code's count is taken
+with ``bincount``. A policy then decides what happens to the rows:
+
+- ``keep-all``: every row is mapped, the repeats are only reported.
+- ``keep-first`` / ``keep-last``: only the first / last row of a SKU is
+  mapped. ``uid`` numbers the rows that are kept.
+- ``error``: ``DuplicateSkuError`` is raised, carrying the report.
+
+The conflicts report has a line per row whose SKU repeats: the SKU, the
+row number in the vendor file (1 = first data row), its occurrence out
+of how many, whether it is kept and whether its cells (the vendor
+columns read) differ from the SKU's first row (``differs`` False means a
+plain repeat). Rows without a TAG NO are never treated as repeats.
+
+``SkuIndex`` finds the same SKU under different vendors. It is an SQLite
+file of every SKU each vendor's last upload had, so it also catches a
+SKU another vendor uploaded in an earlier batch.
+"""
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from bulk_mapper.instrumentation import count, stage
+from bulk_mapper.profiles import DEFAULT_DUPLICATE_POLICY, DUPLICATE_POLICIES
+from bulk_mapper.reader import DEFAULT_CHUNK_ROWS, read_vendor_chunks
+
+CONFLICT_COLUMNS = ["sku", "row", "occurrence", "occurrences", "kept", "differs"]
+VENDOR_CONFLICT_COLUMNS = ["sku", "vendor", "uid", "other_vendor", "other_uid"]
+
+
+class DuplicateSkuError(ValueError):
+    """Repeated SKUs under the ``error`` policy; ``conflicts`` is the report."""
+
+    def __init__(self, conflicts):
+        self.conflicts = conflicts
+        examples = ", ".join(conflicts["sku"].drop_duplicates().head(3))
+        super().__init__(f"{conflicts['sku'].nunique():,} SKUs occur more than once "
+                         f"({len(conflicts):,} rows), e.g. {examples}")
+
+
+def sku_column(df, field_map=None):
+    """Stripped TAG NO of each row ("" when the column is absent)."""
+    name = (field_map or {}).get("TAG NO", "TAG NO")
+    if name not in df.columns:
+        return pd.Series("", index=df.index, dtype=object)
+    return df[name].str.strip()
+
+
+def frame_rows_differ(df):
+    """``rows_differ`` for a frame in memory: cell by cell."""
+    def rows_differ(rows, others):
+        differs = np.zeros(len(rows), dtype=bool)
+        for col in df.columns:
+            values = df[col].array
+            differs |= np.asarray(values.take(rows) != values.take(others), dtype=bool)
+        return differs
+    return rows_differ
+
+
+def _row_hashes(df):
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+
+def resolve_duplicates(skus, policy, rows_differ):
+    """``(keep, conflicts)`` for the SKUs of a file's rows under ``policy``.
+
+    ``keep`` is a boolean array over the rows, or None when every row is
+    kept. ``rows_differ(rows, others)`` tells for two arrays of row
+    positions whether each row's cells differ from the other's; it is
+    only called when there are repeats.
+    """
+    if policy not in DUPLICATE_POLICIES:
+        raise ValueError(f"Unknown duplicate SKU policy {policy!r}; choose from {', '.join(DUPLICATE_POLICIES)}")
+    with stage("dedup"):
+        skus = np.asarray(skus, dtype=object)
+        codes = pd.factorize(skus)[0]
+        counts = np.bincount(codes, minlength=1)
+        repeated = (counts[codes] > 1) & (skus != "")
+        if not repeated.any():
+            return None, pd.DataFrame(columns=CONFLICT_COLUMNS)
+        rows = np.flatnonzero(repeated)
+        # factorize numbers the SKUs in order of first appearance.
+        first_rows = np.flatnonzero(~pd.Series(codes).duplicated().to_numpy())
+        repeated_codes = codes[rows]
+        conflicts = pd.DataFrame({
+            "sku": skus[rows],
+            "row": rows + 1,
+            "occurrence": pd.Series(repeated_codes).groupby(repeated_codes, sort=False).cumcount().to_numpy() + 1,
+            "occurrences": counts[repeated_codes],
+            "differs": rows_differ(rows, first_rows[repeated_codes]),
+        })
+        if policy == "keep-first":
+            conflicts["kept"] = conflicts["occurrence"] == 1
+        elif policy == "keep-last":
+            conflicts["kept"] = conflicts["occurrence"] == conflicts["occurrences"]
+        else:
+            conflicts["kept"] = True
+        conflicts = conflicts[CONFLICT_COLUMNS]
+    count("duplicate_sku_rows", len(conflicts))
+    if policy == "error":
+        raise DuplicateSkuError(conflicts)
+    if conflicts["kept"].all():
+        return None, conflicts
+    keep = np.ones(len(skus), dtype=bool)
+    keep[rows[~conflicts["kept"].to_numpy()]] = False
+    return keep, conflicts
+
+
+def drop_duplicate_skus(df, policy=DEFAULT_DUPLICATE_POLICY, field_map=None):
+    """``(df, conflicts)``: the vendor frame without the rows ``policy``
+    drops (index reset) and the conflicts report."""
+    keep, conflicts = resolve_duplicates(sku_column(df, field_map), policy, frame_rows_differ(df))
+    if keep is None:
+        return df, conflicts
+    return df[keep].reset_index(drop=True), conflicts
+
+
+def scan_duplicate_skus(source, policy=DEFAULT_DUPLICATE_POLICY, field_map=None, usecols=None,
+                        chunksize=DEFAULT_CHUNK_ROWS, sheet=None):
+    """``resolve_duplicates`` for a vendor file (``sheet`` of a workbook)
+    read in chunks, as the streaming path reads it; pass ``keep`` on to
+    ``stream_vendor_file``. Rows are compared by a hash of their cells, as
+    the file is not held in memory. A file object is read from its
+    position and left there."""
+    position = source.tell() if hasattr(source, "read") else None
+    skus = []
+    hashes = []
+    for chunk in read_vendor_chunks(source, chunksize, usecols, sheet=sheet):
+        skus.append(sku_column(chunk, field_map).to_numpy(dtype=object))
+        hashes.append(_row_hashes(chunk))
+    if position is not None:
+        source.seek(position)
+    skus = np.concatenate(skus) if skus else np.array([], dtype=object)
+    hashes = np.concatenate(hashes) if hashes else np.array([], dtype=np.uint64)
+    return resolve_duplicates(skus, policy, lambda rows, others: hashes[rows] != hashes[others])
+
+
+class SkuIndex:
+    """SKU → vendor and ``uid`` of every vendor's last upload, in SQLite."""
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path)
+        with self.conn:
+            self.conn.execute("CREATE TABLE IF NOT EXISTS skus (sku TEXT NOT NULL, vendor TEXT NOT NULL, "
+                              "uid INTEGER NOT NULL, PRIMARY KEY (sku, vendor)) WITHOUT ROWID")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS skus_vendor ON skus (vendor)")
+
+    def forget(self, vendors):
+        """Drop the SKUs of ``vendors``."""
+        with self.conn:
+            self.conn.executemany("DELETE FROM skus WHERE vendor = ?", ((vendor,) for vendor in vendors))
+
+    def replace(self, vendor, skus, uids):
+        """Make ``skus`` (with their ``uids``) the SKUs of ``vendor``;
+        returns the report of those other vendors have too."""
+        first = pd.DataFrame({"sku": skus, "uid": uids})
+        first = first[first["sku"] != ""].drop_duplicates("sku")
+        with self.conn:
+            self.conn.execute("DELETE FROM skus WHERE vendor = ?", (vendor,))
+            self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS incoming (sku TEXT PRIMARY KEY, uid INTEGER)")
+            self.conn.execute("DELETE FROM incoming")
+            self.conn.executemany("INSERT INTO incoming VALUES (?, ?)",
+                                  zip(first["sku"].tolist(), first["uid"].astype(int).tolist()))
+            found = self.conn.execute("SELECT i.sku, ?, i.uid, s.vendor, s.uid FROM incoming i "
+                                      "JOIN skus s ON s.sku = i.sku ORDER BY i.uid, s.vendor", (vendor,)).fetchall()
+            self.conn.execute("INSERT INTO skus SELECT sku, ?, uid FROM incoming", (vendor,))
+        return pd.DataFrame(found, columns=VENDOR_CONFLICT_COLUMNS)
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,688 @@
+"""Column-wise mapping engine shared by main.py, app.py and dynamic_mapping.py.
+
+Every output column is computed for the whole vendor frame at once with
+pandas string methods and boolean masks (diamond rows vs gemstone rows)
+instead of walking the frame with ``iterrows``. The per-row helpers are
+kept as the reference behaviour for single values.
+"""
+import re
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from bulk_mapper.buffer import ColumnBuffer
+from bulk_mapper.instrumentation import count, stage
+from bulk_mapper.keyword_classifier import compile_rules
+from bulk_mapper.normalizer_cache import shared_cache
+from bulk_mapper.size_parser import parse_size_column
+
+# ========== ACCEPTED CATEGORY VALUES ==========
+CATEGORY_MAP = {
+    "bracelet": "Bracelet",
+    "bangle": "Bracelet",
+    "necklace (chain)": "Necklace",
+    "necklace": "Necklace",
+    "neck-pndt": "Necklace",
+    "ring": "Ring",
+    "earring pair": "Earring",
+    "earring": "Earring",
+    "pendant": "Pendant",
+    "brooch": "Brooch",
+    "accessories": "Accessories",
+}
+DEFAULT_CATEGORY = "Others"
+
+# Checked in order, first keyword found wins (padparadscha before sapphire).
+STONE_TYPES = [
+    ("diamond", "Diamond"),
+    ("ruby", "Ruby"),
+    ("emerald", "Emerald"),
+    ("padparadscha", "Padparadscha Sapphire"),
+    ("blue sapphire", "Blue Sapphire"),
+    ("sapphire", "Sapphire"),
+    ("chrysoberyl", "Chrysoberyl"),
+    ("tourmaline", "Tourmaline"),
+    ("aquamarine", "Aquamarine"),
+    ("pearl", "Pearl"),
+    ("jade", "Jade"),
+]
+DEFAULT_STONE_TYPE = "Others"
+
+# ========== VENDOR FIELDS READ BY THE MAPPING ==========
+EXPECTED_VENDOR_FIELDS = [
+    "TAG NO","gem gem sale price","METAL","METAL CARAT","DETAILS","STONE TYPE",
+    "SIZE","METAL WT.","STOCK TYPE2","SD PCS","COLLECTION","CLR","CT","SD WT.",
+    "LAB","CERT","SHAPE","CRT","C","P","S","FLO","TREATMENT","ORIGIN"
+]
+
+# ========== GEMGEM OUTPUT COLUMNS ==========
+STYLE_COLUMNS = {
+    "Ring": "ring-style",
+    "Bracelet": "bracelet-style",
+    "Necklace": "necklace-style",
+    "Pendant": "pendant-style",
+    "Earring": "earring-style",
+    "Brooch": "brooch-style",
+    "Accessories": "accessories-style",
+}
+
+ENHANCEMENT_COLUMNS = {
+    "Ruby": "gemstone_ruby-enhancement",
+    "Sapphire": "gemstone_sapphire-enhancement",
+    "Blue Sapphire": "gemstone_blue-sapphire-enhancement",
+    "Emerald": "gemstone_emerald-enhancement",
+    "Chrysoberyl": "gemstone_chrysoberyl-enhancement",
+    "Tourmaline": "gemstone_tourmaline-enhancement",
+    "Aquamarine": "gemstone_aquamarine-enhancement",
+    "Padparadscha Sapphire": "gemstone_padparadscha-sapphire-enhancement",
+}
+
+ORIGIN_COLUMNS = {
+    "Ruby": "gemstone_ruby-origin",
+    "Sapphire": "gemstone_sapphire-origin",
+    "Blue Sapphire": "gemstone_blue-sapphire-origin",
+    "Emerald": "gemstone_emerald-origin",
+    "Chrysoberyl": "gemstone_chrysoberyl-origin",
+    "Tourmaline": "gemstone_tourmaline-origin",
+    "Aquamarine": "gemstone_aquamarine-origin",
+    "Padparadscha Sapphire": "gemstone_padparadscha-sapphire-origin",
+    "Jade": "gemstone_jade-origin",
+    "Pearl": "gemstone_pearl-origin",
+}
+
+REQUIRED_COLUMNS = [
+    "uid","sku","name","category","description","images","certificate_images","ruler_images",
+    "currency","price","discounted_price","to_be_listed","have_master_piece","year-of-purchase",
+    "condition","packaging-info","ring-style","brand","engagement-rings-solitaire-hashes",
+    "engagement-rings-options","engagement-rings-other-hashes","metal","gender","total-weight",
+    "standard-size","resize-from","resize-to","resize-supported","gold-purity","earring-style",
+    "earring-type","earring-solitaire-hashes","earring-studs-options","earring-other-hashes",
+    "bracelet-style","bracelet-style-other-hashes","size-length","size-width","size-unit",
+    "necklace-style","necklace-style-other-hashes","pendant-style","pendant-style-solitaire-hashes",
+    "pendant-style-object-hashes","brooch-style","brooch-style-hashes","accessories-style","label",
+    "diamond_quantity","diamond_certification","diamond_certification-number","diamond_carat-weight",
+    "diamond_diamond-shape","diamond_diamond-color","diamond_diamond-color-white-options",
+    "diamond_diamond-color-fancy-options","diamond_diamond-clarity","diamond_diamond-cut",
+    "diamond_diamond-polish","diamond_diamond-symmetry","diamond_diamond-fluoroscence",
+    "diamond_diamond-girdle","diamond_average-color","diamond_average-clarity",
+    "diamond_approximate-carat-weight","diamond_center-stone","diamond_diamond-grade",
+    "gemstone_quantity","gemstone_gold-purity","gemstone_certification","gemstone_certification-number",
+    "gemstone_carat-weight","gemstone_diamond-color-fancy-options","gemstone_gem-stone-shape",
+    "gemstone_gem-stone-color","gemstone_gem-stone-clarity","gemstone_gem-stone-cut",
+    "gemstone_pearl-shape","gemstone_pearl-color","gemstone_pearl-clarity","gemstone_pearl-lustre",
+    "gemstone_stone-type","gemstone_stone-type-pearl-options","gemstone_ruby-color",
+    "gemstone_ruby-origin","gemstone_ruby-enhancement","gemstone_blue-sapphire-color",
+    "gemstone_blue-sapphire-origin","gemstone_blue-sapphire-enhancement","gemstone_emerald-color",
+    "gemstone_emerald-origin","gemstone_emerald-enhancement","gemstone_chrysoberyl-origin",
+    "gemstone_chrysoberyl-enhancement","gemstone_tourmaline-origin","gemstone_tourmaline-enhancement",
+    "gemstone_aquamarine-origin","gemstone_aquamarine-enhancement","gemstone_sapphire-origin",
+    "gemstone_sapphire-enhancement","gemstone_padparadscha-sapphire-color",
+    "gemstone_padparadscha-sapphire-origin","gemstone_padparadscha-sapphire-enhancement",
+    "gemstone_approximate-carat-weight","gemstone_center-stone","gemstone_jade-color",
+    "gemstone_jade-origin","gemstone_diamond-grade","gemstone_chrysoberyl-color",
+    "gemstone_tourmaline-color","gemstone_aquamarine-color","gemstone_jade-clarity",
+    "gemstone_pearl-origin"
+]
+
+# Every column the engine can write: main.py keeps two gemstone fields
+# that are not part of the GemGem template.
+OUTPUT_COLUMNS = REQUIRED_COLUMNS + ["gemstone_stone-shape", "gemstone_stone-color"]
+
+LABEL = "Fast Shipping, Verified Partner"
+
+SIZE_INCH_RE = r"^(\d+\.?\d*)\"?$"
+SIZE_RING_RE = r"^\d+(\.\d+)?$"
+SIZE_DOUBLE_RE = r"^(\d+\.?\d*)[*xX](\d+\.?\d*)(cm|mm)?$"
+SIZE_SINGLE_RE = r"^(\d+\.?\d*)(cm|mm)?$"
+
+# ========== PER-VALUE HELPERS ==========
+
+def clean_metal(value):
+    """Normalize metal description like '18K White & Yellow Gold' → 'Two tone gold'"""
+    if pd.isna(value):
+        return ""
+    value = str(value)
+    if "white" in value.lower() and "yellow" in value.lower():
+        return "Two tone gold"
+    value = re.sub(r"\b(18K|14K|22K)\b", "", value, flags=re.IGNORECASE)
+    value = value.replace("&", "and").strip()
+    value = re.sub(r"\s+", " ", value)
+    return value.title()
+
+
+def format_gold_purity(value):
+    if pd.isna(value) or value == "":
+        return ""
+    value = str(value).strip()
+    if not value.lower().endswith("k"):
+        return f"{value}K"
+    return value.upper()
+
+
+def category_classifier(category_map=CATEGORY_MAP):
+    """Earrings are checked first so they are not read as rings, then the
+    map keywords in order."""
+    return compile_rules([("earring", "Earring")] + list(category_map.items()), DEFAULT_CATEGORY)
+
+
+def stone_type_classifier():
+    return compile_rules(STONE_TYPES, DEFAULT_STONE_TYPE)
+
+
+def detect_category(detail, category_map=CATEGORY_MAP):
+    """Detect category from the DETAILS text"""
+    if pd.isna(detail):
+        return DEFAULT_CATEGORY
+    return category_classifier(category_map).classify(str(detail).strip().lower())
+
+
+def parse_size(size_val, category, ring_standard_size=True):
+    """Returns (size_length, size_width, size_unit, standard_size)
+
+    With ``ring_standard_size`` every Ring size goes to standard-size as is
+    (app.py behaviour); without it inch/numeric parsing runs first and only
+    the leftovers reach the ring check (main.py behaviour).
+    """
+    if pd.isna(size_val):
+        return "", "", "", ""
+
+    size_str = str(size_val).strip().lower().replace(" ", "")
+
+    if ring_standard_size and category == "Ring":
+        return "", "", "", size_str
+
+    match_inch = re.match(SIZE_INCH_RE, size_str)
+    if match_inch:
+        return match_inch.group(1), "", "cm", ""  # store inches as cm
+
+    if category == "Ring" and re.match(SIZE_RING_RE, size_str):
+        return "", "", "", size_str
+
+    match_double = re.match(SIZE_DOUBLE_RE, size_str)
+    if match_double:
+        return match_double.group(1), match_double.group(2), match_double.group(3) or "", ""
+
+    match_single = re.match(SIZE_SINGLE_RE, size_str)
+    if match_single:
+        return match_single.group(1), "", match_single.group(2) or "", ""
+
+    return "", "", "", ""
+
+
+def normalize_stone_type(value):
+    if pd.isna(value):
+        return ""
+    return stone_type_classifier().classify(str(value).lower().strip())
+
+
+def is_positive_number(value):
+    try:
+        return float(value) > 0
+    except (TypeError, ValueError):
+        return False
+
+# ========== COLUMN HELPERS ==========
+
+def _objects(values):
+    return np.asarray(values, dtype=object)
+
+
+def _interned(values):
+    """Object array in which equal strings are one object, so a column
+    with few distinct values costs a pointer per row."""
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    return _objects(uniques)[codes] if len(uniques) else _objects(values)
+
+
+def clean_metal_column(values):
+    lower = values.str.lower()
+    two_tone = lower.str.contains("white", regex=False) & lower.str.contains("yellow", regex=False)
+    cleaned = (
+        values.str.replace(r"\b(18K|14K|22K)\b", "", regex=True, flags=re.IGNORECASE)
+        .str.replace("&", "and", regex=False)
+        .str.strip()
+        .str.replace(r"\s+", " ", regex=True)
+        .str.title()
+    )
+    return np.where(two_tone, "Two tone gold", _objects(cleaned))
+
+
+def format_gold_purity_column(values):
+    stripped = values.str.strip()
+    has_k = stripped.str.lower().str.endswith("k")
+    formatted = np.where(has_k, _objects(stripped.str.upper()), _objects(stripped + "K"))
+    return np.where(values == "", "", formatted)
+
+
+def detect_category_column(details, category_map=CATEGORY_MAP):
+    return category_classifier(category_map).classify_column(details.str.strip().str.lower())
+
+
+def normalize_stone_type_column(values):
+    return stone_type_classifier().classify_column(values.str.lower().str.strip())
+
+
+def positive_number_column(values):
+    """Vectorized ``is_positive_number``: ``float()`` runs once per distinct
+    value and the result is broadcast back, so "1_000" and non-ASCII digits
+    count as they do in the scalar check."""
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    positive = np.fromiter(map(is_positive_number, uniques), dtype=bool, count=len(uniques))
+    return positive[codes]
+
+
+# ========== CACHED NORMALIZERS ==========
+# Distinct values are normalized once per process with the column helpers
+# above and broadcast back (see normalizer_cache).
+
+def _batch(column_func, **kwargs):
+    return lambda keys: column_func(pd.Series(keys, dtype=object), **kwargs)
+
+
+def cached_clean_metal(values):
+    return shared_cache("metal", _batch(clean_metal_column)).map(values)
+
+
+def cached_gold_purity(values):
+    return shared_cache("gold-purity", _batch(format_gold_purity_column)).map(values)
+
+
+def cached_category(details, category_map=CATEGORY_MAP):
+    compute = _batch(detect_category_column, category_map=category_map)
+    return shared_cache("category", compute, tuple(category_map.items())).map(details)
+
+
+def cached_stone_type(values):
+    return shared_cache("stone-type", _batch(normalize_stone_type_column)).map(values)
+
+
+def cached_parse_size(sizes, categories, ring_standard_size=True):
+    def compute(keys):
+        size_values, category_values = zip(*keys)
+        parsed = parse_size_column(
+            pd.Series(size_values, dtype=object), pd.Series(category_values, dtype=object), ring_standard_size
+        )
+        return list(zip(*parsed))
+
+    return shared_cache("size", compute, (ring_standard_size,), width=4).map(sizes, categories)
+
+# ========== MAPPING RULES ==========
+# The vendor → GemGem mapping as data. A value is "field:<vendor field>"
+# (stripped), "const:<text>" or "derived:<name>" (see DERIVED_VALUES);
+# "{...}" is filled from the profile. ``rows`` names one of ROW_MASKS and
+# ``when`` a profile switch the rule depends on. Rules are written in
+# order, which is also the column order main.py outputs.
+
+CONDITION_RULES = {"second hand": "Excellent", "new": "Brand New"}  # STOCK TYPE2, lowercased
+DEFAULT_CONDITION = "Excellent"
+LABEL_RULES = {"Brand New": LABEL + ", New"}  # by condition, LABEL otherwise
+
+
+def column(name, value, rows="all", when=None):
+    return ("column", name, value, rows, when)
+
+
+def route(columns, key, value, rows="all", when=None):
+    """Write ``value`` to ``columns[key]`` on the rows where it is non-empty."""
+    return ("route", columns, key, value, rows, when)
+
+
+MAPPING_RULES = [
+    column("uid", "derived:uid"),
+    column("sku", "field:TAG NO"),
+    column("category", "derived:category"),
+    column("currency", "const:USD"),
+    column("price", "field:{price_field}"),
+    column("metal", "derived:metal"),
+    column("gold-purity", "derived:gold-purity"),
+    column("size-length", "derived:size-length"),
+    column("size-width", "derived:size-width"),
+    column("size-unit", "derived:size-unit"),
+    column("standard-size", "derived:standard-size"),
+    column("total-weight", "field:METAL WT."),
+    column("condition", "derived:condition"),
+    column("label", "derived:label"),
+    column("have_master_piece", "const:No"),
+    column("diamond_quantity", "field:SD PCS"),
+    route(STYLE_COLUMNS, "derived:category", "field:COLLECTION", when="collection_styles"),
+
+    # ========== DIAMOND ROWS ==========
+    column("diamond_carat-weight", "derived:diamond-weight", "diamond"),
+    column("diamond_diamond-color", "derived:diamond-color", "diamond"),
+    column("diamond_diamond-color-white-options", "derived:white-options", "diamond"),
+    column("diamond_diamond-color-fancy-options", "derived:fancy-options", "diamond"),
+    column("diamond_certification", "field:LAB", "diamond"),
+    column("diamond_certification-number", "field:CERT", "diamond"),
+    column("diamond_diamond-shape", "field:SHAPE", "diamond"),
+    column("diamond_diamond-clarity", "field:CRT", "diamond"),
+    column("diamond_diamond-cut", "field:C", "diamond"),
+    column("diamond_diamond-polish", "field:P", "diamond"),
+    column("diamond_diamond-symmetry", "field:S", "diamond"),
+    column("diamond_diamond-fluoroscence", "field:FLO", "diamond"),
+    column("diamond_center-stone", "const:Center stone", "diamond"),
+    column("gemstone_stone-type", "const:Diamond", "diamond"),
+
+    # ========== GEMSTONE ROWS ==========
+    column("diamond_carat-weight", "field:SD WT.", "gem", when="side_stone"),
+    column("diamond_center-stone", "const:Side stone", "gem", when="side_stone"),
+    column("gemstone_certification", "field:LAB", "gem"),
+    column("gemstone_certification-number", "field:CERT", "gem"),
+    column("gemstone_carat-weight", "field:CT", "gem"),
+    column("gemstone_gem-stone-shape", "field:SHAPE", "gem"),
+    column("gemstone_gem-stone-color", "field:CLR", "gem"),
+    column("gemstone_stone-type", "derived:stone-type", "gem"),
+    column("gemstone_center-stone", "const:Center stone", "gem"),
+    column("gemstone_pearl-shape", "field:SHAPE", "pearl"),
+    column("gemstone_pearl-color", "field:CLR", "pearl"),
+    # main.py also outputs these two, REQUIRED_COLUMNS leaves them out
+    column("gemstone_stone-shape", "field:SHAPE", "gem"),
+    column("gemstone_stone-color", "field:CLR", "gem"),
+    route(ENHANCEMENT_COLUMNS, "derived:stone-type", "derived:treatment", "gem"),
+    route(ORIGIN_COLUMNS, "derived:stone-type", "field:ORIGIN", "gem"),
+]
+
+# Switches that describe an entry point (or a vendor); see map_vendor_columns.
+DEFAULT_PROFILE = {
+    "price_field": "TAG PRICE",
+    "category_map": CATEGORY_MAP,
+    "ring_standard_size": True,
+    "collection_styles": True,
+    "side_stone": True,
+}
+
+# ========== DERIVED VALUES ==========
+
+def _derive_size(ctx):
+    return cached_parse_size(ctx.raw("SIZE"), ctx.derived("category"), ctx.profile["ring_standard_size"])
+
+
+def _derive_diamond_weight(ctx):
+    """CT when it is a positive number, else SD WT. when it is, else ""."""
+    ct, sd_wt = ctx.field("CT"), ctx.field("SD WT.")
+    return np.where(ctx.derived("ct-ok"), ct, np.where(ctx.derived("sd-ok"), sd_wt, ""))
+
+
+def _derive_condition(ctx):
+    stock_type = pd.Series(ctx.field("STOCK TYPE2")).str.lower()
+    return _objects(stock_type.map(CONDITION_RULES).fillna(DEFAULT_CONDITION))
+
+
+def _derive_label(ctx):
+    return _objects(pd.Series(ctx.derived("condition")).map(LABEL_RULES).fillna(LABEL))
+
+
+def _derive_treatment(ctx):
+    treatment = ctx.field("TREATMENT")
+    heated = (pd.Series(treatment).str.lower() == "heated").to_numpy()
+    return np.where(heated, "Indication of heating", treatment)
+
+
+DERIVED_VALUES = {
+    "uid": lambda ctx: np.arange(ctx.uid_start, ctx.uid_start + ctx.n),
+    "category": lambda ctx: cached_category(ctx.raw("DETAILS"), ctx.profile["category_map"]),
+    "stone-type": lambda ctx: cached_stone_type(ctx.raw("STONE TYPE")),
+    "metal": lambda ctx: cached_clean_metal(ctx.raw("METAL")),
+    "gold-purity": lambda ctx: cached_gold_purity(ctx.raw("METAL CARAT")),
+    "size": _derive_size,
+    "size-length": lambda ctx: ctx.derived("size")[0],
+    "size-width": lambda ctx: ctx.derived("size")[1],
+    "size-unit": lambda ctx: ctx.derived("size")[2],
+    "standard-size": lambda ctx: ctx.derived("size")[3],
+    "condition": _derive_condition,
+    "label": _derive_label,
+    "stone-lower": lambda ctx: ctx.raw("STONE TYPE").str.lower(),
+    "is-diamond": lambda ctx: np.asarray(ctx.derived("stone-lower").str.contains("diamond", regex=False)),
+    "is-fancy": lambda ctx: np.asarray(ctx.derived("stone-lower").str.contains("fancy", regex=False)),
+    "ct-ok": lambda ctx: positive_number_column(ctx.field("CT")),
+    "sd-ok": lambda ctx: positive_number_column(ctx.field("SD WT.")),
+    "diamond-weight": _derive_diamond_weight,
+    "missing-weight": lambda ctx: ctx.mask("diamond") & ~ctx.derived("ct-ok") & ~ctx.derived("sd-ok"),
+    "diamond-color": lambda ctx: np.where(ctx.derived("is-fancy"), "Fancy", "White"),
+    "white-options": lambda ctx: np.where(ctx.derived("is-fancy"), "", ctx.field("CLR")),
+    "fancy-options": lambda ctx: np.where(ctx.derived("is-fancy"), ctx.field("CLR"), ""),
+    "treatment": _derive_treatment,
+}
+
+ROW_MASKS = {
+    "all": lambda ctx: None,
+    "diamond": lambda ctx: ctx.derived("is-diamond"),
+    "gem": lambda ctx: ~ctx.derived("is-diamond"),
+    "pearl": lambda ctx: ctx.mask("gem") & (ctx.derived("stone-type") == "Pearl"),
+}
+
+# ========== PLAN COMPILER ==========
+
+def _vendor_column(df, name):
+    """Vendor column ``name``, empty strings when it is absent."""
+    if name in df.columns:
+        return df[name]
+    return pd.Series("", index=df.index, dtype=object)
+
+
+def project_fields(df, field_map, fields=EXPECTED_VENDOR_FIELDS):
+    """``df`` as a frame of the expected ``fields``, each the vendor column
+    ``field_map`` (expected field → vendor column) names for it. Fields
+    whose column is absent share one column of empty strings. The vendor
+    columns are not copied."""
+    columns = {}
+    empty = None
+    for field in fields:
+        name = field_map.get(field, field)
+        if name in df.columns:
+            columns[field] = df[name]
+        else:
+            if empty is None:
+                empty = pd.Series("", index=df.index, dtype=object)
+            columns[field] = empty
+    return pd.DataFrame(columns, index=df.index, copy=False)
+
+
+class _FrameContext:
+    """Per-frame memo of vendor fields, derived values and row masks."""
+
+    def __init__(self, df, profile, uid_start):
+        self.df = df
+        self.n = len(df)
+        self.profile = profile
+        self.uid_start = uid_start
+        self._fields = {}
+        self._derived = {}
+        self._masks = {}
+
+    def raw(self, name):
+        return _vendor_column(self.df, name)
+
+    def field(self, name):
+        if name not in self._fields:
+            self._fields[name] = _interned(self.raw(name).str.strip())
+        return self._fields[name]
+
+    def derived(self, name):
+        if name not in self._derived:
+            with stage(name):
+                self._derived[name] = DERIVED_VALUES[name](self)
+        return self._derived[name]
+
+    def mask(self, name):
+        if name not in self._masks:
+            self._masks[name] = ROW_MASKS[name](self)
+        return self._masks[name]
+
+
+def _compile_value(spec, profile):
+    kind, _, arg = spec.partition(":")
+    arg = arg.format(**profile)
+    if kind == "field":
+        return lambda ctx: ctx.field(arg)
+    if kind == "const":
+        return lambda ctx: arg
+    if kind == "derived":
+        if arg not in DERIVED_VALUES:
+            raise ValueError(f"Unknown derived value in mapping rule: {arg}")
+        return lambda ctx: ctx.derived(arg)
+    raise ValueError(f"Unknown mapping rule value: {spec}")
+
+
+class MappingPlan:
+    """MAPPING_RULES compiled for one profile: the rules whose switch is
+    off are dropped and every value is resolved to a column getter, so
+    running the plan on a frame is only column operations. ``fields`` are
+    the vendor fields the plan reads."""
+
+    def __init__(self, profile, rules=MAPPING_RULES):
+        self.profile = profile
+        self.steps = []
+        self.fields = list(EXPECTED_VENDOR_FIELDS)
+        for rule in rules:
+            kind, target, *rest = rule
+            when = rest[-1]
+            if when is not None and not profile[when]:
+                continue
+            if kind == "column":
+                value, rows, _ = rest
+                self.steps.append((kind, target, None, _compile_value(value, profile), rows))
+                specs = (value,)
+            else:
+                key, value, rows, _ = rest
+                self.steps.append((kind, target, _compile_value(key, profile), _compile_value(value, profile), rows))
+                specs = (key, value)
+            for spec in specs:
+                source, _, name = spec.partition(":")
+                name = name.format(**profile)
+                if source == "field" and name not in self.fields:
+                    self.fields.append(name)
+
+    def run(self, df, field_map=None, uid_start=1):
+        if field_map is not None:
+            df = self.project(df, field_map)
+        record, missing = self.run_rows(df, uid_start=uid_start)
+        if field_map is not None:
+            df = df[EXPECTED_VENDOR_FIELDS]
+        return record, missing_report(df, missing)
+
+    def project(self, df, field_map):
+        """``df`` renamed once to the fields the plan reads; see
+        ``project_fields``."""
+        with stage("project"):
+            return project_fields(df, field_map, self.fields)
+
+    def run_rows(self, df, field_map=None, uid_start=1, track_rows=False):
+        """The filled buffer and the boolean missing-weight mask;
+        ``track_rows`` records each row's written columns (see ``buffer``)."""
+        if field_map is not None:
+            df = self.project(df, field_map)
+        ctx = _FrameContext(df, self.profile, uid_start)
+        record = ColumnBuffer(ctx.n, track_rows)
+        with stage("map"):
+            for kind, target, key, value, rows in self.steps:
+                mask = ctx.mask(rows)
+                if kind == "column":
+                    if mask is None or mask.any():
+                        record.set(target, value(ctx), mask)
+                    continue
+                values = value(ctx)
+                keys = key(ctx)
+                routed = values != ""
+                if mask is not None:
+                    routed = routed & mask
+                for key_value, col in target.items():
+                    record.set(col, values, routed & (keys == key_value))
+            missing = ctx.derived("missing-weight")
+        count("rows_mapped", ctx.n)
+        return record, missing
+
+
+def missing_report(df, missing, field_map=None):
+    """The vendor rows in the boolean mask ``missing``; with a ``field_map``
+    they are reported under the expected field names."""
+    with stage("missing_report"):
+        if field_map is not None:
+            df = project_fields(df, field_map)
+        report = df.loc[missing].reset_index(drop=True)
+    count("rows_missing", len(report))
+    return report
+
+
+def _freeze(value):
+    return tuple(value.items()) if isinstance(value, dict) else value
+
+
+@lru_cache(maxsize=64)
+def _compile_cached(frozen_profile):
+    profile = {k: dict(v) if k == "category_map" else v for k, v in frozen_profile}
+    return MappingPlan(profile)
+
+
+def compile_plan(**profile):
+    """The cached plan for ``DEFAULT_PROFILE`` updated with ``profile``."""
+    unknown = set(profile) - set(DEFAULT_PROFILE)
+    if unknown:
+        raise TypeError(f"Unknown mapping profile option(s): {', '.join(sorted(unknown))}")
+    merged = dict(DEFAULT_PROFILE, **profile)
+    return _compile_cached(tuple(sorted((k, _freeze(v)) for k, v in merged.items())))
+
+
+def vendor_columns(field_map=None, **profile):
+    """Vendor columns the mapping reads, in the order it reads them; the
+    input can be pruned to these (plus whatever the caller reports)."""
+    fields = compile_plan(**profile).fields
+    if field_map is None:
+        return fields
+    return list(dict.fromkeys(field_map.get(f, f) for f in fields))
+
+
+def field_columns(**profile):
+    """Output column → vendor field for the columns the mapping copies
+    straight from one field (``sku`` ← TAG NO, ``price`` ← the price
+    field, ...); columns with a derived or constant value on some rows
+    are left out."""
+    merged = dict(DEFAULT_PROFILE, **profile)
+    sources = {}
+    for kind, target, *rest in MAPPING_RULES:
+        when = rest[-1]
+        if kind != "column" or (when is not None and not merged[when]):
+            continue
+        sources.setdefault(target, set()).add(rest[0].format(**merged))
+    fields = {}
+    for target, specs in sources.items():
+        source, _, name = next(iter(specs)).partition(":")
+        if len(specs) == 1 and source == "field":
+            fields[target] = name
+    return fields
+
+# ========== FRAME MAPPING ==========
+
+def map_vendor_columns(df, field_map=None, uid_start=1, **profile):
+    """Map a vendor frame (all ``str``, NaN filled with "") to GemGem columns.
+
+    Returns ``(buffer, missing_df)``: the filled ``ColumnBuffer`` and the
+    diamond rows whose CT and SD WT. are both not a positive number.
+    ``profile`` overrides ``DEFAULT_PROFILE`` (see profiles.PROFILES for
+    the entry points):
+
+    - ``price_field``: vendor field read for the price.
+    - ``category_map``: DETAILS keywords → category.
+    - ``ring_standard_size``: see ``parse_size``.
+    - ``collection_styles``: route COLLECTION to the ``<category>-style`` column.
+    - ``side_stone``: gemstone rows carry SD WT. as a side-stone diamond.
+
+    ``field_map`` maps expected field → vendor column (dynamic_mapping.py):
+    the frame is projected to the expected field names once and mapped
+    as such, and the missing report uses those names.
+    """
+    return compile_plan(**profile).run(df, field_map, uid_start)
+
+
+def map_vendor_frame(df, required_columns=True, compact=False, **options):
+    """Map a vendor frame and return ``(out_df, missing_df)``.
+
+    ``required_columns`` reorders the output to ``REQUIRED_COLUMNS``;
+    otherwise the columns keep their first-written order (main.py).
+    ``compact`` builds categorical output columns (see ``ColumnBuffer``).
+    The other options are those of ``map_vendor_columns``.
+    """
+    record, missing_df = map_vendor_columns(df, **options)
+    with stage("build"):
+        out_df = record.to_frame(REQUIRED_COLUMNS if required_columns else None, compact)
+    return out_df, missing_df
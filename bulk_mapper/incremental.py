@@ -0,0 +1,212 @@
+"""Incremental mapping against the previous upload of the same vendor.
+
+Vendors resend their whole inventory and only a few rows change between
+uploads. Each input row gets a key (its TAG NO plus how many times that
+SKU occurred before it in the file) and a fingerprint (a hash of its
+vendor cells). A Parquet snapshot keeps the mapped output of the last
+run per key, so a run only maps rows whose key is new or whose
+fingerprint changed and takes every other row from the snapshot. The
+snapshot is columnar and dictionary-encoded, so loading it costs far
+less than mapping; it needs pyarrow.
+
+A run gives the full output, as a plain run would (``uid`` is the row
+number, and the columns can come in first-written order: the snapshot
+keeps which columns each row writes), and a delta of the rows GemGem has to hear about: ``add`` for new
+keys, ``update`` for keys whose output changed and ``remove`` for keys
+that are no longer in the file. The state is tied to the mapping options
+and the vendor columns; when either changes, every row is mapped again
+and still compared against the stored output.
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from bulk_mapper.dedup import sku_column
+from bulk_mapper.buffer import signature_order
+from bulk_mapper.engine import OUTPUT_COLUMNS, REQUIRED_COLUMNS, compile_plan, missing_report
+from bulk_mapper.instrumentation import stage
+
+CHANGE_COLUMN = "change"
+# "written": the columns each row writes, comma separated in first-write order.
+STATE_COLUMNS = ["key", "fingerprint", "missing", "written"] + OUTPUT_COLUMNS[1:]  # no uid, it is the row number
+# Dictionary-encoded columns; the output ones start after "written".
+CATEGORICAL_COLUMNS = STATE_COLUMNS[3:]
+# Part of the state key, so snapshots of an older layout are mapped again.
+SNAPSHOT_VERSION = 2
+
+
+def row_keys(df, field_map=None):
+    """TAG NO plus its occurrence number, so repeated SKUs stay distinct."""
+    sku = sku_column(df, field_map)
+    occurrence = sku.groupby(sku, sort=False).cumcount()
+    return (sku + "#" + occurrence.astype(str)).to_numpy(dtype=object)
+
+
+def row_fingerprints(df):
+    """64-bit hash of each row's cells."""
+    return pd.util.hash_pandas_object(df, index=False).to_numpy().view(np.int64)
+
+
+def _state_key(df, options):
+    return json.dumps({"options": options, "columns": list(df.columns), "version": SNAPSHOT_VERSION},
+                      sort_keys=True, default=str)
+
+
+def load_snapshot(path):
+    """``(columns, state key)`` of the last run, empty when there is no
+    snapshot yet. Output columns come back as categoricals straight from
+    the stored dictionaries."""
+    if not os.path.exists(path):
+        state = {"key": np.array([], dtype=object), "fingerprint": np.array([], dtype=np.int64),
+                 "missing": np.array([], dtype=bool)}
+        state.update({col: pd.Categorical([], categories=pd.Index([], dtype=object)) for col in CATEGORICAL_COLUMNS})
+        return state, None
+    import pyarrow.parquet as pq
+
+    table = pq.read_table(path, read_dictionary=CATEGORICAL_COLUMNS).unify_dictionaries()
+    state_key = (table.schema.metadata or {}).get(b"state_key", b"").decode() or None
+    state = {col: table.column(col).to_numpy() for col in STATE_COLUMNS[:3]}
+    for col in CATEGORICAL_COLUMNS:
+        if col not in table.column_names:  # a snapshot of an older layout
+            state[col] = pd.Categorical.from_codes(np.zeros(table.num_rows, dtype=np.int8), [""])
+            continue
+        chunks = table.column(col).chunks
+        dictionary = chunks[0].dictionary.to_numpy(zero_copy_only=False) if chunks else []
+        codes = np.concatenate([chunk.indices.to_numpy() for chunk in chunks]) if chunks else []
+        state[col] = pd.Categorical.from_codes(codes, categories=pd.Index(dictionary, dtype=object))
+    return state, state_key
+
+
+def save_snapshot(path, state, state_key):
+    """Replace the snapshot atomically, so an interrupted run keeps the old one."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    arrays = [pa.array(state["key"], type=pa.string()), pa.array(state["fingerprint"]), pa.array(state["missing"])]
+    # Values of removed rows would otherwise pile up in the dictionaries run after run.
+    arrays += [pa.array(state[col].remove_unused_categories()) for col in CATEGORICAL_COLUMNS]
+    table = pa.Table.from_arrays(arrays, names=STATE_COLUMNS, metadata={b"state_key": state_key.encode()})
+    pq.write_table(table, path + ".tmp", compression="zstd", dictionary_pagesize_limit=2**30)
+    os.replace(path + ".tmp", path)
+
+
+def _merge_column(previous, known, kept, positions, values):
+    """Categorical of the kept rows' stored values and the freshly mapped
+    ``values``. New values are appended to the stored categories, so the
+    stored codes stay valid and rows compare by code."""
+    values = pd.Index(values, dtype=object)
+    categories = previous.categories
+    codes = categories.get_indexer(values)
+    unseen = codes < 0
+    if unseen.any():
+        extra = values[unseen].unique().to_numpy()
+        categories = pd.Index(np.concatenate([categories.to_numpy(), extra]), dtype=object)
+        codes[unseen] = categories.get_indexer(values[unseen])
+    merged = np.empty(len(kept), dtype=np.int32)
+    merged[kept] = previous.codes[known[kept]]
+    merged[positions] = codes
+    return pd.Categorical.from_codes(merged, categories=categories)
+
+
+def map_incremental(df, state_path, field_map=None, columns=REQUIRED_COLUMNS, compact=False, **profile):
+    """Map ``df`` against the state in ``state_path`` and update it.
+
+    Returns ``(out_df, delta_df, missing_df, stats)``: the full output with
+    ``columns`` (None: first-written order, as ``map_vendor_frame`` with
+    ``required_columns=False``), the delta (a ``change`` column followed by ``columns``),
+    the missing-diamond report of the whole file and row counts. ``compact``
+    gives categorical output columns, as in ``map_vendor_frame``; the other
+    options are those of ``map_vendor_columns``.
+    """
+    n = len(df)
+    df = df.reset_index(drop=True)
+    with stage("fingerprint"):
+        keys = row_keys(df, field_map)
+        fingerprints = row_fingerprints(df)
+    state_key = _state_key(df, dict(profile, field_map=field_map))
+
+    with stage("snapshot_load"):
+        previous, previous_key = load_snapshot(state_path)
+    known = pd.Index(previous["key"], dtype=object).get_indexer(keys)
+    changed = known < 0
+    if previous_key == state_key:
+        hit = ~changed
+        changed[hit] = previous["fingerprint"][known[hit]] != fingerprints[hit]
+    else:
+        changed[:] = True
+    kept = ~changed
+    positions = np.flatnonzero(changed)
+
+    record, sub_missing = compile_plan(**profile).run_rows(df.iloc[positions].reset_index(drop=True), field_map,
+                                                           track_rows=True)
+    output_columns = CATEGORICAL_COLUMNS[1:]
+    state = {"key": keys, "fingerprint": fingerprints}
+    missing = np.zeros(n, dtype=bool)
+    missing[kept] = previous["missing"][known[kept]]
+    missing[positions] = sub_missing
+    state["missing"] = missing
+    codes, signatures = record.row_signatures()
+    written = np.array([",".join(signature) for signature in signatures], dtype=object)[codes]
+    state["written"] = _merge_column(previous["written"], known, kept, positions, written)
+    for col in output_columns:
+        state[col] = _merge_column(previous[col], known, kept, positions, record.column(col))
+    if columns is None:
+        signatures = [category.split(",") if category else [] for category in state["written"].categories]
+        columns = signature_order(state["written"].codes, signatures)
+
+    # Changed rows whose output is the same as last time are no news to GemGem.
+    added = changed & (known < 0)
+    updated = np.zeros(n, dtype=bool)
+    candidates = np.flatnonzero(changed & (known >= 0))
+    for col in output_columns:
+        updated[candidates] |= previous[col].codes[known[candidates]] != state[col].codes[candidates]
+    still_there = np.zeros(len(previous["key"]), dtype=bool)
+    still_there[known[known >= 0]] = True
+    removed = np.flatnonzero(~still_there)
+
+    # A rerun of the same file leaves the snapshot as it is.
+    if len(positions) or len(previous["key"]) != n or not np.array_equal(known, np.arange(n)):
+        with stage("snapshot_save"):
+            save_snapshot(state_path, state, state_key)
+
+    empty = np.full(n, "", dtype=object)
+    uid = np.arange(1, n + 1)
+    data = {}
+    for col in columns:
+        if col == "uid":
+            data[col] = uid
+        elif col in output_columns:
+            values = state[col]
+            data[col] = values if compact else values.categories.to_numpy().take(values.codes)
+        else:
+            data[col] = pd.Categorical(empty) if compact else empty
+    if compact:
+        out_df = pd.DataFrame(data, columns=columns, copy=False)
+    else:
+        out_df = pd.DataFrame(data, columns=columns, dtype=object, copy=False)
+        if "uid" in out_df.columns:
+            out_df["uid"] = uid
+
+    news = np.flatnonzero(added | updated)
+    delta = {CHANGE_COLUMN: np.concatenate([np.where(added, "add", "update")[news], np.full(len(removed), "remove")])}
+    for col in columns:
+        if col == "uid":
+            kept_values, removed_values = uid[news], np.full(len(removed), "")
+        elif col in output_columns:
+            kept_values, removed_values = np.asarray(state[col][news]), np.asarray(previous[col][removed])
+        else:
+            kept_values, removed_values = empty[news], np.full(len(removed), "")
+        delta[col] = np.concatenate([np.asarray(kept_values, dtype=object), np.asarray(removed_values, dtype=object)])
+    delta_df = pd.DataFrame(delta, columns=[CHANGE_COLUMN] + list(columns), dtype=object, copy=False)
+
+    stats = {
+        "rows": n,
+        "mapped": len(positions),
+        "added": int(added.sum()),
+        "updated": int(updated.sum()),
+        "removed": len(removed),
+        "unchanged": n - int(added.sum()) - int(updated.sum()),
+    }
+    return out_df, delta_df, missing_report(df, missing, field_map), stats
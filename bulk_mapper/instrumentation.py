@@ -0,0 +1,213 @@
+"""Stage timings and row counters for the mapping pipeline.
+
+The pipeline marks its stages with ``stage(name)`` and its row counts with
+``count(name, rows)``. Both do nothing unless an ``Instrumentation`` is
+active, which ``instrumented()`` sets up for the code it wraps (per thread,
+so concurrent Streamlit sessions do not mix). Stages nest: a stage opened
+inside another is reported under ``outer/inner``, so stages at the same
+level never overlap. A stage that runs several times (one per chunk)
+accumulates its calls.
+
+Optional captures:
+
+- ``cprofile``: the functions with the most cumulative time in the block.
+- ``tracemalloc``: peak traced memory per stage (Python allocations only,
+  not Arrow buffers), at the cost of a much slower run.
+
+``BULK_MAPPER_PROFILE`` enables instrumentation without touching code:
+``1`` (or ``timing``) for timings, plus ``cprofile`` and/or
+``tracemalloc``, comma separated, e.g. ``BULK_MAPPER_PROFILE=cprofile``.
+
+Stages mapped in worker processes (``parallel``) are not visible here;
+the parent records the whole pool as one stage.
+"""
+import contextvars
+import datetime
+import json
+import os
+import time
+from contextlib import contextmanager, nullcontext
+
+ENV_VAR = "BULK_MAPPER_PROFILE"
+PROFILE_TOP_FUNCTIONS = 25
+
+_active = contextvars.ContextVar("bulk_mapper_instrumentation", default=None)
+
+
+class Instrumentation:
+    """Timings, counters and optional captures of one instrumented run."""
+
+    def __init__(self, cprofile=False, tracemalloc=False):
+        self.stages = {}
+        self.counters = {}
+        self.started = datetime.datetime.now(datetime.timezone.utc)
+        self.total_seconds = None
+        self.cprofile = cprofile
+        self.tracemalloc = tracemalloc
+        self._open = []
+        self._peaks = []
+        self._profiler = None
+        self._start = None
+
+    def start(self):
+        self._start = time.perf_counter()
+        if self.tracemalloc:
+            import tracemalloc
+
+            tracemalloc.start()
+        if self.cprofile:
+            import cProfile
+
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def stop(self):
+        if self._profiler is not None:
+            self._profiler.disable()
+        if self.tracemalloc:
+            import tracemalloc
+
+            tracemalloc.stop()
+        self.total_seconds = time.perf_counter() - self._start
+
+    @contextmanager
+    def stage(self, name):
+        self._open.append(name)
+        path = "/".join(self._open)
+        entry = self.stages.setdefault(path, {"stage": path, "seconds": 0.0, "calls": 0})
+        if self.tracemalloc:
+            self._enter_peak()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self._open.pop()
+            entry["seconds"] += elapsed
+            entry["calls"] += 1
+            if self.tracemalloc:
+                entry["peak_mb"] = max(entry.get("peak_mb", 0.0), self._exit_peak() / 2**20)
+
+    def _enter_peak(self):
+        import tracemalloc
+
+        # The enclosing stage keeps the peak it reached before this one
+        # resets the counter.
+        if self._peaks:
+            self._peaks[-1] = max(self._peaks[-1], tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+        self._peaks.append(0)
+
+    def _exit_peak(self):
+        import tracemalloc
+
+        peak = max(self._peaks.pop(), tracemalloc.get_traced_memory()[1])
+        if self._peaks:
+            self._peaks[-1] = max(self._peaks[-1], peak)
+        return peak
+
+    def count(self, name, rows):
+        self.counters[name] = self.counters.get(name, 0) + int(rows)
+
+    def top_functions(self, limit=PROFILE_TOP_FUNCTIONS):
+        if self._profiler is None:
+            return []
+        import pstats
+
+        stats = pstats.Stats(self._profiler)
+        rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+        return [
+            {
+                "function": f"{os.path.basename(filename)}:{line}({func})",
+                "calls": calls,
+                "tottime": tottime,
+                "cumtime": cumtime,
+            }
+            for (filename, line, func), (_, calls, tottime, cumtime, _) in rows
+        ]
+
+    def report(self):
+        """The run as a JSON-serializable dict."""
+        report = {
+            "started": self.started.isoformat(timespec="seconds"),
+            "total_seconds": self.total_seconds,
+            "stages": list(self.stages.values()),
+            "counters": self.counters,
+        }
+        if self.cprofile:
+            report["cprofile"] = self.top_functions()
+        return report
+
+    def write_report(self, path):
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+        return path
+
+
+def options_from_env(value=None):
+    """``(enabled, cprofile, tracemalloc)`` from ``BULK_MAPPER_PROFILE``."""
+    value = os.environ.get(ENV_VAR, "") if value is None else value
+    flags = {flag.strip().lower() for flag in value.split(",") if flag.strip()}
+    flags -= {"0", "false", "off", "no"}
+    return bool(flags), "cprofile" in flags, "tracemalloc" in flags
+
+
+@contextmanager
+def instrumented(enabled=None, cprofile=False, tracemalloc=False):
+    """Instrument the block; yields the ``Instrumentation``, or None when
+    disabled. ``enabled=None`` defers to ``BULK_MAPPER_PROFILE``, whose
+    captures are added to the ones asked for."""
+    env_enabled, env_cprofile, env_tracemalloc = options_from_env()
+    if enabled is None:
+        enabled = env_enabled or cprofile or tracemalloc
+    if not enabled:
+        yield None
+        return
+    run = Instrumentation(cprofile=cprofile or env_cprofile, tracemalloc=tracemalloc or env_tracemalloc)
+    token = _active.set(run)
+    run.start()
+    try:
+        yield run
+    finally:
+        run.stop()
+        _active.reset(token)
+
+
+def stage(name):
+    """Time the block as stage ``name`` of the active run, if any."""
+    run = _active.get()
+    return nullcontext() if run is None else run.stage(name)
+
+
+def count(name, rows):
+    run = _active.get()
+    if run is not None:
+        run.count(name, rows)
+
+
+def timed_iter(name, iterable):
+    """Yield from ``iterable``, timing each step as stage ``name``."""
+    iterator = iter(iterable)
+    while True:
+        with stage(name):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+def report_path(output_path):
+    """Where the report of the run that wrote ``output_path`` goes."""
+    return f"{output_path}.profile.json"
+
+
+def timing_table(report):
+    """Stages of a report as a frame for display: seconds, share of the
+    run, calls and (if captured) peak MB."""
+    import pandas as pd
+
+    table = pd.DataFrame(report["stages"], columns=["stage", "seconds", "calls", "peak_mb"])
+    table["share"] = table["seconds"] / report["total_seconds"] if report["total_seconds"] else 0.0
+    table = table[["stage", "seconds", "share", "calls", "peak_mb"]]
+    return table.dropna(axis=1, how="all")
@@ -0,0 +1,102 @@
+"""Compiled keyword classifier for DETAILS and STONE TYPE.
+
+``detect_category`` and ``normalize_stone_type`` are ordered rule lists:
+the first rule whose keyword occurs anywhere in the text wins, so
+"earring" beats "ring" and "padparadscha" beats "sapphire". Checking the
+rules one ``in`` at a time costs one substring scan per rule. Here the
+keywords are compiled once into an Aho-Corasick automaton that reads the
+text a single time and keeps the best (earliest) rule seen; the cost no
+longer grows with the number of keywords.
+"""
+from collections import deque
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+
+class KeywordClassifier:
+    """Ordered ``(keyword, label)`` rules compiled into a DFA.
+
+    ``classify`` returns the label of the earliest rule whose keyword is a
+    substring of the text, or ``default``. Matching is case-sensitive, the
+    callers lowercase the text as the original checks did.
+    """
+
+    def __init__(self, rules, default):
+        self.rules = list(rules)
+        self.default = default
+        self.labels = [label for _, label in self.rules]
+        self._build()
+
+    def _build(self):
+        no_match = len(self.rules)
+        goto = [{}]
+        best = [no_match]
+        for priority, (keyword, _) in enumerate(self.rules):
+            if not keyword:
+                continue
+            state = 0
+            for ch in keyword:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    best.append(no_match)
+                state = nxt
+            best[state] = min(best[state], priority)
+
+        # Breadth-first: complete the transition table with the failure
+        # links and fold the best rule of each suffix state into its state.
+        fail = [0] * len(goto)
+        delta = [dict(edges) for edges in goto]
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                link = fail[state]
+                while link and ch not in goto[link]:
+                    link = fail[link]
+                fail[nxt] = goto[link].get(ch, 0) if goto[link].get(ch, 0) != nxt else 0
+                best[nxt] = min(best[nxt], best[fail[nxt]])
+            for ch, target in delta[fail[state]].items():
+                delta[state].setdefault(ch, target)
+
+        self._delta = delta
+        self._best = best
+        self._no_match = no_match
+
+    def priority(self, text):
+        """Index of the winning rule, ``len(rules)`` when nothing matches."""
+        delta, best = self._delta, self._best
+        state = 0
+        winner = self._no_match
+        for ch in text:
+            state = delta[state].get(ch, 0)
+            if best[state] < winner:
+                winner = best[state]
+                if winner == 0:
+                    break
+        return winner
+
+    def classify(self, text):
+        winner = self.priority(text)
+        return self.labels[winner] if winner < self._no_match else self.default
+
+    def classify_column(self, values):
+        """Classify a whole column; each distinct value is scanned once."""
+        codes, uniques = pd.factorize(values, use_na_sentinel=False)
+        labels = np.asarray([self.classify(u) for u in uniques], dtype=object)
+        return labels[codes] if len(uniques) else np.empty(0, dtype=object)
+
+
+@lru_cache(maxsize=32)
+def _compiled(rules, default):
+    return KeywordClassifier(rules, default)
+
+
+def compile_rules(rules, default):
+    """Shared classifier for a rule list, compiled on first use."""
+    return _compiled(tuple(rules), default)
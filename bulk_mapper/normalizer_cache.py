@@ -0,0 +1,139 @@
+"""Memoized normalizers for low-cardinality vendor fields.
+
+METAL, METAL CARAT, DETAILS, STONE TYPE and SIZE only have a few dozen
+distinct values per file. A column is factorized, only values not seen
+before are normalized (as one batch), and the results are broadcast back
+through the factorize codes. Caches live for the whole process, so a
+Streamlit session or a batch run reuses them across files; each one is an
+LRU bounded to ``NORMALIZER_CACHE_SIZE`` entries.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+NORMALIZER_CACHE_SIZE = 10_000
+
+_caches = {}
+_registry_lock = threading.Lock()
+
+
+def _factorize(columns):
+    """Codes per row and the distinct keys (tuples when several columns)."""
+    if len(columns) == 1:
+        codes, uniques = pd.factorize(columns[0], use_na_sentinel=False)
+        return codes, list(uniques)
+    codes = np.zeros(len(columns[0]), dtype=np.int64)
+    uniques = []
+    for column in columns:
+        col_codes, col_uniques = pd.factorize(column, use_na_sentinel=False)
+        codes = codes * len(col_uniques) + col_codes
+        uniques.append(np.asarray(col_uniques, dtype=object))
+    codes, combined = pd.factorize(codes)
+    keys = []
+    for code in combined:
+        parts = []
+        for col_uniques in reversed(uniques):
+            code, index = divmod(code, len(col_uniques))
+            parts.append(col_uniques[index])
+        keys.append(tuple(reversed(parts)))
+    return codes, keys
+
+
+class NormalizerCache:
+    """LRU of normalizer results keyed by the raw vendor value(s).
+
+    ``compute`` takes a list of keys not in the cache and returns one
+    result per key; ``width`` is the number of output columns per result.
+    """
+
+    def __init__(self, compute, width=1, maxsize=NORMALIZER_CACHE_SIZE):
+        self.compute = compute
+        self.width = width
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._values = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._values)
+
+    def map(self, *columns):
+        """Normalize whole columns; returns one array, or a tuple of
+        ``width`` arrays."""
+        codes, keys = _factorize(columns)
+        results = [None] * len(keys)
+        todo = []
+        with self._lock:
+            for i, key in enumerate(keys):
+                if key in self._values:
+                    self._values.move_to_end(key)
+                    results[i] = self._values[key]
+                else:
+                    todo.append(i)
+            self.hits += len(keys) - len(todo)
+            self.misses += len(todo)
+
+        if todo:
+            computed = self.compute([keys[i] for i in todo])
+            with self._lock:
+                for i, value in zip(todo, computed):
+                    results[i] = value
+                    self._values[keys[i]] = value
+                while len(self._values) > self.maxsize:
+                    self._values.popitem(last=False)
+                    self.evictions += 1
+
+        table = np.empty((len(keys), self.width), dtype=object)
+        for i, value in enumerate(results):
+            table[i] = value
+        out = table[codes]
+        if self.width == 1:
+            return out[:, 0]
+        return tuple(out[:, i] for i in range(self.width))
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._values),
+            "maxsize": self.maxsize,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+            self.hits = self.misses = self.evictions = 0
+
+
+def shared_cache(name, compute, params=(), width=1):
+    """The process-wide cache for normalizer ``name`` with ``params``
+    (e.g. the category keyword map), created on first use."""
+    key = (name, params)
+    cache = _caches.get(key)
+    if cache is None:
+        with _registry_lock:
+            cache = _caches.setdefault(key, NormalizerCache(compute, width))
+    return cache
+
+
+def cache_stats():
+    """Hit/miss counters summed per normalizer name."""
+    stats = {}
+    for (name, _), cache in list(_caches.items()):
+        total = stats.setdefault(name, dict.fromkeys(("hits", "misses", "evictions", "size", "maxsize"), 0))
+        for k, v in cache.stats().items():
+            total[k] += v
+    for total in stats.values():
+        lookups = total["hits"] + total["misses"]
+        total["hit_rate"] = round(total["hits"] / lookups, 4) if lookups else 0.0
+    return stats
+
+
+def clear_caches():
+    with _registry_lock:
+        _caches.clear()
@@ -0,0 +1,66 @@
+"""Process-pool mapping across row partitions.
+
+The mapping is pure per-row logic, so the vendor frame is split into
+contiguous row ranges, each range is mapped in a worker process with its
+own ``uid`` offset, and the partial outputs are merged back in the
+original row order together with their missing-diamond rows.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from bulk_mapper.buffer import appearance_order, compact_frame, merge_first_write
+from bulk_mapper.engine import OUTPUT_COLUMNS, REQUIRED_COLUMNS, map_vendor_columns, map_vendor_frame
+from bulk_mapper.instrumentation import count, stage
+
+# Below this many rows starting the workers and pickling the partitions
+# costs more than it saves, so the frame is mapped in-process.
+PARALLEL_MIN_ROWS = 50_000
+
+
+def default_workers():
+    return os.cpu_count() or 1
+
+
+def _map_partition(part, uid_start, options):
+    record, missing_df = map_vendor_columns(part, uid_start=uid_start, **options)
+    return record.to_frame(OUTPUT_COLUMNS), record.first_write, missing_df
+
+
+def map_vendor_frame_parallel(df, workers=None, min_rows=PARALLEL_MIN_ROWS, required_columns=True, compact=False,
+                              **options):
+    """``map_vendor_frame`` over ``workers`` processes (all cores by default).
+
+    Falls back to the serial engine for a single worker or fewer than
+    ``min_rows`` rows. Returns ``(out_df, missing_df)`` identical to the
+    serial result.
+    """
+    workers = workers or default_workers()
+    n = len(df)
+    if workers <= 1 or n < min_rows:
+        return map_vendor_frame(df, required_columns=required_columns, compact=compact, **options)
+
+    df = df.reset_index(drop=True)
+    bounds = np.linspace(0, n, min(workers, n) + 1, dtype=int)
+    with stage("map_workers"), ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(_map_partition, df.iloc[start:stop], start + 1, options)
+            for start, stop in zip(bounds[:-1], bounds[1:])
+        ]
+        results = [future.result() for future in futures]
+    count("rows_mapped", n)
+
+    first_write = {}
+    for (_, part_first_write, _), start in zip(results, bounds[:-1]):
+        merge_first_write(first_write, part_first_write, int(start))
+    columns = REQUIRED_COLUMNS if required_columns else appearance_order(first_write)
+
+    with stage("build"):
+        out_df = pd.concat([frame[columns] for frame, _, _ in results], ignore_index=True)
+        missing_df = pd.concat([missing for _, _, missing in results], ignore_index=True)
+        if compact:
+            out_df = compact_frame(out_df)
+    count("rows_missing", len(missing_df))
+    return out_df, missing_df
@@ -0,0 +1,43 @@
+"""Mapping profiles of the three entry points.
+
+A profile only lists the switches that differ from ``engine.DEFAULT_PROFILE``;
+``compile_plan(**PROFILES[name])`` gives the cached plan for it. A new
+vendor profile is one more entry here, not another copy of the mapping.
+"""
+
+# dynamic_mapping.py's DETAILS keywords (case as the vendors write them).
+DYNAMIC_CATEGORY_MAP = {
+    "Bracelets": "Bracelet",
+    "bangle": "Bracelet",
+    "necklace (chain)": "Necklace",
+    "necklace": "Necklace",
+    "neck-pndt": "Necklace",
+    "ring": "Ring",
+    "earring pair": "Earring",
+    "Earrings": "Earring",
+    "pendant": "Pendant",
+    "brooch": "Brooch",
+    "accessories": "Accessories",
+}
+
+PROFILES = {
+    # Ring sizes always map to standard-size, COLLECTION goes to the
+    # <category>-style column and gemstone rows carry SD WT. as a side stone.
+    "app": dict(price_field="TAG PRICE"),
+    # Sizes are parsed before the ring check, no collection/side-stone fields.
+    "main": dict(
+        price_field="gem gem sale price",
+        ring_standard_size=False,
+        collection_styles=False,
+        side_stone=False,
+    ),
+    # app.py's rules with the sale price and the vendor's own keywords.
+    "dynamic": dict(price_field="gem gem sale price", category_map=DYNAMIC_CATEGORY_MAP),
+}
+
+# Profile of batch-run vendors without a mapping file (python -m bulk_mapper).
+DEFAULT_BATCH_PROFILE = "app"
+
+# What happens to rows whose SKU (TAG NO) repeats; see bulk_mapper.dedup.
+DUPLICATE_POLICIES = ("keep-all", "keep-first", "keep-last", "error")
+DEFAULT_DUPLICATE_POLICY = "keep-all"
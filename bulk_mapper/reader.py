@@ -0,0 +1,348 @@
+"""Vendor file ingestion.
+
+The format is taken from the first bytes of the file (an XLSX workbook is
+a zip archive, an XLS one an OLE2 compound file) instead of trying the CSV
+parser first. CSV is parsed by pyarrow when it is installed, with every
+column read as text (``pd.read_csv(engine="pyarrow")`` infers numbers
+first and turns "2.60" into "2.6"). ``usecols`` prunes the input to the
+columns the mapping reads (see ``engine.vendor_columns``); names missing
+from the header are skipped, the mapping fills them with empty strings.
+
+XLSX worksheets are streamed with openpyxl in read-only mode: rows come
+as plain value tuples, only the cells of the columns kept are converted
+to text as each row arrives and every ``chunksize`` rows become a frame,
+so neither the workbook nor a chunk of whole rows is held in memory.
+Cells read as ``pd.read_excel(dtype=str)`` reads them (whole numbers
+without ".0", NA markers and formula errors as "", blank rows at the end
+dropped); cells to the right of the header row are ignored. XLS workbooks
+go through ``pd.read_excel``. ``sheet`` picks a worksheet by name, the
+first one by default (see ``sheet_names``).
+
+Every reader returns ``str`` columns with NaN filled with "".
+"""
+import importlib.util
+import io
+import itertools
+
+import pandas as pd
+from pandas._libs.parsers import STR_NA_VALUES
+
+from bulk_mapper.engine import EXPECTED_VENDOR_FIELDS
+from bulk_mapper.instrumentation import count, stage
+
+DEFAULT_CHUNK_ROWS = 50_000
+
+ZIP_MAGIC = b"PK\x03\x04"
+OLE2_MAGIC = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+
+
+def _peek(source, size=8):
+    if hasattr(source, "read"):
+        position = source.tell()
+        head = source.read(size)
+        source.seek(position)
+        return head.encode() if isinstance(head, str) else head
+    with open(source, "rb") as f:
+        return f.read(size)
+
+
+def detect_format(source):
+    """``"excel"`` for an XLSX/XLS workbook, ``"csv"`` otherwise."""
+    head = _peek(source)
+    if head.startswith(ZIP_MAGIC) or head.startswith(OLE2_MAGIC):
+        return "excel"
+    return "csv"
+
+
+def _is_xlsx(source):
+    return _peek(source, len(ZIP_MAGIC)) == ZIP_MAGIC
+
+
+# Values of formula cells that failed; read_excel reads them as NaN.
+EXCEL_ERRORS = ("#NULL!", "#DIV/0!", "#VALUE!", "#REF!", "#NAME?", "#NUM!", "#N/A")
+_EMPTY_CELLS = frozenset(STR_NA_VALUES) | frozenset(EXCEL_ERRORS)
+
+
+def _cell_text(value):
+    if value.__class__ is str:
+        return "" if value in _EMPTY_CELLS else value
+    if value is None:
+        return ""
+    if value.__class__ is float and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _open_workbook(source):
+    from openpyxl import load_workbook
+
+    return load_workbook(source, read_only=True, data_only=True, keep_links=False)
+
+
+def _xlsx_rows(source, sheet=None):
+    """Rows of a worksheet as tuples of cell values, without the blank
+    rows at its end."""
+    workbook = _open_workbook(source)
+    try:
+        worksheet = workbook.worksheets[0] if sheet is None else workbook[sheet]
+        # Some writers store wrong dimensions; rows then come as long as
+        # their last cell.
+        worksheet.reset_dimensions()
+        blank = 0
+        for row in worksheet.iter_rows(values_only=True):
+            if any(value is not None and value != "" for value in row):
+                yield from itertools.repeat((), blank)
+                blank = 0
+                yield row
+            else:
+                blank += 1
+    finally:
+        workbook.close()
+
+
+def _column_names(row):
+    """Header cells as ``read_excel`` names the columns."""
+    values = list(row)
+    while values and (values[-1] is None or values[-1] == ""):
+        values.pop()
+    names = []
+    seen = {}
+    for i, value in enumerate(values):
+        if value is None or value == "":
+            name = f"Unnamed: {i}"
+        elif value.__class__ is float and value.is_integer():
+            name = str(int(value))
+        else:
+            name = str(value)
+        seen[name] = seen.get(name, 0) + 1
+        names.append(name if seen[name] == 1 else f"{name}.{seen[name] - 1}")
+    return names
+
+
+def _xlsx_chunks(source, chunksize, usecols=None, start_row=0, sheet=None):
+    """Frames of at most ``chunksize`` rows of a worksheet."""
+    cells = _xlsx_rows(source, sheet)
+    try:
+        header = _column_names(next(cells, ()))
+        columns = header if usecols is None else _present(header, usecols)
+        positions = [header.index(col) for col in columns]
+        rows = itertools.islice(cells, start_row, None)
+        while True:
+            values = [[] for _ in columns]
+            read = 0
+            for row in itertools.islice(rows, chunksize):
+                read += 1
+                width = len(row)
+                for column, i in zip(values, positions):
+                    column.append(_cell_text(row[i]) if i < width else "")
+            if not read:
+                return
+            yield pd.DataFrame(dict(zip(columns, values)), index=pd.RangeIndex(read), columns=columns, dtype=str)
+    finally:
+        cells.close()
+
+
+def sheet_names(source):
+    """Worksheet names of a workbook in order, None for a CSV. A file
+    object is left at its position."""
+    if detect_format(source) != "excel":
+        return None
+    position = source.tell() if hasattr(source, "read") else None
+    try:
+        if not _is_xlsx(source):
+            with pd.ExcelFile(source) as workbook:
+                return [str(name) for name in workbook.sheet_names]
+        workbook = _open_workbook(source)
+        try:
+            return [worksheet.title for worksheet in workbook.worksheets]
+        finally:
+            workbook.close()
+    finally:
+        if position is not None:
+            source.seek(position)
+
+
+def default_csv_engine():
+    return "pyarrow" if importlib.util.find_spec("pyarrow") is not None else "c"
+
+
+def _csv_header(source):
+    position = source.tell() if hasattr(source, "read") else None
+    header = list(pd.read_csv(source, dtype=str, nrows=0).columns)
+    if position is not None:
+        source.seek(position)
+    return header
+
+
+def _raw_header(source):
+    """The header row as written, before pandas renames blank and repeated
+    names ("Unnamed: 2", "CT.1")."""
+    position = source.tell() if hasattr(source, "read") else None
+    header = pd.read_csv(source, dtype=str, header=None, nrows=1, keep_default_na=False).iloc[0].tolist()
+    if position is not None:
+        source.seek(position)
+    return header
+
+
+def _present(header, usecols):
+    wanted = set(usecols)
+    return [col for col in header if col in wanted]
+
+
+def _read_csv_arrow(source, columns):
+    """The CSV read by pyarrow, or None when pyarrow rejects a file the C
+    parser reads (rows with fewer fields than the header)."""
+    import pyarrow as pa
+    from pyarrow import csv
+
+    position = source.tell() if hasattr(source, "read") else None
+    convert = csv.ConvertOptions(
+        column_types={col: pa.string() for col in columns},
+        include_columns=columns,
+        null_values=sorted(STR_NA_VALUES),
+        strings_can_be_null=True,
+    )
+    try:
+        table = csv.read_csv(source, parse_options=csv.ParseOptions(newlines_in_values=True),
+                             convert_options=convert)
+    except (pa.ArrowInvalid, pa.ArrowKeyError):
+        if position is not None:
+            source.seek(position)
+        return None
+    return table.to_pandas()
+
+
+def read_vendor_file(source, usecols=None, engine=None, sheet=None):
+    """Read a whole vendor CSV or workbook.
+
+    ``usecols``: vendor columns to keep, None keeps all of them.
+    ``engine``: CSV parser, defaults to pyarrow when it is installed. Files
+    pyarrow reads differently from pandas (blank or repeated header names,
+    rows with fewer fields) go to the C parser.
+    ``sheet``: worksheet of a workbook, None for the first one.
+    """
+    with stage("read"):
+        df = _read_whole(source, usecols, engine, sheet)
+    count("rows_read", len(df))
+    return df
+
+
+def _read_excel(source, usecols, sheet):
+    wanted = None if usecols is None else set(usecols)
+    df = pd.read_excel(source, dtype=str, sheet_name=0 if sheet is None else sheet,
+                       usecols=None if wanted is None else wanted.__contains__)
+    return df.fillna("")
+
+
+def _read_whole(source, usecols, engine, sheet=None):
+    if detect_format(source) == "excel":
+        if not _is_xlsx(source):
+            return _read_excel(source, usecols, sheet)
+        frames = list(_xlsx_chunks(source, DEFAULT_CHUNK_ROWS, usecols, sheet=sheet))
+        if not frames:
+            header = _header(source, sheet)
+            return pd.DataFrame(columns=header if usecols is None else _present(header, usecols), dtype=str)
+        return frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+
+    engine = engine or default_csv_engine()
+    if engine == "pyarrow" and isinstance(source, io.TextIOBase):
+        engine = "c"  # pyarrow reads bytes only
+    header = _csv_header(source) if engine == "pyarrow" or usecols is not None else None
+    if usecols is not None:
+        usecols = _present(header, usecols)
+    df = None
+    # pyarrow does not rename blank or repeated names as pandas does.
+    if engine == "pyarrow" and _raw_header(source) == header:
+        df = _read_csv_arrow(source, header if usecols is None else usecols)
+    if df is None:
+        df = pd.read_csv(source, dtype=str, usecols=usecols, engine="c" if engine == "pyarrow" else engine)
+    return df.fillna("")
+
+
+def read_vendor_chunks(source, chunksize=DEFAULT_CHUNK_ROWS, usecols=None, start_row=0, sheet=None):
+    """Yield the vendor file as frames of at most ``chunksize`` rows.
+
+    The pyarrow engine cannot read in chunks, so CSV uses the C parser. An
+    XLSX worksheet is streamed row by row; an XLS one is read whole and
+    then sliced. ``start_row`` skips that many data rows first (resuming a
+    checkpointed run). CSV rows are parsed and dropped, since blank lines
+    and quoted newlines make line counts differ from row counts; worksheet
+    rows are skipped before their cells are converted.
+    """
+    if detect_format(source) == "excel":
+        if _is_xlsx(source):
+            yield from _xlsx_chunks(source, chunksize, usecols, start_row, sheet)
+            return
+        df = _read_excel(source, usecols, sheet)
+        for start in range(start_row, len(df), chunksize):
+            yield df.iloc[start:start + chunksize]
+        return
+    if usecols is not None:
+        usecols = _present(_csv_header(source), usecols)
+    # Closing the reader, also when the caller stops early, leaves a
+    # caller's file object open; a reader that is just dropped closes it.
+    with pd.read_csv(source, dtype=str, usecols=usecols, chunksize=chunksize) as reader:
+        skipped = 0
+        while skipped < start_row:
+            try:
+                skipped += len(reader.get_chunk(min(start_row - skipped, chunksize)))
+            except StopIteration:
+                return
+        for chunk in reader:
+            yield chunk.fillna("")
+
+
+def read_header(source, sheet=None):
+    """Column names of a vendor CSV or workbook (``sheet``, else the
+    first one), without reading its rows. A file object is read from its
+    start and left at its position."""
+    if not hasattr(source, "read"):
+        return _header(source, sheet)
+    position = source.tell()
+    source.seek(0)
+    try:
+        return _header(source, sheet)
+    finally:
+        source.seek(position)
+
+
+def _header(source, sheet=None):
+    if detect_format(source) == "excel":
+        if _is_xlsx(source):
+            cells = _xlsx_rows(source, sheet)
+            try:
+                return _column_names(next(cells, ()))
+            finally:
+                cells.close()
+        return [str(col) for col in pd.read_excel(source, dtype=str, nrows=0,
+                                                  sheet_name=0 if sheet is None else sheet).columns]
+    return _csv_header(source)
+
+
+def read_mapping_pairs(source):
+    """The first two columns of a mapping CSV or workbook as an ordered
+    dict, first column → second (stripped, blank kept as ""); rows with a
+    blank first column are dropped and later rows win."""
+    if detect_format(source) == "excel":
+        mdf = pd.read_excel(source, dtype=str).fillna("")
+    else:
+        mdf = pd.read_csv(source, dtype=str).fillna("")
+    if len(mdf.columns) < 2:
+        raise ValueError("Mapping file must have at least two columns: expected_field and vendor_column")
+    keys = mdf.iloc[:, 0].str.strip()
+    values = mdf.iloc[:, 1].str.strip()
+    named = keys != ""
+    return dict(zip(keys[named], values[named]))
+
+
+def read_field_map(source):
+    """Expected field → vendor column from a mapping CSV or workbook.
+
+    The first column holds the expected field, the second the vendor
+    column (blank keeps the field's own name); later rows win. Fields the
+    file does not mention map to themselves.
+    """
+    field_map = {field: column or field for field, column in read_mapping_pairs(source).items()}
+    for field in EXPECTED_VENDOR_FIELDS:
+        field_map.setdefault(field, field)
+    return field_map
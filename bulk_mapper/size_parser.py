@@ -0,0 +1,62 @@
+"""Single-pass, column-wise SIZE parser.
+
+``parse_size`` tries three patterns per value (inches, LxW, single
+length). Here they are one precompiled pattern, so a whole SIZE column is
+parsed by a single ``str.extract``:
+
+- ``16`` / ``16"``       → length 16, unit cm (inches are stored as cm)
+- ``5.5*4.5cm``, ``6x4`` → length, width, optional cm/mm unit
+- ``18cm`` / ``5.5mm``   → length and unit
+
+The Ring rule is applied afterwards as a mask over the category column.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+SIZE_RE = re.compile(
+    r"^(?P<length>\d+\.?\d*)"
+    r"(?:(?P<inch>\")"
+    r"|[*xX](?P<width>\d+\.?\d*)(?P<double_unit>cm|mm)?"
+    r"|(?P<unit>cm|mm))?$"
+)
+
+
+def normalize_size_text(sizes):
+    return sizes.str.strip().str.lower().str.replace(" ", "", regex=False)
+
+
+def parse_size_column(sizes, categories, ring_standard_size=True):
+    """Column version of ``engine.parse_size``; returns four object arrays
+    (size_length, size_width, size_unit, standard_size).
+
+    With ``ring_standard_size`` every Ring row keeps its whole size string
+    as standard-size (app.py). Without it (main.py) sizes are parsed as for
+    any other category: its numeric ring check came after the inch pattern,
+    which already accepts every plain number.
+    """
+    size_str = normalize_size_text(pd.Series(sizes, dtype=object))
+    parts = size_str.str.extract(SIZE_RE).fillna("")
+
+    matched = (parts["length"] != "").to_numpy()
+    is_double = (parts["width"] != "").to_numpy()
+    has_unit = (parts["unit"] != "").to_numpy()
+
+    length = np.where(matched, parts["length"].to_numpy(dtype=object), "").astype(object)
+    width = parts["width"].to_numpy(dtype=object).copy()
+    unit = np.where(
+        is_double,
+        parts["double_unit"].to_numpy(dtype=object),
+        np.where(has_unit, parts["unit"].to_numpy(dtype=object), np.where(matched, "cm", "")),
+    ).astype(object)
+    standard = np.full(len(size_str), "", dtype=object)
+
+    if ring_standard_size:
+        is_ring = np.asarray(pd.Series(categories, dtype=object) == "Ring")
+        length[is_ring] = ""
+        width[is_ring] = ""
+        unit[is_ring] = ""
+        standard[is_ring] = size_str.to_numpy(dtype=object)[is_ring]
+
+    return length, width, unit, standard
@@ -0,0 +1,125 @@
+"""Chunked mapping for vendor files too large to hold in memory.
+
+The vendor file is read ``chunksize`` rows at a time; each chunk is mapped
+and appended straight to the output CSV and the missing-diamond CSV, so
+peak memory depends on the chunk size rather than the file size. ``uid``
+keeps counting across chunks and the bytes written match the whole-file
+path.
+"""
+import os
+import tempfile
+from contextlib import ExitStack
+
+import pandas as pd
+
+from bulk_mapper.buffer import appearance_order, merge_first_write
+from bulk_mapper.checkpoint import stream_vendor_file_checkpointed
+from bulk_mapper.engine import OUTPUT_COLUMNS, REQUIRED_COLUMNS, map_vendor_columns
+from bulk_mapper.instrumentation import count, stage, timed_iter
+from bulk_mapper.reader import DEFAULT_CHUNK_ROWS, read_vendor_chunks
+from bulk_mapper.validation import validate_frame
+from bulk_mapper.writers import DEFAULT_OUTPUT_FORMAT, open_writer
+
+
+def _open_output(stack, target):
+    if hasattr(target, "write"):
+        return target
+    return stack.enter_context(open(target, "w", newline="", encoding="utf-8"))
+
+
+def stream_vendor_file(source, output, missing_output, chunksize=DEFAULT_CHUNK_ROWS,
+                       required_columns=True, output_format=DEFAULT_OUTPUT_FORMAT, usecols=None, checkpoint_root=None,
+                       keep=None, rejected_output=None, sheet=None, **options):
+    """Map ``source`` chunk by chunk; returns ``(rows, missing_rows)``.
+
+    ``output`` is written in ``output_format`` (see ``writers``) and
+    ``missing_output`` as CSV; both are paths or handles. The
+    missing-diamond file is only created when a chunk has missing weights.
+    ``usecols`` prunes the vendor columns read and ``sheet`` picks the
+    worksheet of a workbook (see ``reader``). The other options are those
+    of ``map_vendor_columns``.
+
+    With ``required_columns=False`` the column order depends on which rows
+    come first in the whole file, so chunks are staged in a temporary CSV
+    with every possible column and copied to ``output`` in the final order
+    once the file has been read.
+
+    ``checkpoint_root`` keeps every mapped chunk on disk under it, so a run
+    that dies partway resumes from the last completed chunk when it is
+    started again (see ``checkpoint``); ``output`` and ``missing_output``
+    must then be paths.
+
+    ``keep`` is a boolean array over the file's rows; rows where it is
+    False are read but not mapped, and ``uid`` numbers the mapped rows
+    (see ``dedup.scan_duplicate_skus``).
+
+    With a ``rejected_output`` (path or handle) each mapped chunk is
+    checked with ``validation.validate_frame``: ``rows`` counts the rows
+    written to ``output`` and the rejected ones go to ``rejected_output``
+    as CSV, created only when there are any. ``uid`` still numbers every
+    mapped row. With ``required_columns=False`` the rejected file has
+    every output column.
+    """
+    if checkpoint_root is not None:
+        return stream_vendor_file_checkpointed(source, output, missing_output, checkpoint_root, chunksize,
+                                               required_columns, output_format, usecols, keep, rejected_output,
+                                               sheet, **options)
+    read = 0
+    rows = 0
+    missing_rows = 0
+    rejected_rows = 0
+    first_write = {}
+    with ExitStack() as stack:
+        if required_columns:
+            staging = stack.enter_context(open_writer(output, output_format))
+            columns = REQUIRED_COLUMNS
+        else:
+            fd, staging_path = tempfile.mkstemp(suffix=".csv")
+            stack.callback(os.remove, staging_path)
+            staging_handle = stack.enter_context(open(fd, "w", newline="", encoding="utf-8"))
+            staging = open_writer(staging_handle)
+            columns = OUTPUT_COLUMNS
+        missing_handle = None
+        rejected_handle = None
+
+        for chunk in timed_iter("read", read_vendor_chunks(source, chunksize, usecols, sheet=sheet)):
+            count("rows_read", len(chunk))
+            if keep is not None:
+                start, read = read, read + len(chunk)
+                chunk = chunk[keep[start:read]]
+            record, missing_df = map_vendor_columns(chunk.reset_index(drop=True), uid_start=rows + 1, **options)
+            with stage("build"):
+                frame = record.to_frame(columns)
+            if rejected_output is not None:
+                frame, rejected = validate_frame(frame)
+                if len(rejected):
+                    if rejected_handle is None:
+                        rejected_handle = _open_output(stack, rejected_output)
+                    rejected.to_csv(rejected_handle, header=rejected_rows == 0, index=False)
+                    rejected_rows += len(rejected)
+            staging.write(frame)
+            merge_first_write(first_write, record.first_write, rows)
+            if len(missing_df):
+                if missing_handle is None:
+                    missing_handle = _open_output(stack, missing_output)
+                missing_df.to_csv(missing_handle, header=missing_rows == 0, index=False)
+                missing_rows += len(missing_df)
+            rows += len(chunk)
+
+        written = rows - rejected_rows
+        if written == 0:
+            staging.write(pd.DataFrame(columns=columns))
+
+        if not required_columns:
+            staging_handle.close()
+            final_columns = appearance_order(first_write)
+            target = stack.enter_context(open_writer(output, output_format))
+            if written == 0:
+                target.write(pd.DataFrame(columns=final_columns))
+            else:
+                staged = pd.read_csv(staging_path, dtype=str, keep_default_na=False,
+                                     usecols=final_columns, chunksize=chunksize)
+                for part in staged:
+                    target.write(part[final_columns])
+
+    return written, missing_rows
@@ -0,0 +1,74 @@
+"""Streamlit pieces shared by app.py and dynamic_mapping.py.
+
+The only module of the package that imports Streamlit; batch jobs, the
+CLI and the service never import it.
+"""
+import hashlib
+import json
+import os
+import tempfile
+
+import streamlit as st
+
+from bulk_mapper.instrumentation import timing_table
+
+# Chunked runs interrupted by a crash, a deploy or a page refresh resume
+# from here when the same file is processed again.
+CHECKPOINT_ROOT = os.path.join(tempfile.gettempdir(), "gemgem_checkpoints")
+
+# ========== SESSION CACHE ==========
+# Parsed uploads, mapping dicts and finished outputs are cached by content
+# hash, so a repeat run or a rerun after a download reuses them. Entries
+# are evicted least-recently-used past CACHE_MAX_ENTRIES and after
+# CACHE_TTL_SECONDS, which bounds a busy shared instance.
+CACHE_MAX_ENTRIES = 8
+CACHE_TTL_SECONDS = 60 * 60
+
+
+def file_digest(uploaded_file):
+    """Content hash of an upload, "" when there is none."""
+    if uploaded_file is None:
+        return ""
+    return hashlib.sha256(uploaded_file.getvalue()).hexdigest()
+
+
+def conflicts_csv(conflicts):
+    """Repeated-SKU report as CSV bytes, b"" when no SKU repeats."""
+    return conflicts.to_csv(index=False).encode("utf-8") if len(conflicts) else b""
+
+
+# ========== REPORTS ==========
+
+def show_duplicates(conflicts_bytes, rows):
+    """Repeated-SKU warning and report; ``rows`` is the conflicts frame's
+    length (a quoted field can hold a newline, so the CSV's lines are not
+    its rows)."""
+    st.warning(f"{rows:,} rows repeat a SKU (TAG NO); GemGem rejects repeated SKUs.")
+    st.download_button(
+        label="⚠️ Download Repeated SKUs CSV",
+        data=conflicts_bytes,
+        file_name="duplicate_skus.csv",
+        mime="text/csv"
+    )
+
+
+def show_rejected(data):
+    st.warning("Some rows would be rejected by GemGem and are not in the output; the report lists why.")
+    st.download_button(
+        label="⚠️ Download Rejected Rows CSV",
+        data=data,
+        file_name="rejected_rows.csv",
+        mime="text/csv"
+    )
+
+
+def show_timings(report, file_name):
+    with st.expander("⏱️ Timing breakdown", expanded=True):
+        st.caption(f"{report['total_seconds']:.2f} s in total · rows: {report['counters']}")
+        st.dataframe(timing_table(report), hide_index=True)
+        st.download_button(
+            label="Download timing report (JSON)",
+            data=json.dumps(report, indent=2),
+            file_name=file_name,
+            mime="application/json"
+        )
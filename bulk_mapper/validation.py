@@ -0,0 +1,155 @@
+"""Pre-upload checks of the mapped GemGem output.
+
+GemGem rejects a whole upload over rows it cannot take: an empty SKU, a
+price that is not a number, a gold purity it does not know (e.g. "18KK"
+or "PT950K" from ``format_gold_purity``), a Ring whose standard-size is
+not a number. ``validate_frame`` finds those rows before the upload and
+splits the output into the accepted rows and the rejected ones, each
+with the reasons.
+
+The checks are data (``VALIDATION_RULES``), like the mapping rules: an
+output column, a test from ``TESTS`` and optionally the category of the
+rows it applies to. A value test (number, purity) runs once per distinct
+non-empty value of a column (the categories of a compact frame, else a
+``factorize`` of its non-empty rows) and is broadcast back to the rows by
+code, so there is no per-row parsing; "required" is one comparison with
+"". Reasons are only built for the rejected rows.
+
+The rejected rows keep their output columns and ``uid``, after a
+``rejection_reasons`` column ("; "-separated, e.g. ``price is not a
+positive number: 12,50``).
+"""
+import numpy as np
+import pandas as pd
+
+from bulk_mapper.instrumentation import count, stage
+
+REASONS_COLUMN = "rejection_reasons"
+
+# gold-purity values GemGem lists; format_gold_purity upper-cases them.
+GOLD_PURITIES = ("8K", "9K", "10K", "12K", "14K", "15K", "18K", "20K", "21K", "22K", "24K")
+
+
+def _numbers(uniques):
+    return pd.to_numeric(pd.Series(uniques, dtype=object), errors="coerce").to_numpy(dtype=float)
+
+
+def _is_number(uniques):
+    numbers = _numbers(uniques)
+    return (uniques == "") | (np.isfinite(numbers) & (numbers >= 0))
+
+
+def _is_positive_number(uniques):
+    numbers = _numbers(uniques)
+    return (uniques == "") | (np.isfinite(numbers) & (numbers > 0))
+
+
+# test → (values → boolean "passes", reason). "required" gets the column,
+# the others its distinct non-empty values, as "" passes them. A reason
+# with "{value}" shows the rejected value.
+TESTS = {
+    "required": (lambda values: values != "", "is empty"),
+    "number": (_is_number, "is not a number: {value}"),
+    "positive-number": (_is_positive_number, "is not a positive number: {value}"),
+    "gold-purity": (lambda uniques: np.isin(uniques, ("",) + GOLD_PURITIES), "is not a known purity: {value}"),
+}
+
+
+def check(column, test, category=None):
+    """Rows whose ``column`` fails ``test`` are rejected; with a
+    ``category``, only rows of that category are checked."""
+    return (column, test, category)
+
+
+VALIDATION_RULES = [
+    check("sku", "required"),
+    check("price", "required"),
+    check("price", "positive-number"),
+    check("gold-purity", "gold-purity"),
+    check("standard-size", "number", "Ring"),
+    check("total-weight", "number"),
+    check("diamond_quantity", "number"),
+    check("diamond_carat-weight", "number"),
+    check("gemstone_carat-weight", "number"),
+]
+
+
+def _column(frame, column):
+    if column not in frame.columns:
+        return pd.Series("", index=frame.index, dtype=object)
+    return frame[column]
+
+
+def _distinct(values):
+    """``(codes, uniques)`` of a column; empty rows may have code -1
+    instead. A categorical column already is that."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.codes.to_numpy(), np.asarray(values.cat.categories, dtype=object)
+    values = values.to_numpy(dtype=object)
+    filled = np.flatnonzero(values != "")
+    codes = np.full(len(values), -1, dtype=np.intp)
+    codes[filled], uniques = pd.factorize(values[filled], use_na_sentinel=False)
+    return codes, np.asarray(uniques, dtype=object)
+
+
+def _reasons(failures, rows, frame):
+    """"; "-joined reasons of the rejected ``rows``."""
+    reasons = np.full(len(rows), "", dtype=object)
+    for column, test, failed in failures:
+        failed = failed[rows]
+        if not failed.any():
+            continue
+        message = f"{column} {TESTS[test][1]}"
+        if "{value}" in message:
+            before, after = message.split("{value}")
+            text = before + frame[column].iloc[rows[failed]].to_numpy(dtype=object) + after
+        else:
+            text = np.full(failed.sum(), message, dtype=object)
+        current = reasons[failed]
+        reasons[failed] = np.where(current == "", text, current + "; " + text)
+    return reasons
+
+
+def rejected_rows(frame, rules=VALIDATION_RULES):
+    """``(rejected, failures)``: the boolean mask of the rows failing any
+    rule, and ``(column, test, failed mask)`` per rule that failed rows."""
+    rejected = np.zeros(len(frame), dtype=bool)
+    failures = []
+    distinct = {}
+    in_category = {}
+    for column, test, category in rules:
+        passes = TESTS[test][0]
+        if test == "required":
+            failed = ~np.asarray(passes(_column(frame, column)), dtype=bool)
+        else:
+            if column not in distinct:
+                distinct[column] = _distinct(_column(frame, column))
+            codes, uniques = distinct[column]
+            # code -1 (an empty row) picks the appended False
+            failed = np.append(~np.asarray(passes(uniques), dtype=bool), False)[codes]
+        if category is not None and failed.any():
+            if category not in in_category:
+                in_category[category] = np.asarray(_column(frame, "category") == category, dtype=bool)
+            failed &= in_category[category]
+        if failed.any():
+            failures.append((column, test, failed))
+            rejected |= failed
+    return rejected, failures
+
+
+def validate_frame(frame, rules=VALIDATION_RULES):
+    """``(accepted, rejected)`` rows of a mapped output frame.
+
+    ``accepted`` is ``frame`` itself when every row passes, else its
+    passing rows (index reset). ``rejected`` has ``REASONS_COLUMN`` and
+    then the frame's columns.
+    """
+    with stage("validate"):
+        mask, failures = rejected_rows(frame, rules)
+        rows = np.flatnonzero(mask)
+        rejected = pd.concat([pd.DataFrame({REASONS_COLUMN: _reasons(failures, rows, frame)}),
+                              frame.take(rows).reset_index(drop=True)], axis=1)
+        if len(rows):
+            frame = frame.take(np.flatnonzero(~mask)).reset_index(drop=True)
+    count("rows_rejected", len(rows))
+    return frame, rejected
@@ -0,0 +1,163 @@
+"""On-disk registry of vendor field maps, keyed by the vendor file's header.
+
+A vendor exports the same columns every time, so the field map
+(expected field → vendor column, see ``engine.map_vendor_columns``) that
+worked for one of its files works for the next. ``VendorRegistry`` keeps
+one JSON entry per header fingerprint (a hash of the column names,
+whatever their order) under its root directory. Looking a vendor up is
+one file read, and the entry holds the resolved field map, so the
+mapping file is not parsed again.
+
+An unknown header is matched against ``EXPECTED_VENDOR_FIELDS`` once:
+exact names first, then names that differ only in case, spacing and
+punctuation ("Tag No" for TAG NO, "METAL WT" for METAL WT.). The entry is
+then stored. Registering a mapping file replaces the entry. The file
+may be a field map (expected_field,vendor_column) or an output-field
+template like mapping_template_full.csv (GemGem column,vendor column). A
+template's columns are translated through the mapping rules that copy a
+vendor field straight to an output column (``engine.field_columns``).
+Template entries for derived columns, or for columns this header does
+not have, are listed in the entry's ``ignored``.
+
+Entries are written to a temporary file of their own and renamed into
+place, so concurrent runs see either the old entry or the new one.
+"""
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+
+from bulk_mapper.engine import EXPECTED_VENDOR_FIELDS, OUTPUT_COLUMNS, field_columns
+from bulk_mapper.profiles import PROFILES
+from bulk_mapper.reader import read_header, read_mapping_pairs
+
+REGISTRY_VERSION = 1
+
+
+def header_fingerprint(header):
+    """Hash naming a header's entry; the column order does not matter."""
+    return hashlib.sha256("\n".join(sorted(set(header))).encode()).hexdigest()[:32]
+
+
+def _match_key(name):
+    return re.sub(r"[^0-9a-z]", "", str(name).lower())
+
+
+def auto_field_map(header):
+    """Expected field → vendor column for the fields ``header`` names
+    exactly or up to case, spacing and punctuation; the others map to
+    themselves (and are read as empty)."""
+    present = set(header)
+    by_key = {}
+    for name in header:
+        by_key.setdefault(_match_key(name), name)
+    field_map = {}
+    for field in EXPECTED_VENDOR_FIELDS:
+        field_map[field] = field if field in present else by_key.get(_match_key(field), field)
+    return field_map
+
+
+def is_template(pairs):
+    """Whether mapping pairs name GemGem output columns rather than
+    expected vendor fields."""
+    output = sum(key in OUTPUT_COLUMNS for key in pairs)
+    expected = sum(key in EXPECTED_VENDOR_FIELDS for key in pairs)
+    return output > expected
+
+
+def template_field_map(pairs, header, profile=None):
+    """``(field_map, ignored)`` for an output-field template on a file
+    with ``header``: each template column copied straight from a vendor
+    field points that field at the template's vendor column. ``ignored``
+    lists the template's output columns that could not be used."""
+    fields = field_columns(**(PROFILES["dynamic"] if profile is None else profile))
+    present = set(header)
+    field_map = auto_field_map(header)
+    ignored = []
+    for output_column, vendor_column in pairs.items():
+        if not vendor_column:
+            continue
+        if output_column in fields and vendor_column in present:
+            field_map[fields[output_column]] = vendor_column
+        else:
+            ignored.append(output_column)
+    return field_map, ignored
+
+
+class VendorRegistry:
+    """Field maps by header fingerprint, one JSON file each under ``root``."""
+
+    def __init__(self, root):
+        self.root = root
+        self._entries = {}
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, fingerprint):
+        return os.path.join(self.root, f"{fingerprint}.json")
+
+    def get(self, header):
+        """The entry for ``header``, None for an unknown vendor."""
+        fingerprint = header_fingerprint(header)
+        entry = self._entries.get(fingerprint)
+        if entry is not None:
+            return entry
+        try:
+            with open(self._path(fingerprint)) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get("version") != REGISTRY_VERSION:
+            return None
+        self._entries[fingerprint] = entry
+        return entry
+
+    def put(self, header, field_map, origin, ignored=()):
+        """Store ``field_map`` as the entry for ``header``; returns it."""
+        fingerprint = header_fingerprint(header)
+        present = set(header)
+        entry = {
+            "version": REGISTRY_VERSION,
+            "fingerprint": fingerprint,
+            "header": list(header),
+            "field_map": dict(field_map),
+            "origin": origin,
+            "unmatched": [field for field in EXPECTED_VENDOR_FIELDS if field_map.get(field, field) not in present],
+            "ignored": list(ignored),
+            "updated": time.time(),
+        }
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(entry, f, indent=1)
+            os.replace(tmp, self._path(fingerprint))
+        except BaseException:
+            os.remove(tmp)
+            raise
+        self._entries[fingerprint] = entry
+        return entry
+
+    def register(self, header, mapping_source, origin=None):
+        """Store the field map of a mapping file (field map or output-field
+        template) for ``header``; returns the entry. ``origin`` defaults
+        to the kind of file."""
+        pairs = read_mapping_pairs(mapping_source)
+        if is_template(pairs):
+            field_map, ignored = template_field_map(pairs, header)
+            return self.put(header, field_map, origin or "template", ignored)
+        field_map = auto_field_map(header)
+        field_map.update({field: column or field for field, column in pairs.items()})
+        return self.put(header, field_map, origin or "mapping")
+
+    def resolve(self, source, mapping_source=None, sheet=None):
+        """The entry for a vendor file (``sheet`` of a workbook):
+        ``mapping_source`` is registered when given, otherwise the stored
+        entry is used, and an unknown header is auto-matched and stored."""
+        header = read_header(source, sheet)
+        if mapping_source is not None:
+            return self.register(header, mapping_source)
+        entry = self.get(header)
+        if entry is None:
+            entry = self.put(header, auto_field_map(header), "auto")
+        return entry
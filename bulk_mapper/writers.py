@@ -0,0 +1,189 @@
+"""Output writers for the mapped GemGem frame.
+
+Every writer takes the output one frame at a time (the whole output, or
+one chunk of it in streaming mode) and writes it straight to its target,
+so no writer holds the full CSV text in memory:
+
+- ``csv``: plain CSV, byte-identical to ``DataFrame.to_csv``.
+- ``csv.gz`` / ``csv.zst``: the same CSV through gzip or zstandard.
+- ``parquet``: Parquet via pyarrow with dictionary-encoded string columns,
+  which suits the mostly empty, low-cardinality output.
+
+pyarrow and zstandard are optional; they are imported when a writer that
+needs them is opened, and ``available_formats`` only lists the formats
+whose dependency is installed. The module itself does not import pandas,
+so the CLI can list the formats without loading it.
+"""
+import gzip
+import importlib.util
+import io
+from contextlib import ExitStack
+
+from bulk_mapper.instrumentation import count, stage
+
+DEFAULT_OUTPUT_FORMAT = "csv"
+
+# Rows pandas formats per write call, so the CSV text is produced in pieces.
+CSV_WRITE_ROWS = 10_000
+
+
+class CsvWriter:
+    """Plain CSV to a path or an open text handle."""
+
+    suffix = ".csv"
+    mime = "text/csv"
+    requires = None
+
+    def __init__(self, target):
+        self._stack = ExitStack()
+        self._handle = self._open(target)
+        self._header = True
+
+    def _open(self, target):
+        if hasattr(target, "write"):
+            return target
+        return self._stack.enter_context(open(target, "w", newline="", encoding="utf-8"))
+
+    def write(self, frame):
+        with stage("write"):
+            frame.to_csv(self._handle, header=self._header, index=False, chunksize=CSV_WRITE_ROWS)
+        count("rows_written", len(frame))
+        self._header = False
+
+    def close(self):
+        self._stack.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class GzipCsvWriter(CsvWriter):
+    """CSV through gzip; ``target`` is a path or a binary handle."""
+
+    suffix = ".csv.gz"
+    mime = "application/gzip"
+
+    def _open(self, target):
+        return self._stack.enter_context(gzip.open(target, "wt", newline="", encoding="utf-8"))
+
+
+class ZstdCsvWriter(CsvWriter):
+    """CSV through zstandard; ``target`` is a path or a binary handle."""
+
+    suffix = ".csv.zst"
+    mime = "application/zstd"
+    requires = "zstandard"
+
+    def _open(self, target):
+        import zstandard
+
+        return self._stack.enter_context(zstandard.open(target, "wt", newline="", encoding="utf-8"))
+
+
+class ParquetWriter:
+    """Parquet with one row group per frame. Every column is stored as a
+    dictionary-encoded string, the same cells the CSV holds."""
+
+    suffix = ".parquet"
+    mime = "application/vnd.apache.parquet"
+    requires = "pyarrow"
+
+    def __init__(self, target, compression="zstd"):
+        self.target = target
+        self.compression = compression
+        self._schema = None
+        self._writer = None
+
+    def write(self, frame):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        with stage("write"):
+            if self._schema is None:
+                self._schema = pa.schema([(str(col), pa.string()) for col in frame.columns])
+                self._writer = pq.ParquetWriter(
+                    self.target, self._schema, use_dictionary=True, compression=self.compression
+                )
+            frame = frame.astype({col: str for col in frame.columns if frame[col].dtype != object})
+            self._writer.write_table(pa.Table.from_pandas(frame, schema=self._schema, preserve_index=False))
+        count("rows_written", len(frame))
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+OUTPUT_FORMATS = {
+    "csv": CsvWriter,
+    "csv.gz": GzipCsvWriter,
+    "csv.zst": ZstdCsvWriter,
+    "parquet": ParquetWriter,
+}
+
+
+def _writer_class(output_format):
+    try:
+        return OUTPUT_FORMATS[output_format]
+    except KeyError:
+        raise ValueError(
+            f"Unknown output format {output_format!r}, expected one of: {', '.join(OUTPUT_FORMATS)}"
+        ) from None
+
+
+def available_formats():
+    """Output formats whose optional dependency is installed."""
+    return [
+        name for name, writer in OUTPUT_FORMATS.items()
+        if writer.requires is None or importlib.util.find_spec(writer.requires) is not None
+    ]
+
+
+def open_writer(target, output_format=DEFAULT_OUTPUT_FORMAT):
+    return _writer_class(output_format)(target)
+
+
+def write_frame(df, target, output_format=DEFAULT_OUTPUT_FORMAT):
+    """Write a whole output frame to ``target`` in ``output_format``."""
+    with open_writer(target, output_format) as writer:
+        writer.write(df)
+
+
+def frame_bytes(df, output_format=DEFAULT_OUTPUT_FORMAT):
+    """The written output as bytes, e.g. for a download button."""
+    buf = io.BytesIO()
+    if _writer_class(output_format) is CsvWriter:
+        text = io.TextIOWrapper(buf, encoding="utf-8", newline="")
+        write_frame(df, text, output_format)
+        text.flush()
+        text.detach()
+    else:
+        write_frame(df, buf, output_format)
+    return buf.getvalue()
+
+
+def output_file_name(stem, output_format=DEFAULT_OUTPUT_FORMAT):
+    """``stem`` with the file suffix of ``output_format``."""
+    return stem + _writer_class(output_format).suffix
+
+
+def output_mime(output_format=DEFAULT_OUTPUT_FORMAT):
+    return _writer_class(output_format).mime
+
+
+def read_output(path, output_format=DEFAULT_OUTPUT_FORMAT, columns=None):
+    """Read a written output back as an all-``str`` frame; ``columns``
+    reads only those."""
+    import pandas as pd
+
+    if output_format == "parquet":
+        return pd.read_parquet(path, columns=columns)
+    return pd.read_csv(path, dtype=str, keep_default_na=False, usecols=columns)
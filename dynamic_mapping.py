@@ -1,377 +1,143 @@
 import streamlit as st
-import pandas as pd
-import re
-import io
-
-# ========== HELPERS ==========
-
-def clean_metal(value):
-    if pd.isna(value):
-        return ""
-    value = str(value)
-    if "white" in value.lower() and "yellow" in value.lower():
-        return "Two tone gold"
-    value = re.sub(r"\b(18K|14K|22K)\b", "", value, flags=re.IGNORECASE)
-    value = value.replace("&", "and").strip()
-    value = re.sub(r"\s+", " ", value)
-    return value.title()
-
-def format_gold_purity(value):
-    if pd.isna(value) or value == "":
-        return ""
-    value = str(value).strip()
-    if not value.lower().endswith("k"):
-        return f"{value}K"
-    return value.upper()
-
-CATEGORY_MAP = {
-    "Bracelets": "Bracelet",
-    "bangle": "Bracelet",
-    "necklace (chain)": "Necklace",
-    "necklace": "Necklace",
-    "neck-pndt": "Necklace",
-    "ring": "Ring",
-    "earring pair": "Earring",
-    "Earrings": "Earring",
-    "pendant": "Pendant",
-    "brooch": "Brooch",
-    "accessories": "Accessories",
-}
-DEFAULT_CATEGORY = "Others"
-
-def detect_category(detail):
-    if pd.isna(detail):
-        return DEFAULT_CATEGORY
-    d = str(detail).strip().lower()
-    if "earring" in d:
-        return "Earring"
-    for k, v in CATEGORY_MAP.items():
-        if k in d:
-            return v
-    return DEFAULT_CATEGORY
-
-def parse_size(size_val, category):
-    """Returns (size_length, size_width, size_unit, standard_size)"""
-    if pd.isna(size_val):
-        return "", "", "", ""
-    size_str = str(size_val).strip().lower().replace(" ", "")
-    if category == "Ring":
-        if re.match(r"^\d+(\.\d+)?$", size_str):
-            return "", "", "", size_str
-        return "", "", "", size_str
-    match_inch = re.match(r"^(\d+\.?\d*)\"?$", size_str)
-    if match_inch:
-        length = match_inch.group(1)
-        return length, "", "cm", ""
-    match_double = re.match(r"^(\d+\.?\d*)[*xX](\d+\.?\d*)(cm|mm)?$", size_str)
-    if match_double:
-        l = match_double.group(1)
-        w = match_double.group(2)
-        u = match_double.group(3) if match_double.group(3) else ""
-        return l, w, u, ""
-    match_single = re.match(r"^(\d+\.?\d*)(cm|mm)?$", size_str)
-    if match_single:
-        l = match_single.group(1)
-        u = match_single.group(2) if match_single.group(2) else ""
-        return l, "", u, ""
-    return "", "", "", ""
-
-def normalize_stone_type(value):
-    if pd.isna(value):
-        return ""
-    val = str(value).lower().strip()
-    if "diamond" in val:
-        return "Diamond"
-    if "ruby" in val:
-        return "Ruby"
-    if "emerald" in val:
-        return "Emerald"
-    if "padparadscha" in val:
-        return "Padparadscha Sapphire"
-    if "blue sapphire" in val:
-        return "Blue Sapphire"
-    if "sapphire" in val:
-        return "Sapphire"
-    if "chrysoberyl" in val:
-        return "Chrysoberyl"
-    if "tourmaline" in val:
-        return "Tourmaline"
-    if "aquamarine" in val:
-        return "Aquamarine"
-    if "pearl" in val:
-        return "Pearl"
-    if "jade" in val:
-        return "Jade"
-    return "Others"
-
-# ========== EXPECTED VENDOR FIELDS (what your logic currently reads) ==========
-# These are the 'expected_field' names that the mapping CSV should provide mappings for.
-EXPECTED_VENDOR_FIELDS = [
-    "TAG NO","gem gem sale price","METAL","METAL CARAT","DETAILS","STONE TYPE",
-    "SIZE","METAL WT.","STOCK TYPE2","SD PCS","COLLECTION","CLR","CT","SD WT.",
-    "LAB","CERT","SHAPE","CRT","C","P","S","FLO","TREATMENT","ORIGIN"
-]
-
-def load_mapping_df(mapping_file):
-    """
-    mapping_file: uploaded file containing two columns:
-      expected_field,vendor_column
-    If missing or empty the function returns identity mapping.
-    """
-    if mapping_file is None:
-        # identity mapping
-        return {f: f for f in EXPECTED_VENDOR_FIELDS}
-    try:
-        mdf = pd.read_csv(mapping_file, dtype=str).fillna("")
-    except Exception:
-        # try excel
-        mdf = pd.read_excel(mapping_file, dtype=str).fillna("")
-    # Normalize columns: first col expected_field, second col vendor_column
-    cols = list(mdf.columns)
-    if len(cols) < 2:
-        st.error("Mapping file must have at least two columns: expected_field and vendor_column")
-        return {f: f for f in EXPECTED_VENDOR_FIELDS}
-    m = {}
-    for _, r in mdf.iterrows():
-        exp = str(r[cols[0]]).strip()
-        vend = str(r[cols[1]]).strip()
-        if exp:
-            m[exp] = vend if vend else exp
-    # ensure fallback for all expected fields
-    for f in EXPECTED_VENDOR_FIELDS:
-        if f not in m:
-            m[f] = f
-    return m
+import hashlib
+import json
+import os
+import tempfile
+
+from bulk_mapper.dedup import DuplicateSkuError, drop_duplicate_skus, scan_duplicate_skus
+from bulk_mapper.engine import EXPECTED_VENDOR_FIELDS, vendor_columns
+from bulk_mapper.instrumentation import instrumented, options_from_env, report_path
+from bulk_mapper.normalizer_cache import cache_stats
+from bulk_mapper.parallel import map_vendor_frame_parallel
+from bulk_mapper.profiles import DUPLICATE_POLICIES, PROFILES
+from bulk_mapper.reader import read_vendor_file, sheet_names
+from bulk_mapper.streaming import DEFAULT_CHUNK_ROWS, stream_vendor_file
+from bulk_mapper.ui import (
+    CACHE_MAX_ENTRIES,
+    CACHE_TTL_SECONDS,
+    CHECKPOINT_ROOT,
+    conflicts_csv,
+    file_digest,
+    show_duplicates,
+    show_rejected,
+    show_timings,
+)
+from bulk_mapper.validation import validate_frame
+from bulk_mapper.vendor_registry import VendorRegistry
+from bulk_mapper.writers import DEFAULT_OUTPUT_FORMAT, available_formats, frame_bytes, output_file_name, output_mime
 
 # ========== MAIN PROCESS FUNCTION ==========
-def process_vendor_file(uploaded_file, mapping_dict):
-    """
-    uploaded_file: vendor CSV
-    mapping_dict: dict mapping expected_field -> vendor column name in this file
-    """
-    df = pd.read_csv(uploaded_file, dtype=str).fillna("")
-    out_df = pd.DataFrame()
-    missing_diamond_rows = []
-
-    for idx, row in df.iterrows():
-        # build mapped_row so existing logic can use expected keys
-        mapped_row = {}
-        for expected in EXPECTED_VENDOR_FIELDS:
-            vendor_col = mapping_dict.get(expected, expected)
-            mapped_row[expected] = row.get(vendor_col, "")
-        # now use mapped_row instead of original row
-        uid = idx + 1
-        sku = mapped_row.get("TAG NO", "").strip()
-        price = mapped_row.get("gem gem sale price", "").strip()
-        currency = "USD"
-        metal = clean_metal(mapped_row.get("METAL", ""))
-        gold_purity = format_gold_purity(mapped_row.get("METAL CARAT", ""))
-
-        category = detect_category(mapped_row.get("DETAILS", ""))
-        stone_type_raw = mapped_row.get("STONE TYPE", "")
-        stone_type = normalize_stone_type(stone_type_raw)
-
-        size_length, size_width, size_unit, standard_size = parse_size(
-            mapped_row.get("SIZE", ""),
-            category
-        )
+def mapping_options(mapping_dict):
+    return dict(PROFILES["dynamic"], field_map=mapping_dict)
 
-        total_weight = mapped_row.get("METAL WT.", "").strip()
 
-        stock_type2 = mapped_row.get("STOCK TYPE2", "").strip().lower()
-        if stock_type2 == "second hand":
-            condition = "Excellent"
-        elif stock_type2 == "new":
-            condition = "Brand New"
-        else:
-            condition = "Excellent"
-
-        label = "Fast Shipping, Verified Partner"
-        if condition == "Brand New":
-            label += ", New"
-
-        record = {
-            "uid": uid,
-            "sku": sku,
-            "category": category,
-            "currency": currency,
-            "price": price,
-            "metal": metal,
-            "gold-purity": gold_purity,
-            "size-length": size_length,
-            "size-width": size_width,
-            "size-unit": size_unit,
-            "standard-size": standard_size,
-            "total-weight": total_weight,
-            "condition": condition,
-            "label": label,
-            "have_master_piece": "No",
-            "diamond_quantity": mapped_row.get("SD PCS", "").strip(),
-        }
-
-        # collection mapping
-        collection_value = mapped_row.get("COLLECTION", "").strip()
-        if collection_value:
-            if category == "Ring":
-                record["ring-style"] = collection_value
-            elif category == "Bracelet":
-                record["bracelet-style"] = collection_value
-            elif category == "Necklace":
-                record["necklace-style"] = collection_value
-            elif category == "Pendant":
-                record["pendant-style"] = collection_value
-            elif category == "Earring":
-                record["earring-style"] = collection_value
-            elif category == "Brooch":
-                record["brooch-style"] = collection_value
-            elif category == "Accessories":
-                record["accessories-style"] = collection_value
-
-        # diamond logic
-        if "diamond" in str(stone_type_raw).lower():
-            clr = mapped_row.get("CLR", "").strip()
-            ct_raw = mapped_row.get("CT", "").strip()
-            sd_wt_raw = mapped_row.get("SD WT.", "").strip()
-
-            def is_positive_number(s):
-                try:
-                    return float(s) > 0
-                except:
-                    return False
-
-            if is_positive_number(ct_raw):
-                diamond_weight = ct_raw
-            elif is_positive_number(sd_wt_raw):
-                diamond_weight = sd_wt_raw
-            else:
-                diamond_weight = ""
+def mapped_columns(mapping_dict):
+    """Vendor columns to read: the ones the mapping file points at."""
+    return vendor_columns(mapping_dict, **PROFILES["dynamic"])
 
-            if not diamond_weight:
-                missing_diamond_rows.append(mapped_row.copy())
 
-            if "fancy" in str(stone_type_raw).lower():
-                diamond_color = "Fancy"
-                diamond_fancy_opt = clr
-                diamond_white_opt = ""
-            else:
-                diamond_color = "White"
-                diamond_white_opt = clr
-                diamond_fancy_opt = ""
-
-            record.update({
-                "diamond_carat-weight": diamond_weight,
-                "diamond_diamond-color": diamond_color,
-                "diamond_diamond-color-white-options": diamond_white_opt,
-                "diamond_diamond-color-fancy-options": diamond_fancy_opt,
-                "diamond_certification": mapped_row.get("LAB", "").strip(),
-                "diamond_certification-number": mapped_row.get("CERT", "").strip(),
-                "diamond_diamond-shape": mapped_row.get("SHAPE", "").strip(),
-                "diamond_diamond-clarity": mapped_row.get("CRT", "").strip(),
-                "diamond_diamond-cut": mapped_row.get("C", "").strip(),
-                "diamond_diamond-polish": mapped_row.get("P", "").strip(),
-                "diamond_diamond-symmetry": mapped_row.get("S", "").strip(),
-                "diamond_diamond-fluoroscence": mapped_row.get("FLO", "").strip(),
-                "diamond_center-stone": "Center stone",
-                "gemstone_stone-type": "Diamond",
-            })
+def process_vendor_file(uploaded_file, mapping_dict, workers=None, sheet=None):
+    """
+    uploaded_file: vendor CSV or Excel workbook
+    mapping_dict: dict mapping expected_field -> vendor column name in this file
+    workers: mapping processes, None uses all cores (small files run serially)
+    sheet: worksheet of a workbook, None reads the first one
+    """
+    df = read_vendor_file(uploaded_file, mapped_columns(mapping_dict), sheet=sheet)
+    return map_vendor_frame_parallel(df, workers, compact=True, **mapping_options(mapping_dict))
+
+
+def stream_vendor_file_to_disk(uploaded_file, mapping_dict, output_path, missing_path, chunksize=DEFAULT_CHUNK_ROWS,
+                               output_format=DEFAULT_OUTPUT_FORMAT, checkpoint_root=None, keep=None,
+                               rejected_path=None, sheet=None):
+    """Chunked process_vendor_file for very large uploads; returns (rows, missing_rows).
+    checkpoint_root: keep finished chunks there so a rerun of the same upload resumes
+    keep: rows to map, from scan_duplicate_skus
+    rejected_path: hold back rows GemGem would reject, written there with the reasons
+    sheet: worksheet of a workbook, streamed row by row"""
+    return stream_vendor_file(uploaded_file, output_path, missing_path, chunksize,
+                              output_format=output_format, usecols=mapped_columns(mapping_dict),
+                              checkpoint_root=checkpoint_root, keep=keep, rejected_output=rejected_path,
+                              sheet=sheet, **mapping_options(mapping_dict))
+
+
+# Field maps are remembered per vendor header: a known vendor needs no
+# mapping file, a new one is matched automatically (see vendor_registry).
+VENDOR_REGISTRY_DIR = os.path.join(os.path.expanduser("~"), ".gemgem", "vendor_profiles")
+
+PROFILE_ORIGINS = {
+    "auto": "columns matched automatically",
+    "mapping": "from a mapping file",
+    "template": "from an output-field template",
+}
+
+# ========== SESSION CACHE ==========
+
+def mapping_digest(mapping_dict):
+    return hashlib.sha256(json.dumps(mapping_dict, sort_keys=True).encode()).hexdigest()
+
+
+@st.cache_resource
+def vendor_registry():
+    return VendorRegistry(VENDOR_REGISTRY_DIR)
+
+
+def vendor_profile(uploaded_file, mapping_file, sheet=None):
+    """Registry entry for the upload: a mapping file is stored for the
+    vendor's header, otherwise the stored or auto-matched one is used."""
+    registry = vendor_registry()
+    if mapping_file is not None:
+        try:
+            return registry.resolve(uploaded_file, mapping_file, sheet)
+        except ValueError as exc:
+            st.error(str(exc))
+    return registry.resolve(uploaded_file, sheet=sheet)
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS, show_spinner=False)
+def workbook_sheets(digest, _uploaded_file):
+    """Worksheet names of an Excel upload, [] for a CSV."""
+    return sheet_names(_uploaded_file) or []
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS, show_spinner=False)
+def load_vendor_frame(digest, map_digest, sheet, _uploaded_file, _mapping_dict):
+    """Parsed vendor frame, pruned to the columns the mapping points at."""
+    return read_vendor_file(_uploaded_file, mapped_columns(_mapping_dict), sheet=sheet)
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS, show_spinner=False)
+def build_output(digest, map_digest, sheet, output_format, timings, duplicates, validate, _uploaded_file,
+                 _mapping_dict):
+    """(output bytes, missing-diamond CSV bytes or b"", repeated-SKU CSV
+    bytes or b"" and its row count, rejected-rows CSV bytes or b"", timing
+    report or None)
+    for an upload (``sheet`` of a workbook) and field map; the report is
+    that of the run that filled the cache. Raises DuplicateSkuError under
+    the "error" policy."""
+    with instrumented(timings) as run:
+        df, conflicts = drop_duplicate_skus(load_vendor_frame(digest, map_digest, sheet, _uploaded_file,
+                                                              _mapping_dict),
+                                            duplicates, _mapping_dict)
+        output_df, missing = map_vendor_frame_parallel(df, compact=True, **mapping_options(_mapping_dict))
+        rejected_bytes = b""
+        if validate:
+            output_df, rejected = validate_frame(output_df)
+            rejected_bytes = rejected.to_csv(index=False).encode("utf-8") if len(rejected) else b""
+        missing_bytes = missing.to_csv(index=False).encode("utf-8") if len(missing) else b""
+        output_bytes = frame_bytes(output_df, output_format)
+    return (output_bytes, missing_bytes, conflicts_csv(conflicts), len(conflicts), rejected_bytes,
+            run.report() if run else None)
+
+
+def show_profile(profile):
+    st.caption(f"Vendor profile {profile['fingerprint'][:12]} · {PROFILE_ORIGINS[profile['origin']]}")
+    if profile["unmatched"]:
+        st.warning("No vendor column for " + ", ".join(profile["unmatched"]) + "; these fields stay empty. "
+                   "Upload a mapping file to fix this vendor's profile.")
+    if profile["ignored"]:
+        st.caption("Template columns not used: " + ", ".join(profile["ignored"]))
 
-        else:
-            record["diamond_carat-weight"] = mapped_row.get("SD WT.", "").strip()
-            record["diamond_center-stone"] = "Side stone"
-            record.update({
-                "gemstone_certification": mapped_row.get("LAB", "").strip(),
-                "gemstone_certification-number": mapped_row.get("CERT", "").strip(),
-                "gemstone_carat-weight": mapped_row.get("CT", "").strip(),
-                "gemstone_gem-stone-shape": mapped_row.get("SHAPE", "").strip(),
-                "gemstone_gem-stone-color": mapped_row.get("CLR", "").strip(),
-                "gemstone_stone-type": normalize_stone_type(mapped_row.get("STONE TYPE", "")),
-                "gemstone_center-stone": "Center stone",
-            })
-
-            if normalize_stone_type(mapped_row.get("STONE TYPE", "")) == "Pearl":
-                record["gemstone_pearl-shape"] = mapped_row.get("SHAPE", "").strip()
-                record["gemstone_pearl-color"] = mapped_row.get("CLR", "").strip()
-
-            treatment_val = mapped_row.get("TREATMENT", "").strip()
-            if treatment_val:
-                if treatment_val.lower() == "heated":
-                    treatment_val = "Indication of heating"
-                gem_map = {
-                    "Ruby": "gemstone_ruby-enhancement",
-                    "Sapphire": "gemstone_sapphire-enhancement",
-                    "Blue Sapphire": "gemstone_blue-sapphire-enhancement",
-                    "Emerald": "gemstone_emerald-enhancement",
-                    "Chrysoberyl": "gemstone_chrysoberyl-enhancement",
-                    "Tourmaline": "gemstone_tourmaline-enhancement",
-                    "Aquamarine": "gemstone_aquamarine-enhancement",
-                    "Padparadscha Sapphire": "gemstone_padparadscha-sapphire-enhancement",
-                }
-                stone_type = normalize_stone_type(mapped_row.get("STONE TYPE", ""))
-                if stone_type in gem_map:
-                    record[gem_map[stone_type]] = treatment_val
-
-            origin_val = mapped_row.get("ORIGIN", "").strip()
-            if origin_val:
-                origin_map = {
-                    "Ruby": "gemstone_ruby-origin",
-                    "Sapphire": "gemstone_sapphire-origin",
-                    "Blue Sapphire": "gemstone_blue-sapphire-origin",
-                    "Emerald": "gemstone_emerald-origin",
-                    "Chrysoberyl": "gemstone_chrysoberyl-origin",
-                    "Tourmaline": "gemstone_tourmaline-origin",
-                    "Aquamarine": "gemstone_aquamarine-origin",
-                    "Padparadscha Sapphire": "gemstone_padparadscha-sapphire-origin",
-                    "Jade": "gemstone_jade-origin",
-                    "Pearl": "gemstone_pearl-origin",
-                }
-                stone_type = normalize_stone_type(mapped_row.get("STONE TYPE", ""))
-                if stone_type in origin_map:
-                    record[origin_map[stone_type]] = origin_val
-
-        out_df = pd.concat([out_df, pd.DataFrame([record])], ignore_index=True)
-
-    # required columns order (unchanged)
-    REQUIRED_COLUMNS = [
-        "uid","sku","name","category","description","images","certificate_images","ruler_images",
-        "currency","price","discounted_price","to_be_listed","have_master_piece","year-of-purchase",
-        "condition","packaging-info","ring-style","brand","engagement-rings-solitaire-hashes",
-        "engagement-rings-options","engagement-rings-other-hashes","metal","gender","total-weight",
-        "standard-size","resize-from","resize-to","resize-supported","gold-purity","earring-style",
-        "earring-type","earring-solitaire-hashes","earring-studs-options","earring-other-hashes",
-        "bracelet-style","bracelet-style-other-hashes","size-length","size-width","size-unit",
-        "necklace-style","necklace-style-other-hashes","pendant-style","pendant-style-solitaire-hashes",
-        "pendant-style-object-hashes","brooch-style","brooch-style-hashes","accessories-style","label",
-        "diamond_quantity","diamond_certification","diamond_certification-number","diamond_carat-weight",
-        "diamond_diamond-shape","diamond_diamond-color","diamond_diamond-color-white-options",
-        "diamond_diamond-color-fancy-options","diamond_diamond-clarity","diamond_diamond-cut",
-        "diamond_diamond-polish","diamond_diamond-symmetry","diamond_diamond-fluoroscence",
-        "diamond_diamond-girdle","diamond_average-color","diamond_average-clarity",
-        "diamond_approximate-carat-weight","diamond_center-stone","diamond_diamond-grade",
-        "gemstone_quantity","gemstone_gold-purity","gemstone_certification","gemstone_certification-number",
-        "gemstone_carat-weight","gemstone_diamond-color-fancy-options","gemstone_gem-stone-shape",
-        "gemstone_gem-stone-color","gemstone_gem-stone-clarity","gemstone_gem-stone-cut",
-        "gemstone_pearl-shape","gemstone_pearl-color","gemstone_pearl-clarity","gemstone_pearl-lustre",
-        "gemstone_stone-type","gemstone_stone-type-pearl-options","gemstone_ruby-color",
-        "gemstone_ruby-origin","gemstone_ruby-enhancement","gemstone_blue-sapphire-color",
-        "gemstone_blue-sapphire-origin","gemstone_blue-sapphire-enhancement","gemstone_emerald-color",
-        "gemstone_emerald-origin","gemstone_emerald-enhancement","gemstone_chrysoberyl-origin",
-        "gemstone_chrysoberyl-enhancement","gemstone_tourmaline-origin","gemstone_tourmaline-enhancement",
-        "gemstone_aquamarine-origin","gemstone_aquamarine-enhancement","gemstone_sapphire-origin",
-        "gemstone_sapphire-enhancement","gemstone_padparadscha-sapphire-color",
-        "gemstone_padparadscha-sapphire-origin","gemstone_padparadscha-sapphire-enhancement",
-        "gemstone_approximate-carat-weight","gemstone_center-stone","gemstone_jade-color",
-        "gemstone_jade-origin","gemstone_diamond-grade","gemstone_chrysoberyl-color",
-        "gemstone_tourmaline-color","gemstone_aquamarine-color","gemstone_jade-clarity",
-        "gemstone_pearl-origin"
-    ]
-
-    for col in REQUIRED_COLUMNS:
-        if col not in out_df.columns:
-            out_df[col] = ""
-
-    out_df = out_df[REQUIRED_COLUMNS]
-
-    return out_df, missing_diamond_rows
 
 # ========== STREAMLIT UI ==========
 
@@ -379,34 +145,150 @@ st.set_page_config(page_title="GemGem Bulk Upload Mapper", layout="centered")
 st.title("💎 GemGem Vendor → Bulk Upload Mapper")
 
 st.markdown("**Step 1.** Upload vendor CSV. **Step 2.** (Optional) Upload mapping CSV if vendor columns differ.")
+st.write("Mappings are remembered per vendor (by the file's column names): known vendors need no mapping file, "
+         "new ones are matched automatically. A GemGem output template (like mapping_template_full.csv) works too.")
 st.write("Mapping CSV format: two columns. Column1 = expected_field (one of the left values below). Column2 = vendor column name in this CSV.")
 st.code(", ".join(EXPECTED_VENDOR_FIELDS))
 
-uploaded_file = st.file_uploader("Upload Vendor CSV file", type=["csv", "xlsx"])
+uploaded_file = st.file_uploader("Upload Vendor CSV or Excel file", type=["csv", "xlsx"])
 mapping_file = st.file_uploader("Upload Mapping CSV/Excel (optional)", type=["csv", "xlsx"])
 
+sheet = None
+sheets = workbook_sheets(file_digest(uploaded_file), uploaded_file) if uploaded_file else []
+if len(sheets) > 1:
+    sheet = st.selectbox(
+        "Sheet",
+        sheets,
+        help="The workbook has several sheets; each is mapped as a vendor file of its own.",
+    )
+
+stream_chunks = st.checkbox(
+    f"Large file – process in chunks of {DEFAULT_CHUNK_ROWS:,} rows",
+    help="Keeps memory bounded for very large vendor files; the output is written to disk chunk by chunk.",
+)
+resume_chunks = stream_chunks and st.checkbox(
+    "Resume interrupted runs",
+    value=True,
+    help="Keeps every finished chunk on the server, so processing the same file again after a crash or a page "
+         "refresh continues where it stopped.",
+)
+output_format = st.selectbox(
+    "Output format",
+    available_formats(),
+    help="Compressed CSV and Parquet are much smaller for the mostly empty GemGem columns.",
+)
+duplicates = st.selectbox(
+    "Repeated SKUs (TAG NO)",
+    DUPLICATE_POLICIES,
+    help="keep-all maps every row, keep-first / keep-last map one row per SKU, error stops. "
+         "Repeated SKUs are always listed in a report.",
+)
+validate = st.checkbox(
+    "Hold back rows GemGem would reject",
+    value=False,
+    help="Empty SKUs, prices that are not a positive number, unknown gold purities, Ring sizes that are not "
+         "a number... go to a rejected-rows report instead of the upload. Off: every mapped row is uploaded.",
+)
+show_timing = st.checkbox(
+    "Show timing breakdown",
+    value=options_from_env()[0],
+    help="Times each stage (read, normalizers, mapping, build, write) and reports row counts.",
+)
+output_name = output_file_name("gemgem_upload", output_format)
+
 if uploaded_file:
     if st.button("✨ MAGIC – Process File"):
-        with st.spinner("Processing..."):
-            mapping_dict = load_mapping_df(mapping_file)
-            output_df, missing = process_vendor_file(uploaded_file, mapping_dict)
-
-        st.success("✅ Mapping complete!")
-        csv_buf = io.StringIO()
-        output_df.to_csv(csv_buf, index=False)
+        profile = vendor_profile(uploaded_file, mapping_file, sheet)
+        mapping_dict = profile["field_map"]
+        show_profile(profile)
+        if stream_chunks:
+            out_dir = tempfile.mkdtemp(prefix="gemgem_")
+            checkpoint_root = CHECKPOINT_ROOT if resume_chunks else None
+            output_path = os.path.join(out_dir, output_name)
+            missing_path = os.path.join(out_dir, "missing_diamond_weight.csv")
+            rejected_path = os.path.join(out_dir, "rejected_rows.csv")
+            try:
+                with st.spinner("Processing in chunks..."), instrumented(show_timing) as run:
+                    keep, conflicts = scan_duplicate_skus(uploaded_file, duplicates, mapping_dict,
+                                                          usecols=mapped_columns(mapping_dict), sheet=sheet)
+                    rows, missing_rows = stream_vendor_file_to_disk(uploaded_file, mapping_dict, output_path,
+                                                                    missing_path, output_format=output_format,
+                                                                    checkpoint_root=checkpoint_root, keep=keep,
+                                                                    rejected_path=rejected_path if validate else None,
+                                                                    sheet=sheet)
+            except DuplicateSkuError as exc:
+                st.error(f"❌ {exc}")
+                show_duplicates(conflicts_csv(exc.conflicts), len(exc.conflicts))
+                st.stop()
+            if run:
+                run.write_report(report_path(output_path))
+
+            st.success(f"✅ Mapping complete! {rows:,} rows")
+            if len(conflicts):
+                show_duplicates(conflicts_csv(conflicts), len(conflicts))
+            with open(output_path, "rb") as f:
+                st.download_button(
+                    label="📥 Download Output",
+                    data=f,
+                    file_name=output_name,
+                    mime=output_mime(output_format)
+                )
+            if missing_rows:
+                with open(missing_path, "rb") as f:
+                    st.download_button(
+                        label="⚠️ Download Missing Diamond Weights CSV",
+                        data=f,
+                        file_name="missing_diamond_weight.csv",
+                        mime="text/csv"
+                    )
+            if os.path.exists(rejected_path):
+                with open(rejected_path, "rb") as f:
+                    show_rejected(f)
+            if run:
+                show_timings(run.report(), report_path(output_name))
+        else:
+            digests = (file_digest(uploaded_file), file_digest(mapping_file))
+            map_digest = mapping_digest(mapping_dict)
+            try:
+                with st.spinner("Processing..."):
+                    build_output(digests[0], map_digest, sheet, output_format, show_timing, duplicates, validate,
+                                 uploaded_file, mapping_dict)
+            except DuplicateSkuError as exc:
+                st.session_state["processed"] = None
+                st.error(f"❌ {exc}")
+                show_duplicates(conflicts_csv(exc.conflicts), len(exc.conflicts))
+            else:
+                st.session_state["processed"] = (*digests, sheet, output_format, show_timing, duplicates, validate)
+                st.session_state["processed_map"] = (map_digest, mapping_dict)
+                st.success("✅ Mapping complete!")
+
+        with st.expander("Normalizer cache"):
+            st.json(cache_stats())
+
+    # Shown on every rerun (e.g. after a download) straight from the cache.
+    processed = st.session_state.get("processed")
+    if not stream_chunks and processed == (file_digest(uploaded_file), file_digest(mapping_file), sheet,
+                                           output_format, show_timing, duplicates, validate):
+        map_digest, mapping_dict = st.session_state["processed_map"]
+        output_bytes, missing_bytes, conflicts_bytes, conflict_rows, rejected_bytes, report = build_output(
+            processed[0], map_digest, sheet, output_format, show_timing, duplicates, validate, uploaded_file,
+            mapping_dict)
+        if conflict_rows:
+            show_duplicates(conflicts_bytes, conflict_rows)
         st.download_button(
-            label="📥 Download Output CSV",
-            data=csv_buf.getvalue(),
-            file_name="gemgem_upload.csv",
-            mime="text/csv"
+            label="📥 Download Output",
+            data=output_bytes,
+            file_name=output_name,
+            mime=output_mime(output_format)
         )
-
-        if missing:
-            miss_buf = io.StringIO()
-            pd.DataFrame(missing).to_csv(miss_buf, index=False)
+        if missing_bytes:
             st.download_button(
                 label="⚠️ Download Missing Diamond Weights CSV",
-                data=miss_buf.getvalue(),
+                data=missing_bytes,
                 file_name="missing_diamond_weight.csv",
                 mime="text/csv"
             )
+        if rejected_bytes:
+            show_rejected(rejected_bytes)
+        if report:
+            show_timings(report, report_path(output_name))
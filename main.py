@@ -1,285 +1,110 @@
-import pandas as pd
-import re
+import os
+
+from bulk_mapper.dedup import DuplicateSkuError, drop_duplicate_skus, scan_duplicate_skus
+from bulk_mapper.engine import vendor_columns
+from bulk_mapper.incremental import CHANGE_COLUMN, map_incremental
+from bulk_mapper.instrumentation import instrumented, report_path
+from bulk_mapper.parallel import map_vendor_frame_parallel
+from bulk_mapper.profiles import PROFILES
+from bulk_mapper.reader import read_vendor_file
+from bulk_mapper.streaming import stream_vendor_file
+from bulk_mapper.validation import rejected_rows, validate_frame
+from bulk_mapper.writers import output_file_name, write_frame
 
 # ========== FILE SETTINGS ==========
 INPUT_FILE = "test.csv"
-OUTPUT_FILE = "gemgem_upload.csv"
+INPUT_SHEET = None  # ✅ worksheet of an Excel INPUT_FILE, None reads the first one
+OUTPUT_FORMAT = "csv"  # ✅ csv, csv.gz, csv.zst or parquet (see bulk_mapper/writers.py)
+OUTPUT_FILE = output_file_name("gemgem_upload", OUTPUT_FORMAT)
 MISSING_DIAMOND_FILE = "missing_diamond_weight.csv"
+DUPLICATE_SKU_FILE = "duplicate_skus.csv"
+DUPLICATE_SKUS = "keep-all"  # ✅ repeated TAG NO: keep-all, keep-first, keep-last or error (all are reported)
+REJECTED_FILE = "rejected_rows.csv"
+VALIDATE_OUTPUT = False  # ✅ True: rows GemGem would reject (empty SKU, bad price, ...) go to REJECTED_FILE, not the upload
+CHUNK_SIZE = None  # ✅ rows per chunk to stream very large files, None reads the whole file
+CHECKPOINT_DIR = None  # ✅ e.g. "gemgem_checkpoints": with CHUNK_SIZE, a rerun after a crash resumes
+WORKERS = None  # ✅ mapping processes, None uses all cores (small files always run serially)
+PRUNE_COLUMNS = True  # ✅ read only the vendor columns the mapping uses (also in the missing-diamond file)
+STATE_FILE = None  # ✅ e.g. "gemgem_state.parquet": map only rows changed since the last run (needs pyarrow, not with CHUNK_SIZE)
+DELTA_FILE = output_file_name("gemgem_delta", OUTPUT_FORMAT)  # ✅ adds/updates/removals, written with STATE_FILE
+PROFILE_RUN = None  # ✅ True writes a stage timing report next to the output, None follows BULK_MAPPER_PROFILE
 
-# ========== ACCEPTED CATEGORY VALUES ==========
-CATEGORY_MAP = {
-    "bracelet": "Bracelet",
-    "bangle": "Bracelet",
-    "necklace (chain)": "Necklace",
-    "necklace": "Necklace",
-    "neck-pndt": "Necklace",  # ✅ NEW
-    "ring": "Ring",
-    "earring pair": "Earring",
-    "earring": "Earring",
-    "pendant": "Pendant",
-    "brooch": "Brooch",
-    "accessories": "Accessories",
-}
-DEFAULT_CATEGORY = "Others"
+# ========== MAPPING SETTINGS ==========
+# ✅ main.py profile (see bulk_mapper/profiles.py), columns in first-written order
+MAPPING_OPTIONS = dict(PROFILES["main"], required_columns=False)
+VENDOR_COLUMNS = vendor_columns(**PROFILES["main"]) if PRUNE_COLUMNS else None
 
-# ========== HELPER FUNCTIONS ==========
 
-def clean_metal(value):
-    """Normalize metal description like '18K White & Yellow Gold' → 'Two tone gold'"""
-    if pd.isna(value):
-        return ""
-    value = str(value)
-    # Detect Two tone
-    if "white" in value.lower() and "yellow" in value.lower():
-        return "Two tone gold"
-    # Remove karat mentions
-    value = re.sub(r"\b(18K|14K|22K)\b", "", value, flags=re.IGNORECASE)
-    value = value.replace("&", "and").strip()
-    value = re.sub(r"\s+", " ", value)
-    return value.title()
+def save_duplicate_skus(conflicts):
+    if len(conflicts):
+        conflicts.to_csv(DUPLICATE_SKU_FILE, index=False)
+        print(f"⚠️ {len(conflicts)} rows with repeated SKUs listed in {DUPLICATE_SKU_FILE}")
 
 
-def format_gold_purity(value):
-    if pd.isna(value) or value == "":
-        return ""
-    value = str(value).strip()
-    if not value.lower().endswith("k"):
-        return f"{value}K"
-    return value.upper()
-
-
-def detect_category(detail):
-    """Detect category more accurately"""
-    if pd.isna(detail):
-        return DEFAULT_CATEGORY
-    d = str(detail).strip().lower()
-
-    # ✅ Ensure earrings are not misclassified as rings
-    if "earring" in d:
-        return "Earring"
-    for k, v in CATEGORY_MAP.items():
-        if k in d:
-            return v
-    return DEFAULT_CATEGORY
-
-
-def parse_size(size_val, category):
-    """Parses size strings including inches and returns length, width, unit, and standard size for rings"""
-    if pd.isna(size_val):
-        return "", "", "", ""
-
-    size_str = str(size_val).strip().lower().replace(" ", "")
-
-    # ✅ Handle inches like 16" or 16.5"
-    match_inch = re.match(r"^(\d+\.?\d*)\"?$", size_str)
-    if match_inch:
-        length = match_inch.group(1)
-        return length, "", "cm", ""  # store inches as cm
-
-    # ✅ Handle numeric ring size for category Ring
-    if category == "Ring" and re.match(r"^\d+(\.\d+)?$", size_str):
-        return "", "", "", size_str
-
-    # ✅ Handle double dimension like 6CM*4, 5.5*4.5
-    match_double = re.match(r"^(\d+\.?\d*)[*xX](\d+\.?\d*)(cm|mm)?$", size_str)
-    if match_double:
-        length = match_double.group(1)
-        width = match_double.group(2)
-        unit = match_double.group(3) if match_double.group(3) else ""
-        return length, width, unit, ""
-
-    # ✅ Handle single value like 18CM or 5.5MM
-    match_single = re.match(r"^(\d+\.?\d*)(cm|mm)?$", size_str)
-    if match_single:
-        length = match_single.group(1)
-        unit = match_single.group(2) if match_single.group(2) else ""
-        return length, "", unit, ""
-
-    return "", "", "", ""
-
-
-def normalize_stone_type(value):
-    if pd.isna(value):
-        return ""
-    val = str(value).lower().strip()
-    if "diamond" in val:
-        return "Diamond"
-    if "ruby" in val:
-        return "Ruby"
-    if "emerald" in val:
-        return "Emerald"
-    if "padparadscha" in val:
-        return "Padparadscha Sapphire"
-    if "blue sapphire" in val:
-        return "Blue Sapphire"
-    if "sapphire" in val:
-        return "Sapphire"
-    if "chrysoberyl" in val:
-        return "Chrysoberyl"
-    if "tourmaline" in val:
-        return "Tourmaline"
-    if "aquamarine" in val:
-        return "Aquamarine"
-    if "pearl" in val:
-        return "Pearl"
-    if "jade" in val:
-        return "Jade"
-    return "Others"
+def report_rejected():
+    if os.path.exists(REJECTED_FILE):
+        print(f"⚠️ Rows GemGem would reject saved to {REJECTED_FILE} with the reasons")
 
 
 # ========== MAIN PROCESS ==========
-df = pd.read_csv(INPUT_FILE, dtype=str).fillna("")
-out_df = pd.DataFrame()
-missing_diamond_rows = []
-
-for idx, row in df.iterrows():
-    uid = idx + 1
-    sku = row.get("TAG NO", "").strip()
-    price = row.get("gem gem sale price", "").strip()
-    currency = "USD"
-    metal = clean_metal(row.get("METAL", ""))
-    gold_purity = format_gold_purity(row.get("METAL CARAT", ""))
-    category = detect_category(row.get("DETAILS", ""))
-    stone_type_raw = row.get("STONE TYPE", "")
-    stone_type = normalize_stone_type(stone_type_raw)
-    size_length, size_width, size_unit, standard_size = parse_size(row.get("SIZE", ""), category)
-    total_weight = row.get("METAL WT.", "").strip()
-
-    # ✅ Condition mapping
-    stock_type2 = row.get("STOCK TYPE2", "").strip().lower()
-    if stock_type2 == "second hand":
-        condition = "Excellent"
-    elif stock_type2 == "new":
-        condition = "Brand New"
-    else:
-        condition = "Excellent"
-
-    # ✅ Label assignment
-    label = "Fast Shipping, Verified Partner"
-    if condition == "Brand New":
-        label += ", New"
-
-    record = {
-        "uid": uid,
-        "sku": sku,
-        "category": category,
-        "currency": currency,
-        "price": price,
-        "metal": metal,
-        "gold-purity": gold_purity,
-        "size-length": size_length,
-        "size-width": size_width,
-        "size-unit": size_unit,
-        "standard-size": standard_size,
-        "total-weight": total_weight,
-        "condition": condition,
-        "label": label,
-        "have_master_piece": "No",
-        "diamond_quantity": row.get("SD PCS", "").strip(),  # ✅ map always
-    }
-
-    # ========== DIAMOND MAPPING ==========
-    if "diamond" in stone_type_raw.lower():
-        clr = row.get("CLR", "").strip()
-        ct = row.get("CT", "").strip()
-        sd_wt = row.get("SD WT.", "").strip()
-
-        # ✅ diamond weight fallback logic
-        diamond_weight = ct if ct and ct != "0" else (sd_wt if sd_wt and sd_wt != "0" else "")
-        if not diamond_weight:
-            missing_diamond_rows.append(row.to_dict())
-
-        # ✅ diamond color logic
-        if "fancy" in stone_type_raw.lower():
-            diamond_color = "Fancy"
-            diamond_fancy_opt = clr
-            diamond_white_opt = ""
+# ✅ Guarded so worker processes can import this script without re-running it
+if __name__ == "__main__":
+    # ✅ Incremental runs compare the whole file with the last state, so they cannot stream chunks
+    if STATE_FILE and CHUNK_SIZE:
+        raise SystemExit("❌ STATE_FILE and CHUNK_SIZE cannot be used together; set one of them to None")
+    with instrumented(PROFILE_RUN) as run:
+        # ✅ Drop the last run's rejected rows, the file is only written when there are any
+        if os.path.exists(REJECTED_FILE):
+            os.remove(REJECTED_FILE)
+        try:
+            if CHUNK_SIZE:
+                keep, conflicts = scan_duplicate_skus(INPUT_FILE, DUPLICATE_SKUS, usecols=VENDOR_COLUMNS,
+                                                      chunksize=CHUNK_SIZE, sheet=INPUT_SHEET)
+            else:
+                df, conflicts = drop_duplicate_skus(read_vendor_file(INPUT_FILE, VENDOR_COLUMNS, sheet=INPUT_SHEET),
+                                                    DUPLICATE_SKUS)
+        except DuplicateSkuError as exc:
+            save_duplicate_skus(exc.conflicts)
+            raise SystemExit(f"❌ {exc}")
+        save_duplicate_skus(conflicts)
+
+        if CHUNK_SIZE:
+            rows, missing_rows = stream_vendor_file(INPUT_FILE, OUTPUT_FILE, MISSING_DIAMOND_FILE, CHUNK_SIZE,
+                                                     output_format=OUTPUT_FORMAT, usecols=VENDOR_COLUMNS,
+                                                     checkpoint_root=CHECKPOINT_DIR, keep=keep,
+                                                     rejected_output=REJECTED_FILE if VALIDATE_OUTPUT else None,
+                                                     sheet=INPUT_SHEET, **MAPPING_OPTIONS)
+            if missing_rows:
+                print(f"⚠️ Missing diamond weights saved to {MISSING_DIAMOND_FILE}")
         else:
-            diamond_color = "White"
-            diamond_white_opt = clr
-            diamond_fancy_opt = ""
-
-        record.update({
-            "diamond_carat-weight": diamond_weight,
-            "diamond_diamond-color": diamond_color,
-            "diamond_diamond-color-white-options": diamond_white_opt,
-            "diamond_diamond-color-fancy-options": diamond_fancy_opt,
-            "diamond_certification": row.get("LAB", "").strip(),
-            "diamond_certification-number": row.get("CERT", "").strip(),
-            "diamond_diamond-shape": row.get("SHAPE", "").strip(),
-            "diamond_diamond-clarity": row.get("CRT", "").strip(),
-            "diamond_diamond-cut": row.get("C", "").strip(),
-            "diamond_diamond-polish": row.get("P", "").strip(),
-            "diamond_diamond-symmetry": row.get("S", "").strip(),
-            "diamond_diamond-fluoroscence": row.get("FLO", "").strip(),
-            "diamond_center-stone": "Center stone",
-            "gemstone_stone-type": "Diamond",
-        })
-
-    # ========== GEMSTONE MAPPING ==========
-    else:
-        record.update({
-            "gemstone_certification": row.get("LAB", "").strip(),
-            "gemstone_certification-number": row.get("CERT", "").strip(),
-            "gemstone_carat-weight": row.get("CT", "").strip(),
-            "gemstone_gem-stone-shape": row.get("SHAPE", "").strip(),
-            "gemstone_gem-stone-color": row.get("CLR", "").strip(),
-            "gemstone_stone-type": stone_type,
-            "gemstone_center-stone": "Center stone",
-        })
-
-        # ✅ Pearl specific mapping
-        if stone_type == "Pearl":
-            record["gemstone_pearl-shape"] = row.get("SHAPE", "").strip()
-            record["gemstone_pearl-color"] = row.get("CLR", "").strip()
-
-        # ✅ gemstone stone shape/color fields (for clarity)
-        record["gemstone_stone-shape"] = row.get("SHAPE", "").strip()
-        record["gemstone_stone-color"] = row.get("CLR", "").strip()
-
-        # ✅ Treatment
-        treatment_val = row.get("TREATMENT", "").strip()
-        if treatment_val:
-            if treatment_val.lower() == "heated":
-                treatment_val = "Indication of heating"
-            gem_map = {
-                "Ruby": "gemstone_ruby-enhancement",
-                "Sapphire": "gemstone_sapphire-enhancement",
-                "Blue Sapphire": "gemstone_blue-sapphire-enhancement",
-                "Emerald": "gemstone_emerald-enhancement",
-                "Chrysoberyl": "gemstone_chrysoberyl-enhancement",
-                "Tourmaline": "gemstone_tourmaline-enhancement",
-                "Aquamarine": "gemstone_aquamarine-enhancement",
-                "Padparadscha Sapphire": "gemstone_padparadscha-sapphire-enhancement",
-            }
-            if stone_type in gem_map:
-                record[gem_map[stone_type]] = treatment_val
-
-        # ✅ Origin
-        origin_val = row.get("ORIGIN", "").strip()
-        if origin_val:
-            origin_map = {
-                "Ruby": "gemstone_ruby-origin",
-                "Sapphire": "gemstone_sapphire-origin",
-                "Blue Sapphire": "gemstone_blue-sapphire-origin",
-                "Emerald": "gemstone_emerald-origin",
-                "Chrysoberyl": "gemstone_chrysoberyl-origin",
-                "Tourmaline": "gemstone_tourmaline-origin",
-                "Aquamarine": "gemstone_aquamarine-origin",
-                "Padparadscha Sapphire": "gemstone_padparadscha-sapphire-origin",
-                "Jade": "gemstone_jade-origin",
-                "Pearl": "gemstone_pearl-origin",
-            }
-            if stone_type in origin_map:
-                record[origin_map[stone_type]] = origin_val
-
-    out_df = pd.concat([out_df, pd.DataFrame([record])], ignore_index=True)
-
-# ✅ Save missing diamond cases if any
-if missing_diamond_rows:
-    pd.DataFrame(missing_diamond_rows).to_csv(MISSING_DIAMOND_FILE, index=False)
-    print(f"⚠️ Missing diamond weights saved to {MISSING_DIAMOND_FILE}")
-
-# ✅ Final output
-out_df.to_csv(OUTPUT_FILE, index=False)
-print(f"✅ Mapping complete. Saved to {OUTPUT_FILE}")
+            if STATE_FILE:
+                # ✅ Incremental run: full output in the same column order as a plain run, plus the delta
+                out_df, delta_df, missing_df, stats = map_incremental(df, STATE_FILE, columns=None, compact=True,
+                                                                      **PROFILES["main"])
+                if VALIDATE_OUTPUT:
+                    # ✅ Adds/updates GemGem would reject stay out of the delta, removals always go
+                    rejected = rejected_rows(delta_df)[0]
+                    delta_df = delta_df[~rejected | (delta_df[CHANGE_COLUMN] == "remove").to_numpy()]
+                write_frame(delta_df, DELTA_FILE, OUTPUT_FORMAT)
+                print(f"✅ {stats['added']} added, {stats['updated']} updated, {stats['removed']} removed. "
+                      f"Delta saved to {DELTA_FILE}")
+            else:
+                out_df, missing_df = map_vendor_frame_parallel(df, WORKERS, compact=True, **MAPPING_OPTIONS)
+
+            # ✅ Save missing diamond cases if any
+            if not missing_df.empty:
+                missing_df.to_csv(MISSING_DIAMOND_FILE, index=False)
+                print(f"⚠️ Missing diamond weights saved to {MISSING_DIAMOND_FILE}")
+
+            # ✅ Rows GemGem would reject
+            if VALIDATE_OUTPUT:
+                out_df, rejected_df = validate_frame(out_df)
+                if len(rejected_df):
+                    rejected_df.to_csv(REJECTED_FILE, index=False)
+
+            # ✅ Final output
+            write_frame(out_df, OUTPUT_FILE, OUTPUT_FORMAT)
+        report_rejected()
+        print(f"✅ Mapping complete. Saved to {OUTPUT_FILE}")
+    if run:
+        print(f"⏱️ Timing report saved to {run.write_report(report_path(OUTPUT_FILE))}")
@@ -0,0 +1,387 @@
+"""HTTP service for programmatic vendor → GemGem conversion.
+
+    uvicorn service:app [--host 0.0.0.0 --port 8000]
+
+Needs requirements-service.txt (starlette, uvicorn, python-multipart). Endpoints:
+
+- ``POST /jobs``: upload a vendor CSV/XLSX and start a job; returns 202
+  with the job. The body is either the raw file (streamed to disk as it
+  arrives) or multipart form data with a ``vendor`` file and an optional
+  ``mapping`` file (expected_field,vendor_column; dynamic_mapping.py's
+  format). Query parameters: ``profile`` (app, main, dynamic; ignored when
+  a mapping is given), ``format`` (csv, csv.gz, csv.zst, parquet),
+  ``chunksize`` (map in chunks of that many rows) and ``validate`` (1 to
+  hold back the rows GemGem would reject, see bulk_mapper.validation).
+- ``GET /jobs/{id}``: the job's status (queued, running, done, failed),
+  rows, missing rows, rejected rows, seconds and error.
+- ``GET /jobs/{id}/result``: the output file, streamed; 409 until done.
+- ``GET /jobs/{id}/missing``: the missing-diamond-weight CSV, 404 if none.
+- ``GET /jobs/{id}/rejected``: the rejected rows with the reasons, 404 if
+  none or the job was not validated.
+- ``DELETE /jobs/{id}``: drop a finished job and its files.
+- ``POST /convert``: ``POST /jobs`` that waits for the job and streams its
+  output back (``X-Job-Id``, ``X-Missing-Rows`` and ``X-Rejected-Rows``
+  headers).
+- ``GET /health``: job counts.
+
+Mapping runs in a process pool (bulk_mapper.batch.process_vendor, as
+``python -m bulk_mapper``), so the event loop only moves bytes. At most
+SERVICE_WORKERS jobs run at once; the rest wait as ``queued``. Finished
+jobs and their files are dropped after JOB_TTL_SECONDS. Jobs are held in
+memory: run one server process (uvicorn's default) per job directory.
+"""
+import asyncio
+import functools
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
+
+import anyio
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import FileResponse, JSONResponse, Response
+from starlette.routing import Route
+
+from bulk_mapper.batch import VendorSource, process_vendor
+from bulk_mapper.profiles import DEFAULT_BATCH_PROFILE, PROFILES
+from bulk_mapper.writers import DEFAULT_OUTPUT_FORMAT, OUTPUT_FORMATS, output_mime
+
+# ========== SETTINGS ==========
+# Environment variables, so `uvicorn service:app` needs no code changes.
+SERVICE_WORKERS = int(os.environ.get("BULK_MAPPER_SERVICE_WORKERS", 0)) or os.cpu_count() or 1
+JOB_DIR = os.environ.get("BULK_MAPPER_SERVICE_DIR")  # default: a temporary directory per server
+JOB_TTL_SECONDS = int(os.environ.get("BULK_MAPPER_SERVICE_JOB_TTL", 60 * 60))
+MAX_UPLOAD_BYTES = int(os.environ.get("BULK_MAPPER_SERVICE_MAX_UPLOAD", 2**30))
+UPLOAD_CHUNK_BYTES = 2**20
+
+VENDOR_NAME = "vendor"
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+# ========== JOBS ==========
+
+class Job:
+    def __init__(self, job_id, directory, profile, output_format, chunksize, validate):
+        self.id = job_id
+        self.directory = directory
+        self.profile = profile
+        self.output_format = output_format
+        self.chunksize = chunksize
+        self.validate = validate
+        self.status = "queued"
+        self.created = time.time()
+        self.finished = None
+        self.result = None
+        self.done = asyncio.Event()
+
+    def to_dict(self):
+        result = self.result or {}
+        return {
+            "id": self.id,
+            "status": self.status,
+            "profile": self.profile,
+            "format": self.output_format,
+            "validate": self.validate,
+            "rows": result.get("rows"),
+            "missing_rows": result.get("missing_rows"),
+            "rejected_rows": result.get("rejected_rows"),
+            "seconds": result.get("seconds"),
+            "error": result.get("error"),
+            "status_url": f"/jobs/{self.id}",
+            "result_url": f"/jobs/{self.id}/result",
+        }
+
+
+class JobManager:
+    """Jobs of this server: upload directories, the process pool and the
+    limit on jobs mapping at once."""
+
+    def __init__(self, root, workers=SERVICE_WORKERS, ttl=JOB_TTL_SECONDS):
+        self.root = root
+        self.ttl = ttl
+        self.workers = workers
+        self.jobs = {}
+        self.pool = self._new_pool()
+        self.slots = asyncio.Semaphore(workers)
+        self._tasks = set()
+
+    def _new_pool(self):
+        # forkserver: workers do not inherit the event loop or its threads.
+        return ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("forkserver"))
+
+    async def create(self, profile, output_format, chunksize, validate):
+        await self.expire()
+        job_id = uuid.uuid4().hex
+        directory = os.path.join(self.root, job_id)
+        os.makedirs(directory)
+        job = Job(job_id, directory, profile, output_format, chunksize, validate)
+        self.jobs[job_id] = job
+        return job
+
+    def start(self, job, vendor_path, mapping_path=None):
+        task = asyncio.create_task(self._run(job, VendorSource(VENDOR_NAME, vendor_path, mapping=mapping_path)))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, job, vendor):
+        try:
+            async with self.slots:
+                job.status = "running"
+                pool = self.pool
+                loop = asyncio.get_running_loop()
+                try:
+                    job.result = await loop.run_in_executor(
+                        pool, functools.partial(process_vendor, validate=job.validate), vendor, job.directory,
+                        job.profile, job.output_format, job.chunksize,
+                    )
+                except BrokenProcessPool:
+                    # A worker died (killed, out of memory) and the pool takes
+                    # no more work; the jobs it was running fail, later ones
+                    # get a new pool.
+                    if self.pool is pool:
+                        self.pool = self._new_pool()
+                        pool.shutdown(wait=False)
+                    raise
+        except Exception as exc:  # the pool itself failed, e.g. a worker was killed
+            job.result = {"error": f"{type(exc).__name__}: {exc}"}
+        job.status = "failed" if job.result.get("error") else "done"
+        job.finished = time.time()
+        job.done.set()
+
+    async def remove(self, job):
+        del self.jobs[job.id]
+        # Outputs can be large; deleting them would block the event loop.
+        await asyncio.to_thread(shutil.rmtree, job.directory, ignore_errors=True)
+
+    async def expire(self):
+        cutoff = time.time() - self.ttl
+        for job in [job for job in self.jobs.values() if job.finished and job.finished < cutoff]:
+            await self.remove(job)
+
+    def counts(self):
+        counts = dict.fromkeys(("queued", "running", "done", "failed"), 0)
+        for job in self.jobs.values():
+            counts[job.status] += 1
+        return counts
+
+    def shutdown(self):
+        for task in self._tasks:
+            task.cancel()
+        self.pool.shutdown(wait=True, cancel_futures=True)
+
+
+# ========== UPLOADS ==========
+
+async def _save_stream(chunks, path, limit=MAX_UPLOAD_BYTES):
+    """Write an async iterator of byte chunks to ``path``; returns the size."""
+    size = 0
+    async with await anyio.open_file(path, "wb") as f:
+        async for chunk in chunks:
+            size += len(chunk)
+            if size > limit:
+                raise UploadTooLarge(f"upload larger than {limit:,} bytes")
+            await f.write(chunk)
+    return size
+
+
+def _limited(request, limit=MAX_UPLOAD_BYTES):
+    """``request`` with a body that raises UploadTooLarge once more than
+    ``limit`` bytes have arrived, so a multipart form is stopped while
+    Starlette parses it rather than after it is spooled whole."""
+    length = request.headers.get("content-length", "")
+    if length.isdigit() and int(length) > limit:
+        raise UploadTooLarge(f"upload larger than {limit:,} bytes")
+    size = 0
+
+    async def receive():
+        nonlocal size
+        message = await request.receive()
+        size += len(message.get("body", b""))
+        if size > limit:
+            raise UploadTooLarge(f"upload larger than {limit:,} bytes")
+        return message
+
+    return Request(request.scope, receive)
+
+
+async def _upload_chunks(upload):
+    while chunk := await upload.read(UPLOAD_CHUNK_BYTES):
+        yield chunk
+
+
+async def _save_upload(request, job):
+    """Save the request's vendor file (and mapping file) into the job's
+    directory; returns ``(vendor_path, mapping_path or None)``."""
+    vendor_path = os.path.join(job.directory, "upload")
+    if not request.headers.get("content-type", "").startswith("multipart/form-data"):
+        if not await _save_stream(request.stream(), vendor_path):
+            raise ValueError("empty upload")
+        return vendor_path, None
+
+    async with _limited(request).form(max_files=2) as form:
+        vendor = form.get("vendor")
+        if vendor is None or isinstance(vendor, str):
+            raise ValueError("multipart upload needs a 'vendor' file")
+        await _save_stream(_upload_chunks(vendor), vendor_path)
+        mapping = form.get("mapping")
+        if mapping is None or isinstance(mapping, str):
+            return vendor_path, None
+        mapping_path = os.path.join(job.directory, "mapping")
+        await _save_stream(_upload_chunks(mapping), mapping_path)
+        return vendor_path, mapping_path
+
+
+def _job_options(request):
+    params = request.query_params
+    profile = params.get("profile", DEFAULT_BATCH_PROFILE)
+    if profile not in PROFILES:
+        raise ValueError(f"unknown profile {profile!r}; choose from {', '.join(PROFILES)}")
+    output_format = params.get("format", DEFAULT_OUTPUT_FORMAT)
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"unknown format {output_format!r}; choose from {', '.join(OUTPUT_FORMATS)}")
+    chunksize = params.get("chunksize")
+    if chunksize is not None and (not chunksize.isdigit() or int(chunksize) <= 0):
+        raise ValueError("chunksize must be a positive number of rows")
+    validate = params.get("validate", "0")
+    if validate not in ("0", "1"):
+        raise ValueError("validate must be 0 or 1")
+    return profile, output_format, int(chunksize) if chunksize else None, validate == "1"
+
+
+def _error(status_code, message):
+    return JSONResponse({"error": message}, status_code=status_code)
+
+
+# ========== ENDPOINTS ==========
+
+async def submit(request):
+    """Create a job from the upload and start it; the job or an error response."""
+    try:
+        options = _job_options(request)
+    except ValueError as exc:
+        return _error(400, str(exc))
+    jobs = request.app.state.jobs
+    job = await jobs.create(*options)
+    try:
+        vendor_path, mapping_path = await _save_upload(request, job)
+    except UploadTooLarge as exc:
+        await jobs.remove(job)
+        return _error(413, str(exc))
+    except ValueError as exc:
+        await jobs.remove(job)
+        return _error(400, str(exc))
+    jobs.start(job, vendor_path, mapping_path)
+    return job
+
+
+def _get_job(request):
+    return request.app.state.jobs.jobs.get(request.path_params["job_id"])
+
+
+def _result_response(job):
+    output = job.result["output"]
+    return FileResponse(output, media_type=output_mime(job.output_format),
+                        filename=os.path.basename(output).replace(f"{VENDOR_NAME}.", "", 1),
+                        headers={"X-Job-Id": job.id, "X-Missing-Rows": str(job.result["missing_rows"]),
+                                 "X-Rejected-Rows": str(job.result["rejected_rows"])})
+
+
+async def create_job(request):
+    job = await submit(request)
+    if isinstance(job, Response):
+        return job
+    return JSONResponse(job.to_dict(), status_code=202, headers={"Location": f"/jobs/{job.id}"})
+
+
+async def convert(request):
+    job = await submit(request)
+    if isinstance(job, Response):
+        return job
+    await job.done.wait()
+    if job.status == "failed":
+        return JSONResponse(job.to_dict(), status_code=422)
+    return _result_response(job)
+
+
+async def job_status(request):
+    job = _get_job(request)
+    if job is None:
+        return _error(404, "no such job")
+    return JSONResponse(job.to_dict())
+
+
+async def job_result(request):
+    job = _get_job(request)
+    if job is None:
+        return _error(404, "no such job")
+    if job.status != "done":
+        return JSONResponse(job.to_dict(), status_code=409)
+    return _result_response(job)
+
+
+def _report_response(request, key, filename, none_message):
+    job = _get_job(request)
+    if job is None:
+        return _error(404, "no such job")
+    if job.status != "done":
+        return JSONResponse(job.to_dict(), status_code=409)
+    if not job.result[key]:
+        return _error(404, none_message)
+    return FileResponse(job.result[key], media_type="text/csv", filename=filename)
+
+
+async def job_missing(request):
+    return _report_response(request, "missing_output", "missing_diamond_weight.csv",
+                            "no rows with missing diamond weights")
+
+
+async def job_rejected(request):
+    return _report_response(request, "rejected_output", "rejected_rows.csv", "no rejected rows")
+
+
+async def delete_job(request):
+    job = _get_job(request)
+    if job is None:
+        return _error(404, "no such job")
+    if not job.done.is_set():
+        return JSONResponse(job.to_dict(), status_code=409)
+    await request.app.state.jobs.remove(job)
+    return Response(status_code=204)
+
+
+async def health(request):
+    return JSONResponse({"status": "ok", "workers": SERVICE_WORKERS, "jobs": request.app.state.jobs.counts()})
+
+
+@asynccontextmanager
+async def lifespan(app):
+    with tempfile.TemporaryDirectory(prefix="gemgem_jobs_", dir=JOB_DIR) as root:
+        app.state.jobs = JobManager(root)
+        try:
+            yield
+        finally:
+            app.state.jobs.shutdown()
+
+
+app = Starlette(
+    routes=[
+        Route("/health", health),
+        Route("/jobs", create_job, methods=["POST"]),
+        Route("/jobs/{job_id}", job_status),
+        Route("/jobs/{job_id}", delete_job, methods=["DELETE"]),
+        Route("/jobs/{job_id}/result", job_result),
+        Route("/jobs/{job_id}/missing", job_missing),
+        Route("/jobs/{job_id}/rejected", job_rejected),
+        Route("/convert", convert, methods=["POST"]),
+    ],
+    lifespan=lifespan,
+)
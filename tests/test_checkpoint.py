@@ -0,0 +1,70 @@
+"""A checkpointed run killed partway resumes to the uninterrupted output."""
+import os
+
+import pandas as pd
+import pytest
+
+from benchmarks.bench_vectorized import SAMPLE_FILE
+from bulk_mapper import checkpoint
+from bulk_mapper.checkpoint import stream_vendor_file_checkpointed
+from bulk_mapper.dedup import scan_duplicate_skus
+from bulk_mapper.engine import vendor_columns
+from bulk_mapper.profiles import PROFILES
+from bulk_mapper.streaming import stream_vendor_file
+
+CHUNKSIZE = 4
+OPTIONS = PROFILES["main"]
+
+
+class Killed(Exception):
+    pass
+
+
+@pytest.fixture
+def awkward_csv(tmp_path):
+    """test.csv with blank lines, a quoted newline and a repeated SKU, so
+    line numbers and row numbers differ."""
+    df = pd.read_csv(SAMPLE_FILE, dtype=str, keep_default_na=False)
+    df.loc[2, "DETAILS"] = "Ring\nwith a note"
+    df = pd.concat([df, df.iloc[[5]]], ignore_index=True)
+    lines = df.to_csv(index=False).split("\n")
+    path = tmp_path / "vendor.csv"
+    path.write_text("\n\n".join(lines[:3]) + "\n" + "\n".join(lines[3:9]) + "\n\n\n" + "\n".join(lines[9:]))
+    return str(path)
+
+
+def _run(source, directory, root, keep=None, kill_at=None, monkeypatch=None):
+    if kill_at is not None:
+        calls = []
+        map_columns = checkpoint.map_vendor_columns
+
+        def dying(*args, **kwargs):
+            calls.append(1)
+            if len(calls) == kill_at:
+                raise Killed
+            return map_columns(*args, **kwargs)
+
+        monkeypatch.setattr(checkpoint, "map_vendor_columns", dying)
+    return stream_vendor_file_checkpointed(source, os.path.join(directory, "out.csv"),
+                                           os.path.join(directory, "missing.csv"), root, CHUNKSIZE,
+                                           required_columns=False, usecols=vendor_columns(**OPTIONS), keep=keep,
+                                           **OPTIONS)
+
+
+@pytest.mark.parametrize("duplicates", [None, "keep-last"])
+def test_resume_after_kill_matches_uninterrupted_run(awkward_csv, tmp_path, monkeypatch, duplicates):
+    usecols = vendor_columns(**OPTIONS)
+    keep = None
+    if duplicates:
+        keep = scan_duplicate_skus(awkward_csv, duplicates, usecols=usecols, chunksize=CHUNKSIZE)[0]
+    expected = tmp_path / "expected.csv"
+    rows, _ = stream_vendor_file(awkward_csv, str(expected), str(tmp_path / "expected_missing.csv"), CHUNKSIZE,
+                                 required_columns=False, usecols=usecols, keep=keep, **OPTIONS)
+    assert rows == (21 if duplicates else 22)
+
+    root = str(tmp_path / "checkpoints")
+    with pytest.raises(Killed):
+        _run(awkward_csv, str(tmp_path), root, keep, kill_at=3, monkeypatch=monkeypatch)
+    monkeypatch.undo()
+    assert _run(awkward_csv, str(tmp_path), root, keep)[0] == rows
+    assert (tmp_path / "out.csv").read_bytes() == expected.read_bytes()
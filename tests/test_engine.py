@@ -0,0 +1,76 @@
+"""The mapped output of test.csv, byte for byte, on every path.
+
+``data/<profile>_output.csv`` is what the entry points wrote for test.csv
+before the column engine (app.py and dynamic_mapping.py with its identity
+mapping, main.py), except for the three main.py diamond rows whose zero CT
+now falls back to SD WT. (user-018).
+"""
+import os
+
+import pandas as pd
+import pytest
+
+from benchmarks.bench_vectorized import SAMPLE_FILE, to_csv_text
+from benchmarks.legacy_mapping import legacy_process_frame
+from benchmarks.synthetic import synthetic_vendor_frame
+from bulk_mapper.engine import is_positive_number, map_vendor_frame, positive_number_column, vendor_columns
+from bulk_mapper.parallel import map_vendor_frame_parallel
+from bulk_mapper.profiles import PROFILES
+from bulk_mapper.reader import read_vendor_file
+from bulk_mapper.streaming import stream_vendor_file
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+# main.py writes the columns in first-written order.
+REQUIRED_COLUMNS = {"app": True, "main": False, "dynamic": True}
+
+
+def golden(profile):
+    with open(os.path.join(DATA_DIR, f"{profile}_output.csv"), newline="") as f:
+        return f.read()
+
+
+def sample(profile):
+    return read_vendor_file(SAMPLE_FILE, vendor_columns(**PROFILES[profile]))
+
+
+@pytest.mark.parametrize("compact", [False, True])
+@pytest.mark.parametrize("profile", PROFILES)
+def test_mapped_sample_matches_golden(profile, compact):
+    out_df, missing_df = map_vendor_frame(sample(profile), REQUIRED_COLUMNS[profile], compact, **PROFILES[profile])
+    assert to_csv_text(out_df) == golden(profile)
+    assert missing_df.empty
+
+
+@pytest.mark.parametrize("profile", PROFILES)
+def test_parallel_matches_golden(profile):
+    out_df, _ = map_vendor_frame_parallel(sample(profile), workers=2, min_rows=1,
+                                          required_columns=REQUIRED_COLUMNS[profile], **PROFILES[profile])
+    assert to_csv_text(out_df) == golden(profile)
+
+
+@pytest.mark.parametrize("profile", PROFILES)
+def test_streamed_matches_golden(profile, tmp_path):
+    output = tmp_path / "out.csv"
+    missing = tmp_path / "missing.csv"
+    rows, missing_rows = stream_vendor_file(SAMPLE_FILE, str(output), str(missing), chunksize=4,
+                                            required_columns=REQUIRED_COLUMNS[profile],
+                                            usecols=vendor_columns(**PROFILES[profile]), **PROFILES[profile])
+    assert (rows, missing_rows) == (21, 0)
+    assert output.read_bytes().decode() == golden(profile)
+    assert not missing.exists()
+
+
+def test_engine_matches_row_by_row_baseline():
+    # Synthetic rows reach the branches test.csv does not: coloured stones,
+    # pearls, every category and size format, missing diamond weights.
+    df = synthetic_vendor_frame(300, seed=1)
+    out_df, missing_df = map_vendor_frame(df, **PROFILES["app"])
+    legacy_df, legacy_missing = legacy_process_frame(df)
+    assert to_csv_text(out_df) == to_csv_text(legacy_df)
+    assert len(legacy_missing) > 0
+    assert to_csv_text(missing_df) == to_csv_text(pd.DataFrame(legacy_missing))
+
+
+def test_positive_number_column_matches_scalar_check():
+    values = pd.Series(["1", "0.00", "-2", "1_000", "\u0663", " 4 ", "inf", "nan", "abc", "", "1", "0.00"], dtype=object)
+    assert positive_number_column(values).tolist() == [is_positive_number(value) for value in values]
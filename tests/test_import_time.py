@@ -0,0 +1,19 @@
+"""Cold imports of the library: no Streamlit or optional readers, and
+within ``DEFAULT_BUDGET_MS`` of a bare ``import pandas``.
+
+``python -m benchmarks.check_import_time`` prints the same check as a table.
+"""
+import pytest
+
+from benchmarks.check_import_time import BASELINE, DEFAULT_BUDGET_MS, TARGETS, probe
+
+REPEAT = 3
+
+
+@pytest.mark.parametrize("name, code, forbidden", TARGETS, ids=[target[0] for target in TARGETS])
+def test_import_target(name, code, forbidden):
+    result = probe(code, REPEAT)
+    assert [m for m in forbidden if m in result["loaded"]] == []
+    # pandas is timed next to the target, so both see the same machine load.
+    pandas_ms = probe(BASELINE[1], REPEAT)["seconds"] * 1000 if "pandas" in result["loaded"] else 0
+    assert result["seconds"] * 1000 - pandas_ms <= DEFAULT_BUDGET_MS
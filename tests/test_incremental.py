@@ -0,0 +1,41 @@
+"""Incremental runs give the output a plain run of the same file gives."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.bench_vectorized import to_csv_text
+from benchmarks.synthetic import synthetic_vendor_frame
+from bulk_mapper.engine import map_vendor_frame
+from bulk_mapper.incremental import map_incremental
+from bulk_mapper.profiles import PROFILES
+
+
+def resends(rows=400):
+    """A vendor file and three later versions of it: prices changed, rows
+    removed from the top, new rows, and the rows reordered."""
+    df = synthetic_vendor_frame(rows, seed=3)
+    yield df
+    changed = df.copy()
+    changed.loc[::7, "gem gem sale price"] = "999"
+    yield changed
+    yield pd.concat([changed.iloc[25:], synthetic_vendor_frame(30, seed=4).assign(**{"TAG NO": "NEW"})],
+                    ignore_index=True)
+    yield changed.iloc[np.random.default_rng(5).permutation(len(changed))].reset_index(drop=True)
+
+
+@pytest.mark.parametrize("compact", [False, True])
+@pytest.mark.parametrize("profile", PROFILES)
+def test_first_written_order_matches_plain_run(profile, compact, tmp_path):
+    state = str(tmp_path / "state.parquet")
+    for df in resends():
+        out_df, _, missing_df, _ = map_incremental(df, state, columns=None, compact=compact, **PROFILES[profile])
+        plain_df, plain_missing = map_vendor_frame(df, required_columns=False, **PROFILES[profile])
+        assert to_csv_text(out_df) == to_csv_text(plain_df)
+        assert to_csv_text(missing_df) == to_csv_text(plain_missing)
+
+
+def test_required_columns_by_default(tmp_path):
+    df = synthetic_vendor_frame(50)
+    out_df, delta_df, _, stats = map_incremental(df, str(tmp_path / "state.parquet"), **PROFILES["main"])
+    assert to_csv_text(out_df) == to_csv_text(map_vendor_frame(df, **PROFILES["main"])[0])
+    assert stats["added"] == len(delta_df) == 50
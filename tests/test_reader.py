@@ -0,0 +1,38 @@
+"""``read_vendor_file`` gives what pandas gives for CSVs pyarrow rejects."""
+import io
+
+import pandas as pd
+import pytest
+
+from bulk_mapper.reader import read_vendor_chunks, read_vendor_file
+
+FILES = {
+    # A row with fewer fields than the header: pyarrow raises ArrowInvalid.
+    "ragged": b"a,b,c,d\n1,2,3,4\n5,6\n",
+    # Blank and repeated names, which pandas renames "Unnamed: 2" and "CT.1".
+    "header": b"a,CT,,CT\n1,2,3,4\n5,6,7,8\n",
+}
+
+
+@pytest.fixture(params=["path", "bytes"])
+def source(request, tmp_path):
+    def make(name):
+        if request.param == "bytes":
+            return io.BytesIO(FILES[name])
+        path = tmp_path / f"{name}.csv"
+        path.write_bytes(FILES[name])
+        return str(path)
+    return make
+
+
+@pytest.mark.parametrize("name, usecols", [
+    ("ragged", None),
+    ("ragged", ["d", "a"]),
+    ("header", None),
+    ("header", ["CT.1", "a", "Unnamed: 2"]),
+])
+def test_matches_pandas(source, name, usecols):
+    expected = pd.read_csv(io.BytesIO(FILES[name]), dtype=str, usecols=usecols).fillna("")
+    pd.testing.assert_frame_equal(read_vendor_file(source(name), usecols), expected)
+    chunks = pd.concat(read_vendor_chunks(source(name), 1, usecols), ignore_index=True)
+    pd.testing.assert_frame_equal(chunks, expected)
@@ -0,0 +1,34 @@
+"""``parse_size_column`` against the golden corpus and ``parse_size``.
+
+The corpus is benchmarks/data/size_golden.csv; ``python -m
+benchmarks.check_size_parser --regenerate`` rewrites its golden values.
+"""
+import pytest
+
+from benchmarks.check_size_parser import RESULT_COLUMNS, load_golden
+from bulk_mapper.engine import parse_size
+from bulk_mapper.size_parser import parse_size_column
+
+GOLDEN = load_golden()
+
+
+@pytest.mark.parametrize("rule", sorted(GOLDEN["ring_standard_size"].unique()))
+def test_column_parser_matches_golden(rule):
+    rows = GOLDEN[GOLDEN["ring_standard_size"] == rule]
+    ring_standard_size = rule == "True"
+    parsed = list(zip(*parse_size_column(rows["size"], rows["category"], ring_standard_size)))
+    golden = list(rows[RESULT_COLUMNS].itertuples(index=False, name=None))
+    reference = [parse_size(size, category, ring_standard_size)
+                 for size, category in zip(rows["size"], rows["category"])]
+    assert parsed == golden
+    assert parsed == reference
+
+
+def test_ring_standard_size_and_dimensions():
+    parsed = parse_size_column(["", "7", "abc", "7 x 5 mm"], ["Ring", "Ring", "Ring", "Pendant"], True)
+    assert list(zip(*parsed)) == [
+        ("", "", "", ""),
+        ("", "", "", "7"),
+        ("", "", "", "abc"),
+        ("7", "5", "mm", ""),
+    ]
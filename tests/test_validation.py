@@ -0,0 +1,83 @@
+"""Rows ``validate_frame`` rejects, validation being opt-in, and the reports
+``process_vendor`` leaves."""
+import pandas as pd
+import pytest
+
+from benchmarks.bench_vectorized import SAMPLE_FILE
+from bulk_mapper.batch import VendorSource, process_vendor
+from bulk_mapper.engine import map_vendor_frame, vendor_columns
+from bulk_mapper.profiles import PROFILES
+from bulk_mapper.reader import read_vendor_file
+from bulk_mapper.validation import REASONS_COLUMN, validate_frame
+
+
+def mapped_sample(profile, compact=False):
+    df = read_vendor_file(SAMPLE_FILE, vendor_columns(**PROFILES[profile]))
+    return map_vendor_frame(df, compact=compact, **PROFILES[profile])[0]
+
+
+def output_frame(**columns):
+    rows = len(next(iter(columns.values())))
+    defaults = {"sku": "SKU", "price": "100", "category": "Pendant", "gold-purity": "18K", "standard-size": ""}
+    return pd.DataFrame({column: columns.get(column, [value] * rows) for column, value in defaults.items()})
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_sample_rejects_unknown_purity(compact):
+    # test.csv's platinum row comes out of format_gold_purity as "PT950K".
+    accepted, rejected = validate_frame(mapped_sample("main", compact))
+    assert len(accepted) == 20
+    assert rejected[REASONS_COLUMN].tolist() == ["gold-purity is not a known purity: PT950K"]
+    assert list(rejected.columns[1:]) == list(accepted.columns)
+
+
+def test_sample_without_tag_price_rejects_every_row():
+    # The app profile prices from TAG PRICE, which test.csv does not have.
+    accepted, rejected = validate_frame(mapped_sample("app"))
+    assert accepted.empty
+    assert len(rejected) == 21
+    assert rejected[REASONS_COLUMN].str.startswith("price is empty").all()
+
+
+def test_reasons_per_row():
+    frame = output_frame(
+        sku=["A", "", "C", "D", "E"],
+        price=["10", "20", "12,50", "0", "30"],
+        category=["Ring", "Ring", "Ring", "Pendant", "Ring"],
+        **{"gold-purity": ["14K", "18KK", "14K", "14K", "14K"], "standard-size": ["7", "7", "abc", "abc", "6.5"]},
+    )
+    accepted, rejected = validate_frame(frame)
+    assert accepted["sku"].tolist() == ["A", "E"]
+    assert rejected[REASONS_COLUMN].tolist() == [
+        "sku is empty; gold-purity is not a known purity: 18KK",
+        "price is not a positive number: 12,50; standard-size is not a number: abc",
+        "price is not a positive number: 0",
+    ]
+
+
+def test_all_rows_accepted_returns_the_frame():
+    frame = output_frame(sku=["A", "B"])
+    accepted, rejected = validate_frame(frame)
+    assert accepted is frame
+    assert rejected.empty
+
+
+def test_process_vendor_uploads_every_row_unless_validating(tmp_path):
+    result = process_vendor(VendorSource("all", SAMPLE_FILE), str(tmp_path), profile="main")
+    assert (result["error"], result["rows"], result["rejected_rows"]) == (None, 21, 0)
+    assert not (tmp_path / "all.rejected_rows.csv").exists()
+    result = process_vendor(VendorSource("validated", SAMPLE_FILE), str(tmp_path), profile="main", validate=True)
+    assert (result["error"], result["rows"], result["rejected_rows"]) == (None, 20, 1)
+    assert (tmp_path / "validated.rejected_rows.csv").exists()
+
+
+@pytest.mark.parametrize("chunksize", [None, 4])
+def test_process_vendor_removes_previous_reports(tmp_path, chunksize):
+    reports = [tmp_path / f"v.{name}.csv" for name in ("missing_diamond_weight", "duplicate_skus", "rejected_rows")]
+    for report in reports:
+        report.write_text("stale\n")
+    result = process_vendor(VendorSource("v", SAMPLE_FILE), str(tmp_path), profile="main", chunksize=chunksize,
+                            validate=True)
+    assert (result["missing_rows"], result["duplicate_rows"], result["rejected_rows"]) == (0, 0, 1)
+    assert [report.exists() for report in reports] == [False, False, True]
+    assert reports[2].read_text() != "stale\n"